@@ -1,14 +1,27 @@
 # main.py
 
 import asyncio
+import base64
 import logging
+from typing import Literal
 from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.input_handler.input_processor import InputProcessor
-from backend.core.main_brain.llama_integration import LLamaBrain
-from backend.utils.auth_manager import register_user, authenticate_user, create_access_token
-from backend.core.main_brain.llama_output_analyzer import EnhancedLlamaOutputAnalyzer
-from database.database import SessionLocal, engine, Base
+from backend.core.main_brain.brain_pipeline import BrainPipeline
+from backend.core.main_brain.inference_server import InferenceClient, InferenceError, RemoteAnalyzer, RemoteBrain
+from backend.models.database_models import User
+from backend.utils.auth_manager import (register_user, authenticate_user, create_access_token, get_current_user,
+                                        oauth2_scheme, password_admission, password_hasher)
+from backend.utils.chat_admission import ChatAdmission, Shed
+from backend.services.service_clients.credential_cache import CredentialCache, make_decryptor
+from backend.services.service_clients.session_pool import session_pool
+from backend.config.settings import get_settings
+from backend.utils.usage_aggregator import UsageAggregator, current_user_id, ensure_service
+from backend.utils.log_sink import install_log_sink
+from backend.utils.tracing import SamplingProfiler, tracer
+from database.database import AsyncSessionLocal, async_engine, engine, get_async_session, init_models
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -17,28 +30,145 @@ app = FastAPI()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize database
-Base.metadata.create_all(bind=engine)
+settings = get_settings()
+log_sink = None
+console_task = None
 
-# Dependency to get the database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def create_brain_pipeline():
+    """The pipeline runs each response through generation, analysis and TTS once.
+
+    In 'local' inference mode the models are loaded into this process (once,
+    before the fork, under backend.api.serve); in 'remote' mode this process
+    imports no model code and sends each stage to the inference worker.
+    """
+    if settings.INFERENCE_MODE == "remote":
+        return BrainPipeline(RemoteBrain(inference_client), RemoteAnalyzer(inference_client))
+    from backend.core.main_brain.llama_integration import LLamaBrain
+    from backend.core.main_brain.llama_output_analyzer import EnhancedLlamaOutputAnalyzer
+
+    return BrainPipeline(LLamaBrain(settings.LLAMA_MODEL_NAME, weights_path=settings.LLAMA_WEIGHTS_PATH),
+                         EnhancedLlamaOutputAnalyzer())
 
-# Initialize LLamaBrain, InputProcessor, and EnhancedLlamaOutputAnalyzer
-llama_brain = LLamaBrain()
+
+inference_client = InferenceClient(settings.INFERENCE_SOCKET, timeout=settings.INFERENCE_TIMEOUT)
 input_processor = InputProcessor()
-output_analyzer = EnhancedLlamaOutputAnalyzer()
+brain_pipeline = create_brain_pipeline()
+
+# Per-user, per-service usage counters, written to UsageStat in batches
+usage_aggregator = UsageAggregator(
+    AsyncSessionLocal,
+    flush_interval=settings.USAGE_FLUSH_INTERVAL,
+    max_unflushed=settings.USAGE_MAX_UNFLUSHED,
+    max_keys=settings.USAGE_MAX_KEYS,
+)
+
+# Admission in front of the model: global in-flight cap, per-user limit, priority queue with a wait deadline
+chat_admission = ChatAdmission(
+    max_in_flight=settings.CHAT_MAX_IN_FLIGHT,
+    max_queue=settings.CHAT_MAX_QUEUE,
+    max_per_user=settings.CHAT_MAX_PER_USER,
+    queue_timeout=settings.CHAT_QUEUE_TIMEOUT,
+)
+
+profiler = SamplingProfiler(max_seconds=settings.PROFILER_MAX_SECONDS)
+tracer.metrics.gauge("chat_in_flight", lambda: chat_admission.in_flight, "Chat requests running on the model")
+tracer.metrics.gauge("chat_queue_depth", lambda: chat_admission.queue_depth, "Chat requests waiting for the model")
+tracer.metrics.gauge("password_hash_pending", lambda: password_hasher.pending, "Password hashes running or queued")
+
+# Active services and their decrypted credentials, so outbound calls never query the database
+credential_cache = CredentialCache(
+    AsyncSessionLocal,
+    decrypt=make_decryptor(settings.CREDENTIAL_ENCRYPTION_KEY),
+    ttl=settings.CREDENTIAL_CACHE_TTL,
+    refresh_interval=settings.CREDENTIAL_REFRESH_INTERVAL,
+)
+
+@app.on_event("startup")
+async def start_tracing():
+    tracer.configure(enabled=settings.TRACING_ENABLED, ring_size=settings.TRACING_RING_SIZE,
+                     export_path=settings.TRACING_EXPORT_PATH)
+
+@app.on_event("startup")
+async def create_tables():
+    await init_models()
+
+@app.on_event("startup")
+async def start_log_sink():
+    global log_sink
+    if settings.LOG_SINK_ENABLED:
+        log_sink = install_log_sink(
+            engine,
+            level=logging.getLevelName(settings.LOG_SINK_LEVEL),
+            sample_rates={logging.DEBUG: settings.LOG_SINK_DEBUG_SAMPLE_RATE,
+                          logging.INFO: settings.LOG_SINK_INFO_SAMPLE_RATE},
+            capacity=settings.LOG_SINK_CAPACITY,
+            batch_size=settings.LOG_SINK_BATCH_SIZE,
+            flush_interval=settings.LOG_SINK_FLUSH_INTERVAL,
+        )
+
+@app.on_event("startup")
+async def start_usage_aggregator():
+    await ensure_service(AsyncSessionLocal, settings.CHAT_SERVICE_ID, "Chat")
+    await usage_aggregator.start()
+
+@app.on_event("startup")
+async def load_credentials():
+    await credential_cache.start()
 
-@app.post("/register")
-async def register(username: str, email: str, password: str, db: Session = Depends(get_db)):
-    return await register_user(db, username, email, password)
+@app.on_event("startup")
+async def start_password_hasher():
+    await password_hasher.start()
 
-@app.post("/login")
-async def login(username: str, password: str, db: Session = Depends(get_db)):
+@app.on_event("startup")
+async def open_http_sessions():
+    session_pool.configure(
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+        request_timeout=settings.HTTP_REQUEST_TIMEOUT,
+    )
+    # Create the shared connector on the serving loop before the first request
+    session_pool.get_session()
+
+@app.on_event("shutdown")
+async def close_http_sessions():
+    await session_pool.close_all()
+
+@app.on_event("shutdown")
+async def close_inference_client():
+    await inference_client.close()
+
+@app.on_event("shutdown")
+async def stop_credential_refresh():
+    await credential_cache.stop()
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+async def flush_usage():
+    await usage_aggregator.stop()
+
+@app.on_event("shutdown")
+async def stop_tracing():
+    tracer.close()
+
+@app.on_event("shutdown")
+async def stop_log_sink():
+    if log_sink is not None:
+        logging.getLogger().removeHandler(log_sink)
+        # Joins the writer thread and drains the queue; keep it off the event loop
+        await asyncio.to_thread(log_sink.close)
+
+@app.post("/register", dependencies=[Depends(password_admission)])
+async def register(username: str, email: str, password: str, db: AsyncSession = Depends(get_async_session)):
+    user = await register_user(db, username, email, password)
+    return {"id": user.id, "username": user.username, "email": user.email}
+
+@app.post("/login", dependencies=[Depends(password_admission)])
+async def login(username: str, password: str, db: AsyncSession = Depends(get_async_session)):
     user = await authenticate_user(db, username, password)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
@@ -47,44 +177,125 @@ async def login(username: str, password: str, db: Session = Depends(get_db)):
 
 
 async def process_input(text):
-    logger.info(f"Input received: {text}")
-    llama_response = await llama_brain.process_input(text)
-    logger.info(f"LLama response: {llama_response}")
-
-    is_relevant, confidence, filtered_output, audio_data = await output_analyzer.analyze_output(text, llama_response)
+    logger.debug("Input received: %s", text)
+    result = await brain_pipeline.run(text)
 
-    if is_relevant:
-        logger.info(f"Relevant output (confidence: {confidence:.2f}): {filtered_output}")
-        print(f"LLama: {filtered_output}")
+    if result.response is not None:
+        print(f"LLama: {result.response}")
 
-        if audio_data:
+        if result.audio:
             # Here you can save the audio data to a file or stream it to the user
             with open("output.wav", "wb") as audio_file:
-                audio_file.write(audio_data)
+                audio_file.write(result.audio)
             logger.info("Audio output saved as output.wav")
-    else:
-        logger.info(f"Output not relevant (confidence: {confidence:.2f})")
-        await output_analyzer.route_to_other_module(text)
-
-    @app.on_event("startup")
-    async def startup_event():
-        # This will run when the FastAPI app starts
-        asyncio.create_task(start_input_processing())
-
-    async def start_input_processing():
-        input_mode = input("Choose input mode (text/voice): ").lower()
-        if input_mode not in ['text', 'voice']:
-            logger.error("Invalid input mode. Defaulting to text.")
-            input_mode = 'text'
-
-        try:
-            await input_processor.start_processing(process_input, input_mode=input_mode)
-        except KeyboardInterrupt:
-            logger.info("Stopping the application.")
-        finally:
-            if input_mode == 'voice':
-                input_processor.stop_voice_input()
-
-    if __name__ == "__main__":
-        import uvicorn
-        uvicorn.run(app, host="0.0.0.0", port=8000)
+
+
+class ChatRequest(BaseModel):
+    message: str
+    priority: Literal["interactive", "background"] = "interactive"
+    # Optional pipeline stages; speech is returned base64-encoded
+    synthesize: bool = False
+    route: bool = True
+
+
+async def chat_user(token: str = Depends(oauth2_scheme)):
+    # A short-lived session of its own, so no connection is held while the request waits in the chat queue
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(db, token)
+
+
+@app.post("/chat")
+async def chat(chat_request: ChatRequest, user: User = Depends(chat_user)):
+    # Service clients called while answering count their calls against this user too
+    current_user_id.set(user.id)
+    try:
+        with tracer.span("chat", priority=chat_request.priority) as span:
+            async with chat_admission.slot(user.id, chat_request.priority) as queue_wait:
+                span.set(queue_wait=queue_wait)
+                result = await brain_pipeline.run(chat_request.message, synthesize=chat_request.synthesize,
+                                                  route=chat_request.route)
+    except Shed as e:
+        logger.warning(f"Shed chat request from user {user.id}: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e),
+                            headers={"Retry-After": e.retry_after_header})
+    except InferenceError as e:
+        logger.error(f"Chat request from user {user.id} failed in the inference worker: {str(e)}")
+        raise HTTPException(status_code=503, detail="Inference worker unavailable")
+    # Only answered requests count; shed and failed ones are not usage
+    usage_aggregator.record(user.id, settings.CHAT_SERVICE_ID)
+    return {
+        "response": result.response,
+        "relevant": result.analysis.is_relevant,
+        "confidence": result.analysis.confidence,
+        "routed_to": result.routing.category if result.routing else None,
+        "audio": base64.b64encode(result.audio).decode() if result.audio else None,
+    }
+
+
+@app.get("/chat/metrics")
+async def chat_metrics():
+    return chat_admission.metrics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage duration histograms, token and queue-wait totals and queue gauges in Prometheus text format."""
+    return tracer.metrics.render_prometheus()
+
+
+@app.get("/debug/traces")
+async def recent_traces(limit: int = 100):
+    return tracer.recent(limit)
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 5.0, interval: float = 0.005):
+    """Sample every thread's stack for `seconds` and return collapsed stacks for a flame graph."""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        return await asyncio.to_thread(profiler.profile, seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.on_event("startup")
+async def start_console_input():
+    # Optional console front end next to the HTTP API; CONSOLE_INPUT_MODE is 'text' or 'voice'
+    global console_task
+    if settings.CONSOLE_INPUT_MODE:
+        console_task = asyncio.create_task(start_input_processing(settings.CONSOLE_INPUT_MODE))
+
+
+async def start_input_processing(input_mode):
+    if input_mode not in ['text', 'voice']:
+        logger.error("Invalid input mode. Defaulting to text.")
+        input_mode = 'text'
+
+    try:
+        await input_processor.start_processing(process_input, input_mode=input_mode)
+    finally:
+        if input_mode == 'voice':
+            input_processor.stop_voice_input()
+
+
+@app.on_event("shutdown")
+async def stop_console_input():
+    if console_task is not None:
+        console_task.cancel()
+        await asyncio.gather(console_task, return_exceptions=True)
+
+
+@app.on_event("shutdown")
+async def close_database():
+    # Registered last so it runs after the usage flush, the credential refresh and the log sink are done with
+    # the database; the pooled aiosqlite connections run non-daemon threads that keep the process alive
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,146 @@
+# backend/api/serve.py
+#
+# Multi-process serving: python -m backend.api.serve --workers 4
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Pause before replacing a worker that exited, so one that crashes on startup does not restart in a tight loop
+RESTART_BACKOFF = 1.0
+
+
+def set_inference_threads(threads: int):
+    """Size torch's intra-op pool in a worker, if torch is loaded at all (it is not in remote inference mode)."""
+    torch = sys.modules.get("torch")
+    if torch is not None and threads > 0:
+        torch.set_num_threads(threads)
+
+
+class PreforkServer:
+    """Runs an ASGI app in `workers` processes forked after the app was imported.
+
+    The models built when the app module was imported are inherited by every
+    worker rather than loaded again: their pages stay shared until written,
+    gc.freeze() keeps the collector from writing to (and so copying) the
+    inherited objects, and weights mapped from a safetensors file are shared
+    through the page cache whatever happens. Startup hooks run in each worker
+    after the fork, so event loops, threads and connection pools are per
+    worker. torch must not have run a parallel op before the fork (OpenMP is
+    not fork-safe); loading does not, inference only happens in the workers.
+
+    The workers accept from one listening socket. A worker that exits is
+    replaced; SIGTERM or SIGINT stops them all.
+    """
+
+    def __init__(self, app, host: str = "0.0.0.0", port: int = 8000, workers: int = 1, threads_per_worker: int = 0,
+                 backlog: int = 2048):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        # Workers share the cores; without a limit each would start a thread per core
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.backlog = backlog
+        self.socket = None
+        self.pids = {}
+        self.stopping = False
+
+    def bind(self):
+        self.socket = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(self.backlog)
+        self.socket.set_inheritable(True)
+        self.port = self.socket.getsockname()[1]
+        logger.info(f"Listening on {self.host}:{self.port} with {self.workers} workers")
+
+    def run(self):
+        if self.socket is None:
+            self.bind()
+        # Everything allocated so far is shared with the workers; keep the collector off it
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for index in range(self.workers):
+            self._spawn(index)
+
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = self.pids.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(RESTART_BACKOFF)
+            if not self.stopping:
+                self._spawn(index)
+        self.socket.close()
+        logger.info("All workers stopped")
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = index
+            return
+        code = 0
+        try:
+            self._run_worker(index)
+        except BaseException:
+            logger.exception(f"Worker {index} failed")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _run_worker(self, index: int):
+        import uvicorn
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if index > 0:
+            # Only the first worker reads the console; the others see end-of-file (CONSOLE_INPUT_MODE)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.close(devnull)
+        set_inference_threads(self.threads_per_worker)
+        logger.info(f"Worker {index} started (pid {os.getpid()}, {self.threads_per_worker} inference threads)")
+        uvicorn.Server(uvicorn.Config(self.app, log_level="info")).run(sockets=[self.socket])
+
+
+def main():
+    from backend.config.settings import get_settings
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve the API from several processes sharing the loaded models")
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--host", default=settings.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVE_PORT)
+    parser.add_argument("--threads-per-worker", type=int, default=settings.SERVE_THREADS_PER_WORKER)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Imported before the fork, so the models are loaded once for all workers
+    from backend.api.main import app
+
+    PreforkServer(app, args.host, args.port, args.workers, args.threads_per_worker).run()
+
+
+if __name__ == "__main__":
+    main()
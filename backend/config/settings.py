@@ -10,8 +10,113 @@ class Settings(BaseSettings):
     API_KEY: str = Field(..., env='API_KEY')
     SERVICE_ENDPOINT: str = Field(..., env='SERVICE_ENDPOINT')
 
+    # Shared outbound HTTP connection pool
+    HTTP_POOL_LIMIT: int = Field(100, env='HTTP_POOL_LIMIT')
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(10, env='HTTP_POOL_LIMIT_PER_HOST')
+    HTTP_KEEPALIVE_TIMEOUT: float = Field(30.0, env='HTTP_KEEPALIVE_TIMEOUT')
+    HTTP_DNS_CACHE_TTL: int = Field(300, env='HTTP_DNS_CACHE_TTL')
+    HTTP_REQUEST_TIMEOUT: float = Field(30.0, env='HTTP_REQUEST_TIMEOUT')
+
+    # Database engine pools; SQLite gets WAL and a busy timeout instead of a large pool
+    DB_POOL_SIZE: int = Field(10, env='DB_POOL_SIZE')
+    DB_MAX_OVERFLOW: int = Field(20, env='DB_MAX_OVERFLOW')
+    DB_POOL_TIMEOUT: float = Field(30.0, env='DB_POOL_TIMEOUT')
+    DB_POOL_RECYCLE: int = Field(1800, env='DB_POOL_RECYCLE')
+    DB_ECHO: bool = Field(False, env='DB_ECHO')
+    SQLITE_POOL_SIZE: int = Field(5, env='SQLITE_POOL_SIZE')
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(5000, env='SQLITE_BUSY_TIMEOUT_MS')
+
+    # Password hashing: bcrypt cost, worker processes, queue limits and per-client admission
+    BCRYPT_ROUNDS: int = Field(12, env='BCRYPT_ROUNDS')
+    PASSWORD_HASH_WORKERS: int = Field(2, env='PASSWORD_HASH_WORKERS')
+    PASSWORD_HASH_MAX_CONCURRENCY: int = Field(2, env='PASSWORD_HASH_MAX_CONCURRENCY')
+    PASSWORD_HASH_MAX_PENDING: int = Field(64, env='PASSWORD_HASH_MAX_PENDING')
+    PASSWORD_ATTEMPTS_PER_MINUTE: int = Field(20, env='PASSWORD_ATTEMPTS_PER_MINUTE')
+    PASSWORD_ATTEMPTS_BURST: int = Field(5, env='PASSWORD_ATTEMPTS_BURST')
+    PASSWORD_MAX_IN_FLIGHT_PER_CLIENT: int = Field(2, env='PASSWORD_MAX_IN_FLIGHT_PER_CLIENT')
+
+    # Authenticated-user cache; USER_CACHE_URL enables a shared layer (redis://... or memory://)
+    USER_CACHE_TTL: float = Field(30.0, env='USER_CACHE_TTL')
+    USER_CACHE_MAX_SIZE: int = Field(10000, env='USER_CACHE_MAX_SIZE')
+    USER_CACHE_URL: Optional[str] = Field(None, env='USER_CACHE_URL')
+    TOKEN_CACHE_MAX_SIZE: int = Field(10000, env='TOKEN_CACHE_MAX_SIZE')
+
+    # Write-behind usage counters: flush period (s), increments that force an early flush, buffered counter cap
+    USAGE_FLUSH_INTERVAL: float = Field(5.0, env='USAGE_FLUSH_INTERVAL')
+    USAGE_MAX_UNFLUSHED: int = Field(10000, env='USAGE_MAX_UNFLUSHED')
+    USAGE_MAX_KEYS: int = Field(50000, env='USAGE_MAX_KEYS')
+    # Service id that /chat requests are counted under (a ServiceMetadata row is created for it)
+    CHAT_SERVICE_ID: str = Field('chat', env='CHAT_SERVICE_ID')
+
+    # Log records stored in the Log table: minimum level, per-level sampling, queue bound and batching
+    LOG_SINK_ENABLED: bool = Field(True, env='LOG_SINK_ENABLED')
+    LOG_SINK_LEVEL: str = Field('INFO', env='LOG_SINK_LEVEL')
+    LOG_SINK_DEBUG_SAMPLE_RATE: float = Field(0.01, env='LOG_SINK_DEBUG_SAMPLE_RATE')
+    LOG_SINK_INFO_SAMPLE_RATE: float = Field(1.0, env='LOG_SINK_INFO_SAMPLE_RATE')
+    LOG_SINK_CAPACITY: int = Field(10000, env='LOG_SINK_CAPACITY')
+    LOG_SINK_BATCH_SIZE: int = Field(500, env='LOG_SINK_BATCH_SIZE')
+    LOG_SINK_FLUSH_INTERVAL: float = Field(2.0, env='LOG_SINK_FLUSH_INTERVAL')
+
+    # /chat admission: concurrent model runs, queued requests, per-user running+queued, max queue wait (s)
+    CHAT_MAX_IN_FLIGHT: int = Field(2, env='CHAT_MAX_IN_FLIGHT')
+    CHAT_MAX_QUEUE: int = Field(32, env='CHAT_MAX_QUEUE')
+    CHAT_MAX_PER_USER: int = Field(2, env='CHAT_MAX_PER_USER')
+    CHAT_QUEUE_TIMEOUT: float = Field(10.0, env='CHAT_QUEUE_TIMEOUT')
+    # Console front end started with the server: 'text', 'voice', or unset for HTTP only
+    CONSOLE_INPUT_MODE: Optional[str] = Field(None, env='CONSOLE_INPUT_MODE')
+
+    # Spans and metrics: off by default; optional JSON-lines export file and the last-N span ring size
+    TRACING_ENABLED: bool = Field(False, env='TRACING_ENABLED')
+    TRACING_EXPORT_PATH: Optional[str] = Field(None, env='TRACING_EXPORT_PATH')
+    TRACING_RING_SIZE: int = Field(1000, env='TRACING_RING_SIZE')
+    # On-demand sampling profiler at /debug/profile; exposes stack traces, so off by default
+    PROFILER_ENABLED: bool = Field(False, env='PROFILER_ENABLED')
+    PROFILER_MAX_SECONDS: float = Field(30.0, env='PROFILER_MAX_SECONDS')
+
+    # Model serving: a safetensors file to map read-only instead of loading the checkpoint in every process;
+    # INFERENCE_MODE 'local' runs the models in each API process, 'remote' sends them to the inference worker
+    LLAMA_MODEL_NAME: str = Field('meta-llama/Meta-Llama-3.1-8B', env='LLAMA_MODEL_NAME')
+    LLAMA_WEIGHTS_PATH: Optional[str] = Field(None, env='LLAMA_WEIGHTS_PATH')
+    INFERENCE_MODE: str = Field('local', env='INFERENCE_MODE')
+    INFERENCE_SOCKET: str = Field('inference.sock', env='INFERENCE_SOCKET')
+    INFERENCE_MAX_CONCURRENCY: int = Field(2, env='INFERENCE_MAX_CONCURRENCY')
+    INFERENCE_TIMEOUT: float = Field(300.0, env='INFERENCE_TIMEOUT')
+    # Pre-fork launcher (python -m backend.api.serve): API processes, bind address, torch threads each (0: cores / workers)
+    SERVE_WORKERS: int = Field(1, env='SERVE_WORKERS')
+    SERVE_HOST: str = Field('0.0.0.0', env='SERVE_HOST')
+    SERVE_PORT: int = Field(8000, env='SERVE_PORT')
+    SERVE_THREADS_PER_WORKER: int = Field(0, env='SERVE_THREADS_PER_WORKER')
+
+    # Service credential cache: entry lifetime and change-probe period (s); a Fernet key if credential_data is encrypted
+    CREDENTIAL_CACHE_TTL: float = Field(3600.0, env='CREDENTIAL_CACHE_TTL')
+    CREDENTIAL_REFRESH_INTERVAL: float = Field(30.0, env='CREDENTIAL_REFRESH_INTERVAL')
+    CREDENTIAL_ENCRYPTION_KEY: Optional[str] = Field(None, env='CREDENTIAL_ENCRYPTION_KEY')
+
+    # Groq keys for the web search summarizer (comma-separated) and per-key limits
+    GROQ_API_KEYS: str = Field('', env='GROQ_API_KEYS')
+    GROQ_BASE_URL: Optional[str] = Field(None, env='GROQ_BASE_URL')
+    GROQ_REQUESTS_PER_MINUTE: int = Field(30, env='GROQ_REQUESTS_PER_MINUTE')
+    GROQ_TOKENS_PER_MINUTE: int = Field(6000, env='GROQ_TOKENS_PER_MINUTE')
+    GROQ_MAX_IN_FLIGHT_PER_KEY: int = Field(4, env='GROQ_MAX_IN_FLIGHT_PER_KEY')
+
+    # Google Custom Search credentials and endpoint for web search
+    GOOGLE_API_KEY: Optional[str] = Field(None, env='GOOGLE_API_KEY')
+    GOOGLE_CSE_ID: Optional[str] = Field(None, env='GOOGLE_CSE_ID')
+    GOOGLE_SEARCH_URL: str = Field('https://www.googleapis.com/customsearch/v1', env='GOOGLE_SEARCH_URL')
+
+    # Persistent web search cache: file location, per-layer TTLs (seconds) and size budgets (MB)
+    WEB_CACHE_PATH: str = Field('web_cache.db', env='WEB_CACHE_PATH')
+    WEB_CACHE_QUERY_TTL: float = Field(3600, env='WEB_CACHE_QUERY_TTL')
+    WEB_CACHE_PAGE_TTL: float = Field(86400, env='WEB_CACHE_PAGE_TTL')
+    WEB_CACHE_SUMMARY_TTL: float = Field(86400, env='WEB_CACHE_SUMMARY_TTL')
+    WEB_CACHE_ANSWER_TTL: float = Field(3600, env='WEB_CACHE_ANSWER_TTL')
+    WEB_CACHE_QUERY_MAX_MB: int = Field(5, env='WEB_CACHE_QUERY_MAX_MB')
+    WEB_CACHE_PAGE_MAX_MB: int = Field(200, env='WEB_CACHE_PAGE_MAX_MB')
+    WEB_CACHE_SUMMARY_MAX_MB: int = Field(20, env='WEB_CACHE_SUMMARY_MAX_MB')
+    WEB_CACHE_ANSWER_MAX_MB: int = Field(10, env='WEB_CACHE_ANSWER_MAX_MB')
+
     class Config:
-        env_file = '.env'
+        env_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
         env_file_encoding = 'utf-8'
 
     @validator('ENVIRONMENT')
@@ -20,6 +125,12 @@ class Settings(BaseSettings):
             raise ValueError("Environment must be 'development', 'testing', or 'production'")
         return v
 
+    @validator('INFERENCE_MODE')
+    def validate_inference_mode(cls, v):
+        if v not in ['local', 'remote']:
+            raise ValueError("Inference mode must be 'local' or 'remote'")
+        return v
+
 def get_settings():
     try:
         settings = Settings()
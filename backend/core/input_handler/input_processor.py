@@ -1,16 +1,13 @@
 import asyncio
 import logging
-import speech_recognition as sr
-import pyaudio
 import numpy as np
-from pydub import AudioSegment
-from pydub.effects import normalize
-import webrtcvad
 import collections
-import threading
+from backend.utils.tracing import tracer
 
-# Audio recording parameters
-FORMAT = pyaudio.paInt16
+# The audio device, VAD, filtering and speech recognition packages are imported where they are used,
+# so the text path and injected audio sources (benchmarks, tests) run without them
+
+# Audio recording parameters (16-bit samples)
 CHANNELS = 1
 RATE = 16000
 CHUNK_DURATION_MS = 20
@@ -25,16 +22,33 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def enhance_audio(audio_segment):
+    from pydub.effects import normalize
+
     audio_segment = normalize(audio_segment)
     audio_segment = audio_segment.high_pass_filter(80)
     audio_segment = audio_segment.low_pass_filter(10000)
     return audio_segment
 
+def enhance_pcm(audio_data):
+    """Raw 16-bit mono PCM in, enhanced PCM out."""
+    from pydub import AudioSegment
+
+    audio_segment = AudioSegment(
+        data=audio_data,
+        sample_width=2,
+        frame_rate=RATE,
+        channels=CHANNELS
+    )
+    return enhance_audio(audio_segment).raw_data
+
 class AudioStreamer:
     def __init__(self):
+        import pyaudio
+        import webrtcvad
+
         self.audio = pyaudio.PyAudio()
         self.stream = self.audio.open(
-            format=FORMAT,
+            format=pyaudio.paInt16,
             channels=CHANNELS,
             rate=RATE,
             input=True,
@@ -80,10 +94,14 @@ class AudioStreamer:
         self.audio.terminate()
 
 async def transcribe_audio(audio_data):
+    import speech_recognition as sr
+
     recognizer = sr.Recognizer()
     try:
         audio = sr.AudioData(audio_data, RATE, 2)
-        text = recognizer.recognize_google(audio, language="en-US")
+        with tracer.span("stt.transcribe", audio_bytes=len(audio_data)):
+            # A blocking HTTP call to the recognizer; keep it off the event loop
+            text = await asyncio.to_thread(recognizer.recognize_google, audio, language="en-US")
         logger.info(f"Transcription: {text}")
     except sr.UnknownValueError:
         text = "Could not understand audio"
@@ -95,50 +113,65 @@ async def transcribe_audio(audio_data):
     return text
 
 class InputProcessor:
-    def __init__(self):
-        self.audio_streamer = AudioStreamer()
+    """Feeds text typed on the console, or utterances from an audio source, to a callback.
+
+    The audio source defaults to the microphone, opened when voice input
+    starts. Any object with the AudioStreamer interface (start_recording()
+    yielding utterances of 16-bit mono PCM, stop_recording(), close()) can
+    be passed instead, along with replacements for the enhancer
+    (PCM -> PCM) and the async transcriber (PCM -> text).
+    """
+
+    def __init__(self, audio_source=None, enhancer=enhance_pcm, transcriber=transcribe_audio):
+        self.audio_streamer = audio_source
+        self.enhancer = enhancer
+        self.transcriber = transcriber
         self.is_listening = False
 
     async def process_voice_input(self, callback):
         logger.info("Starting voice input processing.")
         self.is_listening = True
-        recording_thread = threading.Thread(target=self.audio_streamer.start_recording)
-        recording_thread.start()
+        if self.audio_streamer is None:
+            self.audio_streamer = AudioStreamer()
+        utterances = self.audio_streamer.start_recording()
 
         try:
-            for audio_data in self.audio_streamer.start_recording():
-                if not self.is_listening:
+            while self.is_listening:
+                # Reading the device blocks until an utterance ends; wait for it in a thread
+                audio_data = await asyncio.to_thread(next, utterances, None)
+                if audio_data is None or not self.is_listening:
                     break
                 logger.info("Processing audio chunk")
-                audio_segment = AudioSegment(
-                    data=audio_data,
-                    sample_width=2,
-                    frame_rate=RATE,
-                    channels=CHANNELS
-                )
-                enhanced_audio = enhance_audio(audio_segment)
-                transcription = await transcribe_audio(enhanced_audio.raw_data)
-                await callback(transcription)
+                with tracer.span("input.voice", audio_bytes=len(audio_data)):
+                    with tracer.span("input.enhance_audio"):
+                        enhanced_audio = await asyncio.to_thread(self.enhancer, audio_data)
+                    transcription = await self.transcriber(enhanced_audio)
+                    await callback(transcription)
         except Exception as e:
             logger.error(f"An error occurred during voice processing: {str(e)}")
         finally:
             self.audio_streamer.stop_recording()
-            recording_thread.join()
             self.audio_streamer.close()
 
     def stop_voice_input(self):
         logger.info("Stopping voice input processing.")
         self.is_listening = False
-        self.audio_streamer.stop_recording()
+        if self.audio_streamer is not None:
+            self.audio_streamer.stop_recording()
 
     async def process_text_input(self, callback):
         logger.info("Starting text input processing.")
         while True:
             try:
-                user_input = input("You: ")
+                # input() blocks; read it in a thread so the event loop keeps serving while we wait
+                user_input = await asyncio.to_thread(input, "You: ")
                 if user_input.lower() == 'quit':
                     break
-                await callback(user_input)
+                with tracer.span("input.text", chars=len(user_input)):
+                    await callback(user_input)
+            except EOFError:
+                logger.info("Text input closed.")
+                break
             except Exception as e:
                 logger.error(f"An error occurred during text processing: {str(e)}")
 
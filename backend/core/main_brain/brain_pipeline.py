@@ -0,0 +1,110 @@
+# backend/core/main_brain/brain_pipeline.py
+
+import asyncio
+import logging
+import time
+from typing import Dict, NamedTuple, Optional
+
+from backend.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class Analysis(NamedTuple):
+    relevance: float
+    sentiment: float
+    topic_coherence: float
+    factual_accuracy: float
+    confidence: float
+    is_relevant: bool
+
+
+class Routing(NamedTuple):
+    category: str
+    scores: Dict[str, float]
+
+
+class PipelineResult(NamedTuple):
+    user_input: str
+    generated: str
+    analysis: Analysis
+    # Filtered text when the analysis found the output relevant
+    response: Optional[str]
+    # Set when the output was not relevant and routing was requested
+    routing: Optional[Routing]
+    audio: Optional[bytes]
+    # Seconds spent in each stage that ran
+    timings: Dict[str, float]
+
+
+class BrainPipeline:
+    """One pass from user input to response: generate, analyze, then filter and
+    synthesize a relevant output or route the input elsewhere.
+
+    Every stage runs at most once per input and hands its result to the next;
+    the model and analyzer work runs in threads so the event loop keeps
+    serving. A caller that already has a stage's result passes it to run()
+    (`generated`, `analysis`) and that stage is skipped; `synthesize` and
+    `route` turn the optional stages off. The stages are also available one
+    by one.
+    """
+
+    # `brain` needs process_input() and remember(); `analyzer` needs score(), filter_output(),
+    # classify_route() and a tts_service, as LLamaBrain and EnhancedLlamaOutputAnalyzer provide.
+    # The analyzer methods may also be coroutines (RemoteAnalyzer), which are awaited directly.
+    def __init__(self, brain, analyzer):
+        self.brain = brain
+        self.analyzer = analyzer
+
+    @staticmethod
+    async def _call(method, *args):
+        if asyncio.iscoroutinefunction(method):
+            return await method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def generate(self, text: str) -> str:
+        return await self.brain.process_input(text)
+
+    async def analyze(self, text: str, generated: str) -> Analysis:
+        return await self._call(self.analyzer.score, text, generated)
+
+    async def filter(self, generated: str) -> str:
+        return await self._call(self.analyzer.filter_output, generated)
+
+    async def route(self, text: str) -> Routing:
+        return await self._call(self.analyzer.classify_route, text)
+
+    async def synthesize(self, response: str) -> Optional[bytes]:
+        return await self.analyzer.tts_service.synthesize(response)
+
+    async def run(self, text: str, generated: Optional[str] = None, analysis: Optional[Analysis] = None,
+                  synthesize: bool = True, route: bool = True) -> PipelineResult:
+        timings = {}
+
+        async def timed(stage, awaitable):
+            started = time.perf_counter()
+            try:
+                with tracer.span(f"pipeline.{stage}"):
+                    return await awaitable
+            finally:
+                timings[stage] = time.perf_counter() - started
+
+        if generated is None:
+            generated = await timed("generate", self.generate(text))
+        # Full responses only at DEBUG; lazy %-formatting skips the work when DEBUG is off
+        logger.debug("LLama response: %s", generated)
+        if analysis is None:
+            analysis = await timed("analyze", self.analyze(text, generated))
+
+        response = routing = audio = None
+        if analysis.is_relevant:
+            logger.info(f"Relevant output (confidence: {analysis.confidence:.2f})")
+            response = await timed("filter", self.filter(generated))
+            self.brain.remember(text, response)
+            if synthesize and response:
+                audio = await timed("synthesize", self.synthesize(response))
+        else:
+            logger.info(f"Output not relevant (confidence: {analysis.confidence:.2f})")
+            if route:
+                routing = await timed("route", self.route(text))
+        return PipelineResult(text, generated, analysis, response, routing, audio, timings)
@@ -0,0 +1,284 @@
+# backend/core/main_brain/inference_server.py
+
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import os
+import struct
+import weakref
+from typing import Optional
+
+from backend.core.main_brain.brain_pipeline import Analysis, Routing
+from backend.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Frames are a 4-byte big-endian length followed by that many bytes of JSON
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 2 ** 20
+
+
+class InferenceError(Exception):
+    """The inference worker failed a request, timed out or could not be reached."""
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[dict]:
+    """The next message, or None when the peer closed the connection between messages."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise InferenceError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return json.loads(await reader.readexactly(length))
+
+
+def encode_frame(message: dict) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+class InferenceServer:
+    """Runs the models once for several API worker processes, over a Unix socket.
+
+    The API workers stay small (no torch, no weights) and send each pipeline
+    stage here through InferenceClient. A connection carries any number of
+    concurrent requests, answered out of order and matched by id. Model
+    calls run in threads, at most `max_concurrency` at a time.
+    """
+
+    def __init__(self, brain, analyzer, path: str, max_concurrency: int = 2):
+        self.brain = brain
+        self.analyzer = analyzer
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.methods = {"generate": self._generate, "score": self._score, "filter": self._filter,
+                        "route": self._route, "synthesize": self._synthesize}
+        self.stats = {"connections": 0, "requests": 0, "errors": 0}
+        self._semaphore = None
+        self._server = None
+
+    async def _generate(self, text):
+        return await asyncio.to_thread(self.brain.generate, text)
+
+    async def _score(self, user_input, output):
+        analysis = await asyncio.to_thread(self.analyzer.score, user_input, output)
+        # Scores may be numpy floats, which JSON cannot encode
+        return [float(value) for value in analysis[:-1]] + [bool(analysis.is_relevant)]
+
+    async def _filter(self, output):
+        return await asyncio.to_thread(self.analyzer.filter_output, output)
+
+    async def _route(self, user_input):
+        routing = await asyncio.to_thread(self.analyzer.classify_route, user_input)
+        return {"category": routing.category,
+                "scores": {label: float(score) for label, score in routing.scores.items()}}
+
+    async def _synthesize(self, text):
+        audio = await self.analyzer.tts_service.synthesize(text)
+        return base64.b64encode(audio).decode() if audio else None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            # Left behind by a worker that did not shut down cleanly
+            os.unlink(self.path)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Inference worker listening on {self.path}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                task = asyncio.create_task(self._respond(message, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError, InferenceError, ValueError) as e:
+            logger.warning(f"Dropping inference connection: {str(e)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _respond(self, message, writer, write_lock):
+        self.stats["requests"] += 1
+        try:
+            method = self.methods[message["method"]]
+            async with self._semaphore:
+                response = {"id": message["id"], "result": await method(*message.get("args", []))}
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Inference request {message.get('method')} failed: {str(e)}")
+            response = {"id": message.get("id"), "error": f"{type(e).__name__}: {str(e)}"}
+        async with write_lock:
+            writer.write(encode_frame(response))
+            await writer.drain()
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.write_lock = asyncio.Lock()
+        self.closed = False
+        self._reader_task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                message = await read_frame(self.reader)
+                if message is None:
+                    break
+                future = self.pending.get(message.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            logger.warning(f"Inference connection failed: {str(e)}")
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to the inference worker closed"))
+            self.writer.close()
+
+    async def close(self):
+        self._reader_task.cancel()
+        await asyncio.gather(self._reader_task, return_exceptions=True)
+
+
+class InferenceClient:
+    """Calls an InferenceServer; one multiplexed connection per event loop, reopened after a failure."""
+
+    def __init__(self, path: str, timeout: float = 300.0):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        # asyncio streams and locks are bound to one loop
+        self._connections = weakref.WeakKeyDictionary()
+        self._connect_locks = weakref.WeakKeyDictionary()
+
+    async def _connection(self) -> _Connection:
+        loop = asyncio.get_running_loop()
+        connection = self._connections.get(loop)
+        if connection is not None and not connection.closed:
+            return connection
+        lock = self._connect_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            connection = self._connections.get(loop)
+            if connection is None or connection.closed:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                except OSError as e:
+                    raise InferenceError(f"Cannot reach the inference worker at {self.path}: {str(e)}")
+                connection = self._connections[loop] = _Connection(reader, writer)
+            return connection
+
+    async def call(self, method: str, *args):
+        with tracer.span(f"inference.{method}"):
+            connection = await self._connection()
+            request_id = next(self._ids)
+            future = asyncio.get_running_loop().create_future()
+            connection.pending[request_id] = future
+            try:
+                async with connection.write_lock:
+                    connection.writer.write(encode_frame({"id": request_id, "method": method, "args": list(args)}))
+                    await connection.writer.drain()
+                response = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                raise InferenceError(f"Inference {method} timed out after {self.timeout}s")
+            except ConnectionError as e:
+                raise InferenceError(f"Inference {method} failed: {str(e)}")
+            finally:
+                connection.pending.pop(request_id, None)
+        if "error" in response:
+            raise InferenceError(response["error"])
+        return response["result"]
+
+    async def close(self):
+        connection = self._connections.pop(asyncio.get_running_loop(), None)
+        if connection is not None:
+            await connection.close()
+
+
+class RemoteBrain:
+    """LLamaBrain's interface for BrainPipeline, generating in the inference worker."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        self.context = []
+
+    async def process_input(self, text):
+        return await self.client.call("generate", text)
+
+    def remember(self, text, response):
+        self.context.append((text, response))
+
+
+class RemoteTTS:
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    async def synthesize(self, text):
+        audio = await self.client.call("synthesize", text)
+        return base64.b64decode(audio) if audio else None
+
+
+class RemoteAnalyzer:
+    """The analyzer's stage methods for BrainPipeline, scored in the inference worker."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        self.tts_service = RemoteTTS(client)
+
+    async def score(self, user_input, output) -> Analysis:
+        return Analysis(*await self.client.call("score", user_input, output))
+
+    async def filter_output(self, output) -> str:
+        return await self.client.call("filter", output)
+
+    async def classify_route(self, user_input) -> Routing:
+        routing = await self.client.call("route", user_input)
+        return Routing(routing["category"], routing["scores"])
+
+
+async def main():
+    from backend.config.settings import get_settings
+    from backend.core.main_brain.llama_integration import LLamaBrain
+    from backend.core.main_brain.llama_output_analyzer import EnhancedLlamaOutputAnalyzer
+
+    settings = get_settings()
+    tracer.configure(enabled=settings.TRACING_ENABLED, ring_size=settings.TRACING_RING_SIZE,
+                     export_path=settings.TRACING_EXPORT_PATH)
+    brain = LLamaBrain(settings.LLAMA_MODEL_NAME, weights_path=settings.LLAMA_WEIGHTS_PATH)
+    server = InferenceServer(brain, EnhancedLlamaOutputAnalyzer(), settings.INFERENCE_SOCKET,
+                             max_concurrency=settings.INFERENCE_MAX_CONCURRENCY)
+    try:
+        await server.serve_forever()
+    finally:
+        tracer.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
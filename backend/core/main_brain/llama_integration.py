@@ -1,14 +1,24 @@
+import asyncio
 import logging
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
-from backend.core.main_brain.llama_output_analyzer import EnhancedLlamaOutputAnalyzer
+from backend.utils.tracing import tracer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class LLamaBrain:
-    def __init__(self, model_name="meta-llama/Meta-Llama-3.1-8B"):
+    """The language model behind the pipeline.
+
+    With `weights_path` (a safetensors file written by
+    `python -m backend.core.main_brain.shared_weights`), the model is built
+    without allocating its parameters and then pointed at a read-only mapping
+    of the file, so every process serving the model shares one copy of the
+    weights through the page cache instead of loading its own.
+    """
+
+    def __init__(self, model_name="meta-llama/Meta-Llama-3.1-8B", weights_path=None):
         self.model_name = model_name
         logger.info(f"Loading model: {model_name}")
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
@@ -17,45 +27,66 @@ class LLamaBrain:
             self.tokenizer.add_special_tokens({'pad_token': '[PAD]'})
             logger.info(f"Added new pad_token: {self.tokenizer.pad_token}")
 
-        self.model = AutoModelForCausalLM.from_pretrained(model_name)
-        self.model.resize_token_embeddings(len(self.tokenizer))
+        if weights_path:
+            self.model = self._load_mapped(model_name, weights_path, len(self.tokenizer))
+        else:
+            self.model = AutoModelForCausalLM.from_pretrained(model_name)
+            self.model.resize_token_embeddings(len(self.tokenizer))
+        self.model.eval()
         self.context = []
-        self.analyzer = EnhancedLlamaOutputAnalyzer()
-        logger.info("Model and analyzer loaded successfully")
+        logger.info("Model loaded successfully")
+
+    @staticmethod
+    def _load_mapped(model_name, weights_path, vocab_size):
+        from accelerate import init_empty_weights
+        from transformers import AutoConfig
+        from backend.core.main_brain.shared_weights import load_torch_state_dict_mmap
+
+        # Parameters start on the meta device (no memory); buffers such as the rotary
+        # frequencies are not in the file, so they are still created for real
+        with init_empty_weights(include_buffers=False):
+            model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_name))
+            model.resize_token_embeddings(vocab_size)
+        model.load_state_dict(load_torch_state_dict_mmap(weights_path), strict=False, assign=True)
+        model.tie_weights()
+        missing = [name for name, parameter in model.named_parameters() if parameter.is_meta]
+        if missing:
+            raise ValueError(f"{weights_path} has no weights for {', '.join(missing[:5])}")
+        return model
 
     async def process_input(self, text):
-        logger.info(f"Processing input: {text}")
-        inputs = self.tokenizer.encode_plus(
-            text,
-            return_tensors="pt",
-            padding=True,
-            truncation=True
-        )
+        """Generate a raw response off the event loop; BrainPipeline analyzes it."""
+        return await asyncio.to_thread(self.generate, text)
+
+    def generate(self, text):
+        logger.debug("Processing input: %s", text)
+        with tracer.span("llama.tokenize"):
+            inputs = self.tokenizer.encode_plus(
+                text,
+                return_tensors="pt",
+                padding=True,
+                truncation=True
+            )
 
         input_length = inputs['input_ids'].shape[1]
         max_new_tokens = 1000
         max_length = input_length + max_new_tokens
 
-        outputs = self.model.generate(
-            input_ids=inputs["input_ids"],
-            attention_mask=inputs["attention_mask"],
-            max_length=max_length,
-            max_new_tokens=max_new_tokens,
-            num_return_sequences=1
-        )
-        raw_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-
-        # Analyze the output using the EnhancedLlamaOutputAnalyzer
-        is_relevant, confidence, filtered_response = self.analyzer.analyze_output(text, raw_response)
-
-        if is_relevant:
-            logger.info(f"Generated relevant response (confidence: {confidence:.2f})")
-            self.context.append((text, filtered_response))
-            return filtered_response
-        else:
-            logger.info(f"Generated response not relevant (confidence: {confidence:.2f}). Routing to other module.")
-            self.analyzer.route_to_other_module(text)
-            return None
+        # inference_mode also keeps the mapped, read-only weights from ever being written
+        with tracer.span("llama.generate", tokens_in=input_length) as span, torch.inference_mode():
+            outputs = self.model.generate(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=max_length,
+                max_new_tokens=max_new_tokens,
+                num_return_sequences=1
+            )
+            span.set(tokens_out=outputs.shape[1] - input_length)
+        with tracer.span("llama.decode"):
+            return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    def remember(self, text, response):
+        self.context.append((text, response))
 
     def clear_context(self):
         self.context = []
@@ -64,15 +95,16 @@ class LLamaBrain:
 
 # Example usage
 async def main():
-    llama_brain = LLamaBrain()
-    response = await llama_brain.process_input("What is the capital of France?")
-    if response:
-        logger.info(f"LLama response: {response}")
+    from backend.core.main_brain.brain_pipeline import BrainPipeline
+    from backend.core.main_brain.llama_output_analyzer import EnhancedLlamaOutputAnalyzer
+
+    pipeline = BrainPipeline(LLamaBrain(), EnhancedLlamaOutputAnalyzer())
+    result = await pipeline.run("What is the capital of France?", synthesize=False)
+    if result.response:
+        logger.info(f"LLama response: {result.response}")
     else:
-        logger.info("No relevant response generated. Input routed to another module.")
+        logger.info(f"No relevant response generated. Input routed to {result.routing.category}.")
 
 
 if __name__ == "__main__":
-    import asyncio
-
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -10,38 +10,67 @@ import spacy
 from gensim import corpora
 from gensim.models import LdaMulticore
 import asyncio
+import logging
+import threading
+from backend.core.main_brain.brain_pipeline import Analysis, Routing
 from backend.utils.text_to_speech.tts_service import TTSService
+from backend.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+ROUTING_LABELS = ["general_knowledge", "technical_support", "customer_service", "product_inquiry"]
+
 
 class EnhancedLlamaOutputAnalyzer:
     def __init__(self, confidence_threshold: float = 0.7):
         self.confidence_threshold = confidence_threshold
-        self.tfidf_vectorizer = TfidfVectorizer()
         self.sentiment_analyzer = pipeline("sentiment-analysis",
                                            model="distilbert-base-uncased-finetuned-sst-2-english")
         self.nlp = spacy.load("en_core_web_sm")
         self.topic_model = self._initialize_topic_model()
         self.fact_checker = self._initialize_fact_checker()
         self.tts_service = TTSService()
+        # Loaded on the first routed input rather than on every one; classify_route runs in worker threads,
+        # so the load is locked to happen once
+        self._router = None
+        self._router_lock = threading.Lock()
 
     async def analyze_output(self, user_input: str, llama_output: str) -> Tuple[bool, float, Optional[str], Optional[bytes]]:
-        relevance_score = self._calculate_relevance(user_input, llama_output)
-        sentiment_score = self._analyze_sentiment(llama_output)
-        topic_coherence = self._check_topic_coherence(user_input, llama_output)
-        factual_accuracy = self._check_factual_accuracy(llama_output)
-
-        overall_score = (relevance_score + sentiment_score + topic_coherence + factual_accuracy) / 4
-
-        is_relevant = overall_score >= self.confidence_threshold
-        filtered_output = self._filter_output(llama_output) if is_relevant else None
+        """Score, filter and synthesize in one call; BrainPipeline runs the same stages separately."""
+        analysis = self.score(user_input, llama_output)
+        filtered_output = self.filter_output(llama_output) if analysis.is_relevant else None
 
         audio_data = None
         if filtered_output:
             audio_data = await self.tts_service.synthesize(filtered_output)
 
-        return is_relevant, overall_score, filtered_output, audio_data
+        return analysis.is_relevant, analysis.confidence, filtered_output, audio_data
+
+    def score(self, user_input: str, llama_output: str) -> Analysis:
+        with tracer.span("analyzer.tfidf"):
+            relevance_score = self._calculate_relevance(user_input, llama_output)
+        with tracer.span("analyzer.sentiment"):
+            sentiment_score = self._analyze_sentiment(llama_output)
+        with tracer.span("analyzer.lda"):
+            topic_coherence = self._check_topic_coherence(user_input, llama_output)
+        with tracer.span("analyzer.deberta"):
+            factual_accuracy = self._check_factual_accuracy(llama_output)
+
+        overall_score = float((relevance_score + sentiment_score + topic_coherence + factual_accuracy) / 4)
+
+        # The TF-IDF similarity is a numpy float, which /chat cannot JSON-encode; plain floats and bool out
+        return Analysis(float(relevance_score), float(sentiment_score), float(topic_coherence),
+                        float(factual_accuracy), overall_score, bool(overall_score >= self.confidence_threshold))
+
+    def filter_output(self, llama_output: str) -> str:
+        with tracer.span("analyzer.spacy_filter", chars_in=len(llama_output)) as span:
+            filtered = self._filter_output(llama_output)
+            span.set(chars_out=len(filtered))
+        return filtered
 
     def _calculate_relevance(self, user_input: str, llama_output: str) -> float:
-        tfidf_matrix = self.tfidf_vectorizer.fit_transform([user_input, llama_output])
+        # A vectorizer per call: fitting the shared one from concurrent requests would race
+        tfidf_matrix = TfidfVectorizer().fit_transform([user_input, llama_output])
         cosine_sim = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
         return cosine_sim[0][0]
 
@@ -84,14 +113,22 @@ class EnhancedLlamaOutputAnalyzer:
         sensitive_entities = ["PERSON", "ORG", "GPE", "MONEY", "CREDIT_CARD", "SSN"]
         return any(ent.label_ in sensitive_entities for ent in doc.ents)
 
-    async def route_to_other_module(self, user_input: str):
-        classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-        candidate_labels = ["general_knowledge", "technical_support", "customer_service", "product_inquiry"]
-        results = classifier(user_input, candidate_labels)
+    async def route_to_other_module(self, user_input: str) -> Routing:
+        return self.classify_route(user_input)
+
+    def classify_route(self, user_input: str) -> Routing:
+        if self._router is None:
+            with self._router_lock:
+                if self._router is None:
+                    with tracer.span("analyzer.route_model_load"):
+                        self._router = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+        with tracer.span("analyzer.route"):
+            results = self._router(user_input, ROUTING_LABELS)
         top_category = results['labels'][0]
 
-        print(f"Routing user input to {top_category} module: {user_input}")
+        logger.info(f"Routing user input to {top_category} module")
         # Implement actual routing logic here
+        return Routing(top_category, dict(zip(results['labels'], results['scores'])))
 
     def _initialize_topic_model(self):
         return LdaMulticore
@@ -0,0 +1,126 @@
+# backend/core/main_brain/shared_weights.py
+
+import json
+import logging
+import mmap
+import struct
+import warnings
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# safetensors dtype names; BF16 has no numpy type, so it is mapped as raw 16-bit words and
+# reinterpreted when handed to torch
+NUMPY_DTYPES = {
+    "F64": np.float64, "F32": np.float32, "F16": np.float16, "BF16": np.uint16,
+    "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8, "U8": np.uint8, "BOOL": np.bool_,
+}
+SAFETENSORS_DTYPES = {np.dtype(dtype): name for name, dtype in NUMPY_DTYPES.items() if name != "BF16"}
+# Tensor data starts on this boundary so every array view is aligned
+HEADER_ALIGNMENT = 8
+
+
+def read_header(path: str):
+    """Return the safetensors header (name -> dtype, shape, data_offsets) and the offset of the data."""
+    with open(path, "rb") as file:
+        (length,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(length))
+    return header, 8 + length
+
+
+def save_safetensors(path: str, tensors: Dict[str, np.ndarray], dtypes: Optional[Dict[str, str]] = None,
+                     metadata: Optional[Dict[str, str]] = None):
+    """Write numpy arrays as a safetensors file. `dtypes` overrides the recorded type per tensor (BF16 words)."""
+    dtypes = dtypes or {}
+    header = {}
+    offset = 0
+    for name, array in tensors.items():
+        dtype = dtypes.get(name) or SAFETENSORS_DTYPES[array.dtype]
+        header[name] = {"dtype": dtype, "shape": list(array.shape), "data_offsets": [offset, offset + array.nbytes]}
+        offset += array.nbytes
+    if metadata:
+        header["__metadata__"] = metadata
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    encoded += b" " * (-(8 + len(encoded)) % HEADER_ALIGNMENT)
+    with open(path, "wb") as file:
+        file.write(struct.pack("<Q", len(encoded)))
+        file.write(encoded)
+        for array in tensors.values():
+            file.write(np.ascontiguousarray(array).tobytes())
+
+
+def load_safetensors_mmap(path: str) -> Dict[str, np.ndarray]:
+    """Map a safetensors file read-only and return one numpy view per tensor; nothing is copied.
+
+    Pages are read in on first touch and live in the page cache, so every
+    process that maps the same file shares one physical copy of the weights.
+    The arrays are not writable. The mapping stays open while any view is alive.
+    """
+    header, data_start = read_header(path)
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        begin, end = info["data_offsets"]
+        dtype = np.dtype(NUMPY_DTYPES[info["dtype"]])
+        tensors[name] = np.frombuffer(mapped, dtype=dtype, count=(end - begin) // dtype.itemsize,
+                                      offset=data_start + begin).reshape(info["shape"])
+    logger.info(f"Mapped {len(tensors)} tensors ({len(mapped) / 2 ** 30:.2f} GiB) from {path}")
+    return tensors
+
+
+def load_torch_state_dict_mmap(path: str) -> Dict:
+    """load_safetensors_mmap() as torch tensors sharing the mapping, for load_state_dict(assign=True)."""
+    import torch
+
+    header, _ = read_header(path)
+    state_dict = {}
+    with warnings.catch_warnings():
+        # The tensors are views of a read-only mapping; the model only reads them under inference_mode
+        warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+        for name, array in load_safetensors_mmap(path).items():
+            tensor = torch.from_numpy(array)
+            state_dict[name] = tensor.view(torch.bfloat16) if header[name]["dtype"] == "BF16" else tensor
+    return state_dict
+
+
+def export_torch_state_dict(model, path: str):
+    """Write a model's parameters and persistent buffers as safetensors, for load_torch_state_dict_mmap().
+
+    Tied tensors (the same storage under two names) are written once;
+    tie_weights() restores the others after loading.
+    """
+    import torch
+
+    tensors, dtypes, seen = {}, {}, set()
+    for name, tensor in model.state_dict().items():
+        pointer = tensor.data_ptr()
+        if pointer in seen:
+            continue
+        seen.add(pointer)
+        tensor = tensor.detach().cpu().contiguous()
+        if tensor.dtype == torch.bfloat16:
+            tensors[name] = tensor.view(torch.int16).numpy().view(np.uint16)
+            dtypes[name] = "BF16"
+        else:
+            tensors[name] = tensor.numpy()
+    save_safetensors(path, tensors, dtypes, metadata={"format": "pt"})
+    logger.info(f"Exported {len(tensors)} tensors to {path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the LLamaBrain weights for memory-mapped loading")
+    parser.add_argument("output", help="safetensors file to write; point LLAMA_WEIGHTS_PATH at it")
+    parser.add_argument("--model", default="meta-llama/Meta-Llama-3.1-8B")
+    args = parser.parse_args()
+
+    from backend.core.main_brain.llama_integration import LLamaBrain
+
+    logging.basicConfig(level=logging.INFO)
+    export_torch_state_dict(LLamaBrain(args.model).model, args.output)
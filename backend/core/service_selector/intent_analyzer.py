@@ -0,0 +1,106 @@
+# backend/core/service_selector/intent_analyzer.py
+
+import json
+import logging
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTENTS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'intents', 'web_query_intents.json'
+)
+
+# Word characters, including Devanagari vowel signs that \w does not cover, and in-word apostrophes
+_TOKEN_PATTERN = re.compile(r"[\wऀ-ॿ]+(?:'[\wऀ-ॿ]+)*")
+# Marks the end of a phrase in the token trie
+_PHRASE_END = ''
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    phrase: str
+    start: int
+    priority: int
+
+
+def normalize_query(query: str) -> str:
+    return query.lower().replace('’', "'").replace('‘', "'")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(normalize_query(text))
+
+
+class IntentMatcher:
+    """Matches a query against every intent phrase in one pass over its words.
+
+    The phrases are compiled once into a word-level trie. Walking the trie from
+    each word of the query finds all phrase occurrences, including overlapping
+    ones ("what is the time difference"), and only whole words match, so "day"
+    does not fire inside "today". The winning intent is the one with the highest
+    priority, then the longest phrase.
+    """
+
+    def __init__(self, intents: List[Dict], default_intent: str = 'search'):
+        self.default_intent = default_intent
+        self._trie: Dict = {}
+        self.phrase_count = 0
+        for intent in intents:
+            for phrase in intent['phrases']:
+                self._add_phrase(tokenize(phrase), intent['name'], intent['priority'])
+
+    def _add_phrase(self, words: List[str], intent: str, priority: int):
+        if not words:
+            return
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        current = node.get(_PHRASE_END)
+        if current is None:
+            self.phrase_count += 1
+        # A phrase listed under several intents belongs to the highest-priority one
+        if current is None or priority > current[1]:
+            node[_PHRASE_END] = (intent, priority, " ".join(words))
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_INTENTS_FILE) -> 'IntentMatcher':
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        matcher = cls(config['intents'], config.get('default_intent', 'search'))
+        logger.info(f"Loaded {matcher.phrase_count} intent phrases from {path}")
+        return matcher
+
+    def _scan(self, words: List[str]):
+        """Yield (start, (intent, priority, phrase)) for every phrase occurrence in `words`."""
+        trie = self._trie
+        count = len(words)
+        for start, word in enumerate(words):
+            node = trie.get(word)
+            position = start
+            while node is not None:
+                phrase = node.get(_PHRASE_END)
+                if phrase is not None:
+                    yield start, phrase
+                position += 1
+                node = node.get(words[position]) if position < count else None
+
+    def find_all(self, query: str) -> List[IntentMatch]:
+        return [IntentMatch(intent, phrase, start, priority)
+                for start, (intent, priority, phrase) in self._scan(tokenize(query))]
+
+    def best_match(self, query: str) -> Optional[IntentMatch]:
+        matches = self.find_all(query)
+        if not matches:
+            return None
+        return max(matches, key=lambda m: (m.priority, len(m.phrase)))
+
+    def match(self, query: str) -> str:
+        best = None
+        for _, (intent, priority, phrase) in self._scan(tokenize(query)):
+            rank = (priority, len(phrase))
+            if best is None or rank > best[0]:
+                best = (rank, intent)
+        return best[1] if best else self.default_intent
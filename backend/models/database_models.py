@@ -1,6 +1,6 @@
 # backend/models/database_models.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -74,6 +74,8 @@ class APIKey(Base, CommonFieldsMixin):
 
 class UsageStat(Base, CommonFieldsMixin):
     __tablename__ = 'usage_stats'
+    # One counter row per user and service, the conflict target for batched upserts
+    __table_args__ = (UniqueConstraint('user_id', 'service_id', name='uq_usage_stats_user_service'),)
 
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     service_id = Column(String(50), ForeignKey('service_metadata.service_id'), nullable=False)
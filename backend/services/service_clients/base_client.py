@@ -1,64 +1,301 @@
 import asyncio
+import copy
+import datetime
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 
+from backend.services.service_clients.rate_limiter import TokenBucket
+from backend.services.service_clients.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, HedgePolicy, LatencyTracker
+)
+from backend.services.service_clients.response_cache import CachePolicy, ResponseCache, SingleFlight, request_key
+from backend.services.service_clients.session_pool import SessionPool, session_pool as default_session_pool
+from backend.utils.tracing import tracer
+from backend.utils.usage_aggregator import current_user_id
+
 logger = logging.getLogger(__name__)
 
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
 class BaseServiceClient(ABC):
-    def __init__(self, base_url: str, api_key: str, max_retries: int = 3, rate_limit: int = 100):
+    def __init__(self, base_url: str, api_key: str, max_retries: int = 3, rate_limit: int = 100,
+                 session_pool: Optional[SessionPool] = None, rate_period: float = 60.0,
+                 num_workers: int = 4, queue_size: int = 1000,
+                 cache_policies: Optional[Dict[str, CachePolicy]] = None, cache_size: int = 1024,
+                 hedge_policy: Optional[HedgePolicy] = None, request_timeout: Optional[float] = None,
+                 breaker_threshold: int = 5, breaker_reset_timeout: float = 30.0,
+                 service_id: Optional[str] = None, credential_cache=None, usage_aggregator=None):
         self.base_url = base_url
         self.api_key = api_key
+        # With a CredentialCache the key is looked up in memory on every call, so rotations apply without a restart
+        self.service_id = service_id
+        self.credential_cache = credential_cache
+        # Successful calls made for a known user (current_user_id) are counted against service_id
+        self.usage_aggregator = usage_aggregator
         self.max_retries = max_retries
         self.rate_limit = rate_limit
-        self.session = aiohttp.ClientSession()
-        self.queue = asyncio.Queue()
+        self.session_pool = session_pool or default_session_pool
+        # rate_limit requests are allowed per rate_period seconds
+        self.rate_limiter = TokenBucket(rate_limit, rate_period)
+        self.num_workers = num_workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+        # Endpoint path prefix -> caching rules; endpoints without a policy are never cached
+        self.cache_policies = cache_policies or {}
+        self.response_cache = ResponseCache(max_entries=cache_size)
+        self.single_flight = SingleFlight()
+        # Hedging is opt-in and only ever applied to idempotent methods
+        self.hedge_policy = hedge_policy
+        # Default end-to-end budget for one request, covering every retry and backoff
+        self.request_timeout = request_timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # The session is shared by all clients on the running loop and owned by the pool
+        return self.session_pool.get_session()
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.session.close()
+        await self.stop_queue_processor()
 
     @abstractmethod
     async def request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         pass
 
-    async def _make_request(self, method: str, url: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _make_request(self, method: str, url: str, data: Optional[Dict[str, Any]] = None,
+                            timeout: Optional[float] = None) -> Dict[str, Any]:
+        timeout = timeout if timeout is not None else self.request_timeout
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if method.upper() not in IDEMPOTENT_METHODS:
+            _, payload, _ = await self._send_with_retries(method, url, data, deadline=deadline)
+        else:
+            key = request_key(method, url, data)
+            # The shared call's retries stop at the deadline of the caller that started it; every caller also
+            # waits under its own
+            try:
+                payload = await self.single_flight.do(
+                    key, lambda: self._cached_request(key, method, url, data, deadline), timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Deadline exceeded waiting for {url}")
+        self._record_usage()
+        return payload
+
+    def _record_usage(self):
+        user_id = current_user_id.get()
+        if self.usage_aggregator is not None and self.service_id is not None and user_id is not None:
+            self.usage_aggregator.record(user_id, self.service_id)
+
+    async def _cached_request(self, key, method: str, url: str, data: Optional[Dict[str, Any]],
+                              deadline: Optional[float] = None) -> Dict[str, Any]:
+        policy = self._cache_policy(url)
+        if policy is None:
+            _, payload, _ = await self._send_with_retries(method, url, data, deadline=deadline)
+            return payload
+
+        # Callers get copies, so mutating a response never changes the cached one
+        entry, fresh = self.response_cache.lookup(key)
+        if fresh:
+            return copy.deepcopy(entry.value)
+        conditional_headers = entry.validators() if entry is not None else {}
+        status, payload, headers = await self._send_with_retries(method, url, data, conditional_headers, deadline)
+        if status == 304 and entry is not None:
+            self.response_cache.refresh(key, headers, policy)
+            return copy.deepcopy(entry.value)
+        self.response_cache.store(key, payload, headers, policy)
+        return copy.deepcopy(payload)
+
+    def _cache_policy(self, url: str) -> Optional[CachePolicy]:
+        endpoint = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        matches = [prefix for prefix in self.cache_policies if endpoint.startswith(prefix)]
+        return self.cache_policies[max(matches, key=len)] if matches else None
+
+    def _endpoint_key(self, method: str, url: str) -> str:
+        return f"{method.upper()} {url.split('?', 1)[0]}"
+
+    def circuit_breaker(self, method: str, url: str) -> CircuitBreaker:
+        key = self._endpoint_key(method, url)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout)
+        return self._breakers[key]
+
+    def _latency_tracker(self, method: str, url: str) -> LatencyTracker:
+        return self._latencies.setdefault(self._endpoint_key(method, url), LatencyTracker())
+
+    async def _send_with_retries(self, method: str, url: str, data: Optional[Dict[str, Any]] = None,
+                                 extra_headers: Optional[Dict[str, str]] = None, deadline: Optional[float] = None):
+        headers = {**self._get_headers(), **(extra_headers or {})}
+        breaker = self.circuit_breaker(method, url)
+        hedge = self.hedge_policy is not None and method.upper() in IDEMPOTENT_METHODS
         for attempt in range(self.max_retries):
+            delay = 2 ** attempt  # Exponential backoff
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self._endpoint_key(method, url)}")
             try:
-                async with self.session.request(method, url, json=data, headers=self._get_headers()) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.error(f"Request failed with status {response.status}: {await response.text()}")
-                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
-            except aiohttp.ClientError as e:
+                if hedge:
+                    result = await self._hedged_attempt(method, url, data, headers, deadline, breaker)
+                else:
+                    result = await self._attempt(method, url, data, headers, deadline)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.error(f"Client error: {e}")
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                breaker.record_failure()
+            else:
+                status, payload, response_headers, retry_after = result
+                if status == 200 or (status == 304 and extra_headers):
+                    breaker.record_success()
+                    return status, payload, response_headers
+                if status == 429 or status >= 500:
+                    breaker.record_failure()
+                else:
+                    # The upstream answered; a client error says nothing about its health
+                    breaker.record_success()
+                delay = retry_after or delay
+            if attempt < self.max_retries - 1:
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise DeadlineExceeded(f"Deadline exceeded after {attempt + 1} attempts to {url}")
+                await asyncio.sleep(delay)
         raise Exception("Max retries reached, request failed")
 
+    async def _attempt(self, method: str, url: str, data: Optional[Dict[str, Any]], headers: Dict[str, str],
+                       deadline: Optional[float] = None):
+        """One upstream call. Returns (status, payload, headers, retry_after); payload is set only on 200."""
+        timeout = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded before request to {url}")
+            timeout = aiohttp.ClientTimeout(total=remaining)
+        with tracer.span("http.request", endpoint=self._endpoint_key(method, url)) as span:
+            waiting_since = time.monotonic()
+            await self.rate_limiter.acquire()
+            started = time.monotonic()
+            span.set(rate_limit_wait=started - waiting_since)
+            async with self.session.request(method, url, json=data, headers=headers, timeout=timeout) as response:
+                span.set(status=str(response.status))
+                if response.status == 200:
+                    payload = await response.json()
+                    self._latency_tracker(method, url).record(time.monotonic() - started)
+                    return response.status, payload, response.headers, None
+                if response.status == 304:
+                    return response.status, None, response.headers, None
+                logger.error(f"Request failed with status {response.status}: {await response.text()}")
+                return response.status, None, response.headers, self._retry_after(response)
+
+    async def _hedged_attempt(self, method: str, url: str, data: Optional[Dict[str, Any]], headers: Dict[str, str],
+                              deadline: Optional[float], breaker: CircuitBreaker):
+        """Send the request, and a duplicate if it is slower than the hedge delay; keep the first good answer."""
+        tasks = [asyncio.create_task(self._attempt(method, url, data, headers, deadline))]
+        hedge_delay = self.hedge_policy.delay(self._latency_tracker(method, url))
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done and breaker.allow():
+                logger.debug(f"Hedging request to {url} after {hedge_delay:.3f}s")
+                tasks.append(asyncio.create_task(self._attempt(method, url, data, headers, deadline)))
+
+            pending = set(tasks)
+            outcome = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result()[0] in (200, 304):
+                        return task.result()
+                    # Keep the first failure in case no attempt succeeds
+                    outcome = outcome or task
+            return outcome.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {**self.response_cache.stats, "coalesced": self.single_flight.coalesced}
+
+    @staticmethod
+    def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        """Seconds to wait according to the Retry-After header, if the upstream sent one."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+        return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
     def _get_headers(self) -> Dict[str, str]:
+        api_key = self.api_key
+        if self.credential_cache is not None and self.service_id is not None:
+            api_key = self.credential_cache.api_key(self.service_id)
         return {
-            "Authorization": f"Bearer {self.api_key}",
+            "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
 
-    async def enqueue_request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None):
-        await self.queue.put((method, endpoint, data))
+    async def enqueue_request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """Queue a request and return a future for its response.
+
+        Waits while the queue is full, so producers are slowed down to the pace of the workers.
+        """
+        future = asyncio.get_running_loop().create_future()
+        # The workers run in their own tasks, so the caller's user goes along with the request
+        await self.queue.put((method, endpoint, data, future, time.monotonic(), current_user_id.get()))
+        return future
 
     async def process_queue(self):
         while True:
-            method, endpoint, data = await self.queue.get()
+            method, endpoint, data, future, enqueued_at, user_id = await self.queue.get()
+            user_token = current_user_id.set(user_id)
             try:
+                tracer.record("http.queue_wait", time.monotonic() - enqueued_at, endpoint=endpoint)
+                if future.cancelled():
+                    continue
                 response = await self.request(method, endpoint, data)
-                logger.info(f"Request to {endpoint} succeeded with response: {response}")
+                if not future.done():
+                    future.set_result(response)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
             except Exception as e:
                 logger.error(f"Request to {endpoint} failed: {e}")
+                if not future.done():
+                    future.set_exception(e)
             finally:
+                current_user_id.reset(user_token)
                 self.queue.task_done()
 
     async def start_queue_processor(self):
-        asyncio.create_task(self.process_queue())
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self.process_queue()) for _ in range(self.num_workers)]
+
+    async def stop_queue_processor(self):
+        """Stop the workers and cancel the futures of requests still waiting in the queue."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while True:
+            try:
+                _, _, _, future, _, _ = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if not future.done():
+                future.cancel()
+            self.queue.task_done()
@@ -0,0 +1,210 @@
+# backend/services/service_clients/credential_cache.py
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from backend.models.database_models import ServiceCredential, ServiceMetadata
+
+logger = logging.getLogger(__name__)
+
+Decryptor = Callable[[str], Dict[str, Any]]
+
+
+def parse_credential_data(credential_data: str) -> Dict[str, Any]:
+    """credential_data is a JSON object, or a bare API key."""
+    try:
+        data = json.loads(credential_data)
+    except ValueError:
+        return {"api_key": credential_data}
+    return data if isinstance(data, dict) else {"api_key": data}
+
+
+def make_decryptor(key: Optional[str] = None) -> Decryptor:
+    """Plain parsing without a key; with one, credential_data is a Fernet token (requires `cryptography`)."""
+    if not key:
+        return parse_credential_data
+    from cryptography.fernet import Fernet
+
+    fernet = Fernet(key.encode())
+    return lambda credential_data: parse_credential_data(fernet.decrypt(credential_data.encode()).decode())
+
+
+class ServiceUnavailable(Exception):
+    """Raised for a service that is unknown, inactive or has no credentials in the cache."""
+
+
+class ServiceEntry:
+    __slots__ = ("service_id", "name", "credentials", "version", "loaded_at")
+
+    def __init__(self, service_id: str, name: str, credentials: Dict[str, Any], version: Tuple, loaded_at: float):
+        self.service_id = service_id
+        self.name = name
+        self.credentials = credentials
+        self.version = version
+        self.loaded_at = loaded_at
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self.credentials.get("api_key")
+
+
+class CredentialCache:
+    """In-memory ServiceMetadata and decrypted ServiceCredential lookups by service_id.
+
+    load() reads every active service and its newest credential in one pass at
+    startup and decrypts each credential once. get() never touches the
+    database. A background task compares a cheap version probe (activation
+    status, update times and credential ids) every `refresh_interval` seconds
+    and reloads only the services that changed, were deactivated, or whose
+    entry is older than `ttl`; an entry past its ttl keeps being served until
+    the reload replaces it. invalidate() reloads one service, or everything,
+    right away, e.g. after rotating a credential.
+    """
+
+    def __init__(self, session_factory, decrypt: Decryptor = parse_credential_data, ttl: float = 3600.0,
+                 refresh_interval: float = 30.0):
+        self.session_factory = session_factory
+        self.decrypt = decrypt
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, ServiceEntry] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "decrypted": 0, "refreshes": 0, "failed_refreshes": 0}
+
+    def get(self, service_id: str) -> ServiceEntry:
+        entry = self._entries.get(service_id)
+        if entry is None:
+            self.stats["misses"] += 1
+            raise ServiceUnavailable(f"Service {service_id} is not active or has no credentials")
+        self.stats["hits"] += 1
+        if entry.loaded_at + self.ttl <= time.monotonic() and self._wakeup is not None:
+            self._wakeup.set()
+        return entry
+
+    def api_key(self, service_id: str) -> Optional[str]:
+        return self.get(service_id).api_key
+
+    def __contains__(self, service_id: str) -> bool:
+        return service_id in self._entries
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def start(self):
+        await self.load()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def load(self):
+        """Replace the cache with every active service."""
+        async with self.lock:
+            async with self.session_factory() as db:
+                self._entries = await self._fetch(db)
+            self.stats["loads"] += 1
+        logger.info(f"Loaded credentials for {len(self._entries)} active services")
+
+    async def invalidate(self, service_id: Optional[str] = None):
+        """Reload one service (or all of them) from the database now."""
+        if service_id is None:
+            await self.load()
+            return
+        async with self.lock:
+            async with self.session_factory() as db:
+                entries = await self._fetch(db, [service_id])
+            self._replace([service_id], entries)
+
+    async def refresh(self):
+        """Reload the services whose rows changed or whose entries expired."""
+        async with self.lock:
+            async with self.session_factory() as db:
+                versions = await self._versions(db)
+                expired_before = time.monotonic() - self.ttl
+                stale = [service_id for service_id, version in versions.items()
+                         if service_id not in self._entries or self._entries[service_id].version != version
+                         or self._entries[service_id].loaded_at <= expired_before]
+                gone = [service_id for service_id in self._entries if service_id not in versions]
+                entries = await self._fetch(db, stale) if stale else {}
+            self._replace(stale + gone, entries)
+        if stale or gone:
+            self.stats["refreshes"] += 1
+            logger.info(f"Refreshed credentials: {len(entries)} reloaded, "
+                        f"{len(stale) + len(gone) - len(entries)} removed")
+
+    def _replace(self, service_ids, entries: Dict[str, ServiceEntry]):
+        # Build a new dict so get() never sees one half-updated
+        updated = dict(self._entries)
+        for service_id in service_ids:
+            updated.pop(service_id, None)
+        updated.update(entries)
+        self._entries = updated
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving what is cached; the next probe tries again
+                self.stats["failed_refreshes"] += 1
+                logger.error(f"Credential refresh failed: {str(e)}")
+
+    @staticmethod
+    def _credential_query(service_ids=None):
+        query = (
+            select(ServiceMetadata.service_id, ServiceMetadata.name, ServiceMetadata.updated_at,
+                   ServiceCredential.id, ServiceCredential.updated_at.label("credential_updated_at"),
+                   ServiceCredential.credential_data)
+            .join(ServiceCredential, ServiceCredential.service_id == ServiceMetadata.service_id)
+            .where(ServiceMetadata.activation_status.is_(True))
+            .order_by(ServiceMetadata.service_id, ServiceCredential.id)
+        )
+        if service_ids is not None:
+            query = query.where(ServiceMetadata.service_id.in_(service_ids))
+        return query
+
+    async def _versions(self, db) -> Dict[str, Tuple]:
+        # Same join without credential_data: nothing to decrypt, and only the newest credential counts
+        query = self._credential_query().with_only_columns(
+            [ServiceMetadata.service_id, ServiceMetadata.updated_at, ServiceCredential.id,
+             ServiceCredential.updated_at.label("credential_updated_at")])
+        result = await db.execute(query)
+        return {row.service_id: (row.updated_at, row.id, row.credential_updated_at) for row in result}
+
+    async def _fetch(self, db, service_ids=None) -> Dict[str, ServiceEntry]:
+        result = await db.execute(self._credential_query(service_ids))
+        newest = {}
+        for row in result:
+            # Ordered by credential id, so the last row per service is its newest credential
+            newest[row.service_id] = row
+        entries = {}
+        loaded_at = time.monotonic()
+        for service_id, row in newest.items():
+            try:
+                credentials = self.decrypt(row.credential_data)
+            except Exception as e:
+                logger.error(f"Could not decrypt credentials for service {service_id}: {str(e)}")
+                continue
+            self.stats["decrypted"] += 1
+            entries[service_id] = ServiceEntry(service_id, row.name, credentials,
+                                               (row.updated_at, row.id, row.credential_updated_at), loaded_at)
+        return entries
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per `period` seconds.
+
+    The bucket starts full, so up to `rate` requests may burst before callers
+    are spaced out at the refill rate.
+    """
+
+    def __init__(self, rate: int, period: float = 60.0):
+        if rate <= 0 or period <= 0:
+            raise ValueError("Rate and period must be positive")
+        self.capacity = float(rate)
+        self.fill_rate = rate / period
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        # The lock keeps waiters in FIFO order so no caller starves behind later arrivals
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.fill_rate)
+                self._refill()
+            self.tokens -= tokens
@@ -0,0 +1,98 @@
+import time
+from collections import deque
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the upstream while its circuit is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before it could complete."""
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: closed -> open after consecutive failures -> half-open probe.
+
+    While open, calls fail fast. After `reset_timeout` seconds a single probe is
+    let through; its outcome closes the circuit again or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            # A probe that never reported back (e.g. it was cancelled) must not block the circuit forever
+            now = time.monotonic()
+            if not self._probe_in_flight or now - self._probe_started >= self.reset_timeout:
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful request durations, in seconds."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, duration: float):
+        self.samples.append(duration)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+class HedgePolicy:
+    """When to send a duplicate of an idempotent request that has not answered yet.
+
+    The hedge fires after the endpoint's observed `percentile` latency, clamped to
+    [min_delay, max_delay]. Until `min_samples` latencies are known, `initial_delay`
+    is used instead.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_delay: float = 0.01, max_delay: float = 2.0,
+                 initial_delay: float = 0.5, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+
+    def delay(self, tracker: LatencyTracker) -> float:
+        if len(tracker.samples) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, tracker.percentile(self.percentile)))
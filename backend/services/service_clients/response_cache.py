@@ -0,0 +1,183 @@
+import asyncio
+import copy
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def request_key(method: str, url: str, data: Optional[Dict[str, Any]] = None) -> Tuple[str, str, str]:
+    body = json.dumps(data, sort_keys=True, default=str) if data else ""
+    return method.upper(), url, body
+
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (header or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+class CachePolicy:
+    """Caching rules for the endpoints under one path prefix.
+
+    `ttl` is used when the upstream sends no max-age. With `respect_cache_control`
+    the upstream's no-store, no-cache and max-age directives take precedence.
+    """
+
+    def __init__(self, ttl: float = 60.0, respect_cache_control: bool = True):
+        self.ttl = ttl
+        self.respect_cache_control = respect_cache_control
+
+    def ttl_for(self, headers) -> Optional[float]:
+        """Seconds the response stays fresh, or None if it must not be stored."""
+        if not self.respect_cache_control:
+            return self.ttl
+        directives = parse_cache_control(headers.get("Cache-Control"))
+        if "no-store" in directives:
+            return None
+        if "no-cache" in directives:
+            return 0.0
+        max_age = directives.get("max-age")
+        if max_age is not None:
+            try:
+                return max(0.0, float(max_age))
+            except ValueError:
+                pass
+        return self.ttl
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "last_modified", "expires_at")
+
+    def __init__(self, value: Any, etag: Optional[str], last_modified: Optional[str], expires_at: float):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Size-bounded LRU of decoded responses with per-entry expiry.
+
+    Expired entries are kept (until evicted) so their ETag/Last-Modified can be
+    used to revalidate them with a conditional request.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[CacheEntry], bool]:
+        """Return the entry for `key` (fresh or stale) and whether it is a fresh hit."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry.is_fresh():
+                self.stats["hits"] += 1
+                return entry, True
+        self.stats["misses"] += 1
+        return entry, False
+
+    def store(self, key: Hashable, value: Any, headers, policy: CachePolicy):
+        ttl = policy.ttl_for(headers)
+        if ttl is None:
+            self._entries.pop(key, None)
+            return
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if ttl <= 0 and not (etag or last_modified):
+            # Nothing to revalidate with, so the entry would never be used
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = CacheEntry(value, etag, last_modified, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def refresh(self, key: Hashable, headers, policy: CachePolicy):
+        """Extend an entry after the upstream answered 304 Not Modified."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        self.stats["revalidated"] += 1
+        ttl = policy.ttl_for(headers)
+        entry.expires_at = time.monotonic() + (ttl or 0.0)
+        entry.etag = headers.get("ETag") or entry.etag
+        entry.last_modified = headers.get("Last-Modified") or entry.last_modified
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.callers = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The call runs in its own task. Callers that arrive while it is in flight
+    await the same task instead of starting their own. When a call was
+    shared each caller receives its own deep copy of the result, so one
+    caller mutating it cannot change what the others see. Each caller waits
+    under its own `timeout`; a
+    caller that is cancelled or times out only stops waiting, and the call
+    itself is cancelled once no caller is left waiting for it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        flight.callers += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+            # Nobody can join a finished call, so by now callers is final
+            return copy.deepcopy(result) if flight.callers > 1 else result
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+                if self._calls.get(key) is flight:
+                    # A caller arriving now starts a fresh call instead of joining a cancelled one
+                    del self._calls[key]
+
+    def _finished(self, key: Hashable, flight: _Flight):
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+        # Mark the outcome as retrieved even when every caller had stopped waiting
+        if not flight.task.cancelled():
+            flight.task.exception()
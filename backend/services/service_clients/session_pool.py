@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import weakref
+from typing import List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPool:
+    """Process-wide registry of aiohttp sessions, one per running event loop.
+
+    aiohttp sessions and connectors are bound to the loop they were created on,
+    so every service client asks the pool for the session of the current loop
+    instead of owning one. All clients on a loop then share one connector, its
+    keep-alive connections and its DNS cache.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, keepalive_timeout: float = 30.0,
+                 dns_cache_ttl: int = 300, request_timeout: float = 30.0,
+                 trace_configs: Optional[List[aiohttp.TraceConfig]] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.request_timeout = request_timeout
+        self.trace_configs = trace_configs or []
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def configure(self, **options):
+        """Update connector settings. Applies to sessions created after the call."""
+        for key, value in options.items():
+            if not hasattr(self, key) or key.startswith('_'):
+                raise ValueError(f"Unknown session pool option: {key}")
+            setattr(self, key, value)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+            logger.info(f"Created shared HTTP session (limit={self.limit}, limit_per_host={self.limit_per_host})")
+        return session
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            trace_configs=self.trace_configs,
+        )
+
+    async def close(self):
+        """Close the session bound to the current loop."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def close_all(self):
+        """Close every session. Sessions of other, still running loops are closed on their own loop."""
+        current_loop = asyncio.get_running_loop()
+        for loop, session in list(self._sessions.items()):
+            if session.closed:
+                continue
+            if loop is current_loop:
+                await session.close()
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            else:
+                logger.warning("Dropping HTTP session whose event loop is no longer running")
+        self._sessions.clear()
+        logger.info("Closed shared HTTP sessions")
+
+
+session_pool = SessionPool()
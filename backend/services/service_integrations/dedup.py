@@ -0,0 +1,67 @@
+# backend/services/service_integrations/dedup.py
+
+import zlib
+from typing import List
+
+import numpy as np
+
+# Mersenne prime modulus for the permutation hashes
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles.
+
+    Shingle hashes are 32-bit CRCs and the permutation coefficients are below
+    2**32, so a * h + b stays within uint64 and the whole signature is computed
+    with vectorized numpy operations.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            return [" ".join(words)] if words else []
+        return [" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)]
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in set(shingles)), dtype=np.uint64)
+        permuted = (np.outer(hashes, self.a) + self.b) % _PRIME
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the two shingle sets."""
+        return float(np.mean(first == second))
+
+
+class NearDuplicateFilter:
+    """Remembers the pages seen for one query and flags near-copies of them."""
+
+    def __init__(self, threshold: float = 0.8, hasher: MinHasher = None):
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.signatures: List[np.ndarray] = []
+        self.dropped = 0
+
+    def add(self, text: str):
+        """Remember a page that is kept without being checked, so later copies of it are flagged."""
+        self.signatures.append(self.hasher.signature(text))
+
+    def is_duplicate(self, text: str) -> bool:
+        signature = self.hasher.signature(text)
+        for seen in self.signatures:
+            if MinHasher.similarity(signature, seen) >= self.threshold:
+                self.dropped += 1
+                return True
+        self.signatures.append(signature)
+        return False
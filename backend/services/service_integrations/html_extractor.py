@@ -0,0 +1,152 @@
+# backend/services/service_integrations/html_extractor.py
+
+import re
+from typing import Dict, List
+
+from lxml import etree
+
+# Roughly 0.75 English words per LLM token
+WORDS_PER_TOKEN = 0.75
+DEFAULT_TOKEN_BUDGET = 3000
+# Main-content text shorter than this is not trusted over the rest of the page
+MIN_MAIN_CONTENT_WORDS = 50
+# Without a main region yet, keep reading until the page text exceeds the budget by this factor,
+# since an <article> may still follow the navigation
+FALLBACK_READ_FACTOR = 4
+FEED_CHUNK_SIZE = 64 * 1024
+
+BOILERPLATE_TAGS = {
+    'script', 'style', 'noscript', 'template', 'nav', 'footer', 'header', 'aside', 'form',
+    'iframe', 'svg', 'canvas', 'button', 'select', 'option', 'head',
+}
+MAIN_CONTENT_TAGS = {'main', 'article'}
+# Document and content containers are never dropped for their class or id
+ATTR_EXEMPT_TAGS = {'html', 'body', 'main', 'article'}
+# A class or id token is boilerplate when one of its -/_ separated words is one of these...
+BOILERPLATE_ATTR_WORD = re.compile(
+    r'^(?:nav|navbar|menu|footer|sidebar|cookie|consent|banner|advert|ads?|promo|share|social|'
+    r'comments?|related|breadcrumbs?|subscribe|newsletter|popup|modal)$',
+    re.IGNORECASE,
+)
+# ...unless the token describes page state ("no-sidebar", "has-sidebar", "menu-open"), as themes put on wrappers
+STATE_ATTR_WORD = re.compile(
+    r'^(?:no|has|is|with|show|hide|open|opened|closed|active|visible|hidden|expanded|collapsed|enabled|disabled)$',
+    re.IGNORECASE,
+)
+MAIN_CONTENT_ATTR_PATTERN = re.compile(
+    r'(?:^|[\s_-])(?:article|main-content|post-body|post-content|entry-content|story-body|article-body)(?:[\s_-]|$)',
+    re.IGNORECASE,
+)
+
+
+def is_boilerplate_attr(value: str) -> bool:
+    """Whether a class or id value marks boilerplate, judged token by token rather than by substring."""
+    for token in value.split():
+        words = [word for word in re.split(r'[-_]+', token) if word]
+        if (any(BOILERPLATE_ATTR_WORD.match(word) for word in words)
+                and not any(STATE_ATTR_WORD.match(word) for word in words)):
+            return True
+    return False
+
+
+class _TextCollector:
+    """lxml parser target that keeps visible words, split into main-content and other text.
+
+    Boilerplate tags are dropped outright. An element dropped only for its
+    class or id is held aside instead: if it turns out to hold most of the
+    document's text, it was the page's content wrapper and its text is kept.
+    Text inside a main-content region is always kept.
+    """
+
+    def __init__(self, word_budget: int):
+        self.word_budget = word_budget
+        self.stack: List[tuple] = []
+        self.skip_depth = 0
+        self.main_depth = 0
+        # Outermost open element dropped for its class or id, as an index into held_words
+        self.held = None
+        # (main, held index or None, words) in document order
+        self.chunks: List[tuple] = []
+        self.held_words: List[int] = []
+        self.main_count = 0
+        self.other_count = 0
+        self.done = False
+
+    def start(self, tag, attrib: Dict[str, str]):
+        tag = tag.lower() if isinstance(tag, str) else ''
+        attrs = f"{attrib.get('class', '')} {attrib.get('id', '')}"
+        skip = tag in BOILERPLATE_TAGS
+        held = (not skip and self.held is None and tag not in ATTR_EXEMPT_TAGS
+                and attrib.get('role') != 'main' and is_boilerplate_attr(attrs))
+        if held:
+            self.held = len(self.held_words)
+            self.held_words.append(0)
+        main = (tag in MAIN_CONTENT_TAGS or attrib.get('role') == 'main'
+                or bool(MAIN_CONTENT_ATTR_PATTERN.search(attrs)))
+        self.stack.append((skip, main, held))
+        self.skip_depth += skip
+        self.main_depth += main
+
+    def end(self, tag):
+        if self.stack:
+            skip, main, held = self.stack.pop()
+            self.skip_depth -= skip
+            self.main_depth -= main
+            if held:
+                self.held = None
+
+    def data(self, data: str):
+        if self.skip_depth or self.done:
+            return
+        words = data.split()
+        if not words:
+            return
+        main = bool(self.main_depth)
+        held = None if main else self.held
+        self.chunks.append((main, held, words))
+        if main:
+            self.main_count += len(words)
+        elif held is not None:
+            self.held_words[held] += len(words)
+        else:
+            self.other_count += len(words)
+        if (self.main_count >= self.word_budget
+                or self.other_count + sum(self.held_words) >= self.word_budget * FALLBACK_READ_FACTOR):
+            self.done = True
+
+    def close(self):
+        return None
+
+    def text(self) -> str:
+        total = self.main_count + self.other_count + sum(self.held_words)
+        kept = {index for index, count in enumerate(self.held_words) if count * 2 > total}
+        main_words, other_words = [], []
+        for main, held, words in self.chunks:
+            if main:
+                main_words.extend(words)
+            elif held is None or held in kept:
+                other_words.extend(words)
+        words = main_words if len(main_words) >= MIN_MAIN_CONTENT_WORDS else main_words + other_words
+        return " ".join(words[:self.word_budget])
+
+
+def extract_text(html: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Return the readable text of `html`, cut to about `token_budget` LLM tokens.
+
+    The document is fed to lxml's HTML parser in chunks and parsing stops as soon
+    as enough text has been collected, so large pages are never parsed in full.
+    Boilerplate elements are skipped while streaming (except a class-matched
+    wrapper holding most of the text), and text inside main/article regions is
+    preferred when the page has enough of it.
+    """
+    collector = _TextCollector(max(1, int(token_budget * WORDS_PER_TOKEN)))
+    parser = etree.HTMLParser(target=collector, recover=True)
+    for offset in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[offset:offset + FEED_CHUNK_SIZE])
+        if collector.done:
+            break
+    try:
+        parser.close()
+    except etree.Error:
+        pass
+    return collector.text()
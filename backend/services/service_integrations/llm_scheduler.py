@@ -0,0 +1,189 @@
+# backend/services/service_integrations/llm_scheduler.py
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    # About four characters per token for English text
+    return len(text) // 4 + 1
+
+
+class KeyBudget:
+    """Sliding-window request and token budget of one API key, plus its in-flight calls.
+
+    Async SDK clients hold loop-bound connections, so `client_factory` is called
+    once per event loop and `client` returns the instance for the running loop.
+    """
+
+    def __init__(self, name: str, client_factory: Callable[[], Any], requests_per_window: int,
+                 tokens_per_window: int, max_in_flight: int = 4, window: float = 60.0):
+        self.name = name
+        self.client_factory = client_factory
+        self._clients = weakref.WeakKeyDictionary()
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.max_in_flight = max_in_flight
+        self.window = window
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        # (timestamp, tokens) per call started inside the window
+        self.calls = deque()
+        self.tokens_used = 0
+        self.total_requests = 0
+
+    @property
+    def client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            self._clients[loop] = self.client_factory()
+        return self._clients[loop]
+
+    def _prune(self, now: float):
+        while self.calls and now - self.calls[0][0] >= self.window:
+            _, tokens = self.calls.popleft()
+            self.tokens_used -= tokens
+
+    def can_accept(self, tokens: int, now: float) -> bool:
+        self._prune(now)
+        return (now >= self.cooldown_until
+                and self.in_flight < self.max_in_flight
+                and len(self.calls) < self.requests_per_window
+                # A call larger than the whole budget still goes through once the window is empty
+                and (not self.calls or self.tokens_used + tokens <= self.tokens_per_window))
+
+    def load(self) -> float:
+        """Share of the tightest budget already used; lower means more headroom."""
+        return max(len(self.calls) / self.requests_per_window,
+                   self.tokens_used / self.tokens_per_window,
+                   self.in_flight / self.max_in_flight)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        """Seconds until this key could take a call of `tokens`, ignoring in-flight completions."""
+        self._prune(now)
+        waits = [self.cooldown_until - now]
+        if len(self.calls) >= self.requests_per_window:
+            waits.append(self.calls[0][0] + self.window - now)
+        if self.tokens_used + tokens > self.tokens_per_window:
+            freed = 0
+            for started_at, used in self.calls:
+                freed += used
+                if self.tokens_used - freed + tokens <= self.tokens_per_window:
+                    waits.append(started_at + self.window - now)
+                    break
+            else:
+                waits.append(self.calls[-1][0] + self.window - now if self.calls else 0.0)
+        return max(0.0, *waits)
+
+    def reserve(self, tokens: int, now: float):
+        self.in_flight += 1
+        self.total_requests += 1
+        self.calls.append((now, tokens))
+        self.tokens_used += tokens
+
+    def settle(self, reserved: int, actual: Optional[int]):
+        """Replace the token estimate of the most recent matching reservation with the real usage."""
+        self.in_flight -= 1
+        if actual is None or actual == reserved:
+            return
+        for index in range(len(self.calls) - 1, -1, -1):
+            started_at, tokens = self.calls[index]
+            if tokens == reserved:
+                self.calls[index] = (started_at, actual)
+                self.tokens_used += actual - reserved
+                break
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMScheduler:
+    """Routes LLM calls to the least-loaded key that still has budget.
+
+    Callers wait in the scheduler's queue until some key has room, instead of
+    sleeping for a fixed time or retrying blindly against an exhausted key.
+    A scheduler without keys can be built (nothing is configured yet), but
+    every call through it fails.
+    """
+
+    def __init__(self, keys: List[KeyBudget]):
+        self.keys = keys
+        # The budgets are shared by every event loop and thread using the scheduler
+        self._lock = threading.Lock()
+        # (loop, future) of each caller waiting for room, woken by any release on any loop
+        self._waiters = set()
+
+    async def acquire(self, tokens: int) -> KeyBudget:
+        if not self.keys:
+            raise RuntimeError("No LLM API keys are configured")
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [key for key in self.keys if key.can_accept(tokens, now)]
+                if candidates:
+                    key = min(candidates, key=lambda k: k.load())
+                    key.reserve(tokens, now)
+                    return key
+                # Woken early by a release, or when the soonest window frees up
+                idle_keys = [key for key in self.keys if key.in_flight < key.max_in_flight]
+                timeout = min((key.wait_time(tokens, now) for key in idle_keys), default=None)
+                if timeout is not None:
+                    timeout = max(timeout, 0.001)
+                # Registered under the lock, so a release after the check above cannot be missed
+                waiter = (loop, loop.create_future())
+                self._waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    self._waiters.discard(waiter)
+
+    async def release(self, key: KeyBudget, reserved: int, actual_tokens: Optional[int] = None,
+                      retry_after: Optional[float] = None):
+        with self._lock:
+            key.settle(reserved, actual_tokens)
+            if retry_after is not None:
+                key.cooldown_until = max(key.cooldown_until, time.monotonic() + retry_after)
+            waiters = list(self._waiters)
+        if retry_after is not None:
+            logger.warning(f"LLM key {key.name} rate limited; cooling down for {retry_after:.1f}s")
+        running = asyncio.get_running_loop()
+        for loop, future in waiters:
+            if loop is running:
+                _wake(future)
+            else:
+                try:
+                    loop.call_soon_threadsafe(_wake, future)
+                except RuntimeError:
+                    # That loop has closed; its waiter went with it
+                    pass
+
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        key = await self.acquire(tokens)
+        usage = {"tokens": None, "retry_after": None}
+        try:
+            yield key, usage
+        finally:
+            await self.release(key, tokens, usage["tokens"], usage["retry_after"])
+
+    def stats(self):
+        with self._lock:
+            return {
+                key.name: {"requests": key.total_requests, "in_flight": key.in_flight,
+                           "window_requests": len(key.calls), "window_tokens": key.tokens_used}
+                for key in self.keys
+            }
@@ -0,0 +1,154 @@
+# backend/services/service_integrations/web_cache.py
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheLayer:
+    """One TTL- and byte-bounded table of the web cache, evicted least-recently-used first.
+
+    Expired rows are kept until evicted so callers can still revalidate them
+    (`allow_stale=True`) instead of refetching from scratch.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock, name: str, ttl: float, max_bytes: int):
+        self.conn = conn
+        self.lock = lock
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        with self.lock:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, meta TEXT, size INTEGER NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_accessed ON {name} (accessed_at)")
+            self.conn.commit()
+            self._bytes = self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {name}").fetchone()[0]
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, Dict, bool]]:
+        """Return (value, meta, fresh) for `key`, or None on a miss."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(f"SELECT value, meta, stored_at FROM {self.name} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            fresh = now - row[2] < self.ttl
+            if not fresh and not allow_stale:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits" if fresh else "stale_hits"] += 1
+            self.conn.execute(f"UPDATE {self.name} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(row[0]), json.loads(row[1] or "{}"), fresh
+
+    def set(self, key: str, value: Any, meta: Optional[Dict] = None):
+        encoded = json.dumps(value)
+        size = len(encoded) + len(key)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self.lock:
+            previous = self.conn.execute(f"SELECT size FROM {self.name} WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.name} (key, value, meta, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, json.dumps(meta or {}), size, now, now),
+            )
+            self._bytes += size - (previous[0] if previous else 0)
+            self.stats["stores"] += 1
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, key: str, meta: Optional[Dict] = None):
+        """Mark a stale entry fresh again after the origin confirmed it is unchanged."""
+        now = time.time()
+        with self.lock:
+            if meta:
+                self.conn.execute(f"UPDATE {self.name} SET stored_at = ?, accessed_at = ?, meta = ? WHERE key = ?",
+                                  (now, now, json.dumps(meta), key))
+            else:
+                self.conn.execute(f"UPDATE {self.name} SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                                  (now, now, key))
+            self.conn.commit()
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        # Drop expired rows first, then the least recently used ones
+        cutoff = time.time() - self.ttl
+        rows = self.conn.execute(
+            f"SELECT key, size FROM {self.name} ORDER BY stored_at >= ?, accessed_at", (cutoff,)
+        ).fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        self.conn.executemany(f"DELETE FROM {self.name} WHERE key = ?", doomed)
+        self.stats["evictions"] += len(doomed)
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self.conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        return {**self.stats, "entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class WebCache:
+    """Persistent four-layer cache for the web search path.
+
+    - queries:   normalized query -> result URLs
+    - pages:     URL -> extracted text, revalidated with ETag/Last-Modified
+    - summaries: (URL, query) -> LLM summary
+    - answers:   (query, set of page summaries) -> merged answer
+    """
+
+    def __init__(self, path: str, query_ttl: float = 3600, page_ttl: float = 86400, summary_ttl: float = 86400,
+                 query_max_bytes: int = 5 * 2 ** 20, page_max_bytes: int = 200 * 2 ** 20,
+                 summary_max_bytes: int = 20 * 2 ** 20, answer_ttl: float = 3600,
+                 answer_max_bytes: int = 10 * 2 ** 20):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        lock = threading.Lock()
+        self.queries = CacheLayer(self.conn, lock, "search_queries", query_ttl, query_max_bytes)
+        self.pages = CacheLayer(self.conn, lock, "page_contents", page_ttl, page_max_bytes)
+        self.summaries = CacheLayer(self.conn, lock, "page_summaries", summary_ttl, summary_max_bytes)
+        self.answers = CacheLayer(self.conn, lock, "merged_answers", answer_ttl, answer_max_bytes)
+
+    @staticmethod
+    def query_key(query: str, num_results: int) -> str:
+        return f"{num_results}:{' '.join(query.lower().split())}"
+
+    @staticmethod
+    def summary_key(url: str, query: str) -> str:
+        return f"{url}\n{' '.join(query.lower().split())}"
+
+    @staticmethod
+    def answer_key(query: str, summaries) -> str:
+        # The summaries arrive in completion order; the same set must give the same key
+        digests = sorted(hashlib.sha1(summary.encode()).hexdigest() for summary in summaries)
+        return f"{' '.join(query.lower().split())}\n{hashlib.sha1(' '.join(digests).encode()).hexdigest()}"
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "queries": self.queries.summary(),
+            "pages": self.pages.summary(),
+            "summaries": self.summaries.summary(),
+            "answers": self.answers.summary(),
+        }
+
+    def close(self):
+        self.conn.close()
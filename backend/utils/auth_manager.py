@@ -1,10 +1,16 @@
 import jwt
 import datetime
-from passlib.context import CryptContext
-from fastapi import HTTPException, status
+import math
+from fastapi import HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.models.database_models import User
+from database.database import AsyncSessionLocal
+from backend.config.settings import get_settings
+from backend.utils.password_hasher import AdmissionRejected, HashAdmission, HashingOverloaded, PasswordHasher
+from backend.utils.user_cache import TokenCache, UserCache, make_shared_cache
 import logging
 import re
 
@@ -13,8 +19,29 @@ SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+settings = get_settings()
+
+# Password hashing runs in worker processes; admission is limited per client IP
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+hash_admission = HashAdmission(
+    attempts_per_minute=settings.PASSWORD_ATTEMPTS_PER_MINUTE,
+    burst=settings.PASSWORD_ATTEMPTS_BURST,
+    max_in_flight=settings.PASSWORD_MAX_IN_FLIGHT_PER_CLIENT,
+)
+
+# Authenticated users and verified tokens, so get_current_user skips the DB and the signature check on repeat requests
+user_cache = UserCache(
+    ttl=settings.USER_CACHE_TTL,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    shared=make_shared_cache(settings.USER_CACHE_URL),
+    session_factory=AsyncSessionLocal,
+)
+token_cache = TokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -24,12 +51,36 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def password_admission(request: Request):
+    """Dependency for endpoints that hash passwords: limits attempts per client IP."""
+    client = request.client.host if request.client else "unknown"
+    try:
+        hash_admission.acquire(client)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected password attempt from {client}")
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many attempts",
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
+    try:
+        yield
+    finally:
+        hash_admission.release(client)
+
+
+async def get_password_hash(password):
+    try:
+        return await password_hasher.hash(password)
+    except HashingOverloaded:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy",
+                            headers={"Retry-After": "1"})
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    """Return (valid, new_hash); new_hash replaces a hash made with outdated cost parameters."""
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except HashingOverloaded:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy",
+                            headers={"Retry-After": "1"})
 
 
 def create_access_token(data: dict, expires_delta: datetime.timedelta = None):
@@ -43,18 +94,28 @@ def create_access_token(data: dict, expires_delta: datetime.timedelta = None):
     return encoded_jwt
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_by_username(db, username)
     if not user:
         logger.warning(f"Failed login attempt for username: {username}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
-    if not verify_password(password, user.password_hash):
+    valid, new_hash = await verify_password(password, user.password_hash)
+    if not valid:
         logger.warning(f"Failed login attempt for username: {username}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+        logger.info(f"Password rehashed with current parameters for username: {username}")
     return user
 
 
-def register_user(db: Session, username: str, email: str, password: str):
+async def register_user(db: AsyncSession, username: str, email: str, password: str):
     if not validate_username(username):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid username")
     if not validate_email(email):
@@ -62,18 +123,26 @@ def register_user(db: Session, username: str, email: str, password: str):
     if not validate_password(password):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid password")
 
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password)
     db_user = User(username=username, email=email, password_hash=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username or email already registered")
+    await db.refresh(db_user)
     logger.info(f"User registered: {username}")
     return db_user
 
 
-def get_current_user(db: Session, token: str):
+def decode_access_token(token: str):
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+async def get_current_user(db: AsyncSession, token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.decode(token, decode_access_token)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
@@ -82,26 +151,31 @@ def get_current_user(db: Session, token: str):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(User).filter(User.username == username).first()
+    user = await user_cache.get(db, username, get_user_by_username)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
-def update_user_profile(db: Session, user: User, **kwargs):
+async def update_user_profile(db: AsyncSession, user: User, **kwargs):
+    previous_username = user.username
     for key, value in kwargs.items():
         if key == "email" and not validate_email(value):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid email")
         setattr(user, key, value)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await user_cache.invalidate(previous_username)
+    if user.username != previous_username:
+        await user_cache.invalidate(user.username)
+    await db.refresh(user)
     logger.info(f"User profile updated: {user.username}")
     return user
 
 
-def delete_user(db: Session, user: User):
-    db.delete(user)
-    db.commit()
+async def delete_user(db: AsyncSession, user: User):
+    await db.delete(user)
+    await db.commit()
+    await user_cache.invalidate(user.username)
     logger.info(f"User deleted: {user.username}")
 
 
@@ -0,0 +1,224 @@
+# backend/utils/chat_admission.py
+
+import asyncio
+import collections
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+# Lower values are served first
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+class Shed(Exception):
+    """A chat request turned away before reaching the model."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class UserLimitExceeded(Shed):
+    status_code = 429
+
+
+class Overloaded(Shed):
+    status_code = 503
+
+
+class _Waiter:
+    __slots__ = ("user", "priority", "enqueued_at", "future")
+
+    def __init__(self, user, priority: int, future: asyncio.Future):
+        self.user = user
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future = future
+
+
+class ChatAdmission:
+    """Admission queue in front of the model.
+
+    At most `max_in_flight` requests run at once. Others wait in a priority
+    queue (then first come, first served) of at most `max_queue` entries; when
+    it is full a new request displaces the newest waiter of a lower priority,
+    or is shed. Each user may have `max_per_user` requests running or waiting.
+    A request that would not start within `queue_timeout` seconds is shed
+    when it arrives, going by recent service times, or when its wait runs
+    out. Rejections carry a Retry-After estimate.
+    """
+
+    def __init__(self, max_in_flight: int = 2, max_queue: int = 32, max_per_user: int = 2,
+                 queue_timeout: float = 10.0, window: int = 512):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._heap = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._per_user: Dict[object, int] = collections.Counter()
+        self._waits = collections.deque(maxlen=window)
+        self._service_times = collections.deque(maxlen=window)
+        self.stats = {"admitted": 0, "queued": 0, "completed": 0, "rejected_user": 0, "rejected_full": 0,
+                      "rejected_estimate": 0, "displaced": 0, "timed_out": 0, "cancelled": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def _service_time(self) -> float:
+        if not self._service_times:
+            return 1.0
+        return sum(self._service_times) / len(self._service_times)
+
+    def _estimated_wait(self, ahead: int) -> float:
+        """Seconds until a request with `ahead` requests in front of it starts."""
+        return (ahead // self.max_in_flight + 1) * self._service_time()
+
+    def _ahead_of(self, priority: int) -> int:
+        return sum(1 for _, _, waiter in self._heap
+                   if not waiter.future.done() and waiter.priority <= priority)
+
+    @asynccontextmanager
+    async def slot(self, user, priority: str = "interactive"):
+        """Hold a model slot for the body of the block, which receives the seconds spent queued."""
+        queued_at = time.monotonic()
+        await self.acquire(user, priority)
+        started = time.monotonic()
+        try:
+            yield started - queued_at
+        finally:
+            self._service_times.append(time.monotonic() - started)
+            self.release(user)
+
+    async def acquire(self, user, priority: str = "interactive"):
+        level = PRIORITIES[priority]
+        if self._per_user[user] >= self.max_per_user:
+            self.stats["rejected_user"] += 1
+            raise UserLimitExceeded(f"{self.max_per_user} chat requests already in progress",
+                                    self._service_time())
+        if self.in_flight < self.max_in_flight and not self._queued:
+            self._per_user[user] += 1
+            self._admit(time.monotonic())
+            return
+        ahead = self._ahead_of(level)
+        estimate = self._estimated_wait(ahead)
+        if estimate > self.queue_timeout:
+            self.stats["rejected_estimate"] += 1
+            raise Overloaded("Chat queue wait exceeds the deadline", estimate)
+        if self._queued >= self.max_queue and not self._displace(level):
+            self.stats["rejected_full"] += 1
+            raise Overloaded("Chat queue is full", estimate)
+        await self._wait(user, level)
+
+    async def _wait(self, user, level: int):
+        waiter = _Waiter(user, level, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (level, next(self._sequence), waiter))
+        self._queued += 1
+        self._per_user[user] += 1
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # Admitted just as the wait ended: hand the slot back
+                self.release(user)
+            elif not waiter.future.done():
+                waiter.future.cancel()
+                self._queued -= 1
+                self._decrement(user)
+                self._compact()
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["timed_out"] += 1
+                raise Overloaded("Timed out waiting in the chat queue", self._estimated_wait(self._queued))
+            if isinstance(e, asyncio.CancelledError):
+                self.stats["cancelled"] += 1
+            raise
+
+    def _compact(self):
+        # Abandoned entries are normally skipped by _dispatch; drop them early while nothing is being admitted
+        if len(self._heap) > 2 * self._queued + 16:
+            self._heap = [entry for entry in self._heap if not entry[2].future.done()]
+            heapq.heapify(self._heap)
+
+    def _displace(self, level: int) -> bool:
+        # Shed the newest waiter of the lowest priority below `level`, if there is one
+        victim = None
+        for entry in self._heap:
+            waiter = entry[2]
+            if waiter.future.done() or waiter.priority <= level:
+                continue
+            if victim is None or entry[:2] > victim[:2]:
+                victim = entry
+        if victim is None:
+            return False
+        waiter = victim[2]
+        waiter.future.set_exception(Overloaded("Displaced by a higher-priority chat request",
+                                               self._estimated_wait(self._queued)))
+        self._queued -= 1
+        self._decrement(waiter.user)
+        self.stats["displaced"] += 1
+        return True
+
+    def _admit(self, enqueued_at: float):
+        self.in_flight += 1
+        self._waits.append(time.monotonic() - enqueued_at)
+        self.stats["admitted"] += 1
+
+    def release(self, user):
+        self.in_flight -= 1
+        self._decrement(user)
+        self.stats["completed"] += 1
+        self._dispatch()
+
+    def _decrement(self, user):
+        self._per_user[user] -= 1
+        if self._per_user[user] <= 0:
+            del self._per_user[user]
+
+    def _dispatch(self):
+        while self._heap and self.in_flight < self.max_in_flight:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                # Timed out, cancelled or displaced; already taken off the counts
+                continue
+            self._queued -= 1
+            self._admit(waiter.enqueued_at)
+            waiter.future.set_result(True)
+
+    def metrics(self) -> Dict[str, object]:
+        """Queue depth, in-flight count and recent wait and service times (seconds) for capacity sizing."""
+        waits = sorted(self._waits)
+        by_priority = collections.Counter()
+        for _, _, waiter in self._heap:
+            if not waiter.future.done():
+                by_priority[waiter.priority] += 1
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self._queued,
+            "queue_depth_by_priority": {name: by_priority.get(level, 0) for name, level in PRIORITIES.items()},
+            "wait_p50": _percentile(waits, 0.5),
+            "wait_p95": _percentile(waits, 0.95),
+            "wait_p99": _percentile(waits, 0.99),
+            "wait_max": waits[-1] if waits else 0.0,
+            "service_time_avg": self._service_time() if self._service_times else None,
+            **self.stats,
+        }
+
+
+def _percentile(ordered, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
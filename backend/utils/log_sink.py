@@ -0,0 +1,134 @@
+# backend/utils/log_sink.py
+
+import collections
+import datetime
+import json
+import logging
+import random
+import threading
+import uuid
+from typing import Dict, Optional
+
+from backend.models.database_models import Log
+
+# Loggers whose records the sink never stores: its own database traffic would feed back into it
+IGNORED_LOGGERS = ("sqlalchemy", "aiosqlite")
+
+
+class DatabaseLogHandler(logging.Handler):
+    """Logging handler that stores records in the Log table without blocking the caller.
+
+    emit() only filters, samples and appends to a bounded in-memory queue; a
+    background thread drains the queue and bulk-inserts up to `batch_size`
+    rows per transaction, every `flush_interval` seconds or as soon as a full
+    batch is waiting. When the queue is full the oldest records are dropped
+    and counted in stats["dropped"].
+
+    `sample_rates` maps a level to the fraction of its records that are kept
+    (e.g. {logging.DEBUG: 0.01}); levels not listed are kept in full.
+    """
+
+    def __init__(self, engine, level: int = logging.INFO, sample_rates: Optional[Dict[int, float]] = None,
+                 capacity: int = 10000, batch_size: int = 500, flush_interval: float = 2.0):
+        super().__init__(level)
+        self.engine = engine
+        self.sample_rates = sample_rates or {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = collections.deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._random = random.Random()
+        self.stats = {"queued": 0, "sampled_out": 0, "dropped": 0, "written": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name="db-log-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        if record.name.startswith(IGNORED_LOGGERS) or record.thread == self._thread.ident:
+            return
+        rate = self.sample_rates.get(record.levelno)
+        if rate is not None and self._random.random() >= rate:
+            self.stats["sampled_out"] += 1
+            return
+        try:
+            entry = {
+                "log_id": uuid.uuid4().hex,
+                "log_level": record.levelname,
+                "created": record.created,
+                "logger": record.name,
+                "message": record.getMessage(),
+                "location": f"{record.module}:{record.lineno}",
+                "exception": self.formatter.formatException(record.exc_info)
+                if record.exc_info and self.formatter else None,
+            }
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.stats["dropped"] += 1
+        # A full deque discards its oldest entry on append
+        self._queue.append(entry)
+        self.stats["queued"] += 1
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain(self):
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            self._write(batch)
+
+    def _write(self, batch):
+        rows = []
+        for entry in batch:
+            created = entry.pop("created")
+            rows.append({
+                "log_id": entry.pop("log_id"),
+                "log_level": entry.pop("log_level"),
+                "log_data": json.dumps(entry, default=str),
+                "timestamp": _utc(created),
+                "created_at": _utc(created),
+            })
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(Log.__table__.insert(), rows)
+            self.stats["written"] += len(rows)
+        except Exception as e:
+            # Losing a batch of log records is preferable to failing the application or retrying forever
+            self.stats["failed"] += len(rows)
+            logging.getLogger(__name__).error(f"Could not store {len(rows)} log records: {str(e)}")
+
+    def flush(self):
+        """Write everything queued so far from the calling thread."""
+        self._drain()
+
+    def close(self):
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=max(5.0, self.flush_interval * 2))
+        self._drain()
+        super().close()
+
+
+def _utc(timestamp: float) -> datetime.datetime:
+    return datetime.datetime.utcfromtimestamp(timestamp)
+
+
+def install_log_sink(engine, level: int = logging.INFO, logger: Optional[logging.Logger] = None,
+                     **options) -> DatabaseLogHandler:
+    """Attach a DatabaseLogHandler to `logger` (the root logger by default).
+
+    The logger's own level still applies first, so records below it never
+    reach the handler.
+    """
+    handler = DatabaseLogHandler(engine, level=level, **options)
+    handler.setFormatter(logging.Formatter())
+    (logger or logging.getLogger()).addHandler(handler)
+    return handler
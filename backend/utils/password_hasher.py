@@ -0,0 +1,174 @@
+# backend/utils/password_hasher.py
+
+import asyncio
+import collections
+import logging
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process by _init_worker
+_worker_context: Optional[CryptContext] = None
+
+
+def make_context(rounds: int) -> CryptContext:
+    # Pinning min and max rounds to the configured cost marks every hash made
+    # with other parameters as needing an update, so logins rehash them
+    return CryptContext(schemes=["bcrypt"], deprecated="auto",
+                        bcrypt__rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+
+def _init_worker(rounds: int):
+    global _worker_context
+    _worker_context = make_context(rounds)
+
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return _worker_context.verify_and_update(password, hashed)
+    except ValueError:
+        # Not a hash this context recognizes
+        return False, None
+
+
+def _warm_up() -> bool:
+    return _worker_context is not None
+
+
+class HashingOverloaded(Exception):
+    """Raised when more hashing work is waiting than the hasher will queue."""
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool so hashing never blocks the event loop.
+
+    At most `max_concurrency` hashes run at once and at most `max_pending`
+    callers wait for a slot; further calls fail fast with HashingOverloaded.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_concurrency: Optional[int] = None,
+                 max_pending: int = 64):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_concurrency = max_concurrency or workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.rounds,))
+        return self._executor
+
+    @property
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    async def start(self):
+        """Start the worker processes before the first request needs them."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+        logger.info(f"Password hasher started with {self.workers} workers at bcrypt cost {self.rounds}")
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_concurrency + self.max_pending:
+            self.stats["rejected"] += 1
+            raise HashingOverloaded(f"{self.pending} password hashes already queued")
+        self.pending += 1
+        try:
+            async with self._semaphore:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(_hash, password)
+        self.stats["hashed"] += 1
+        return hashed
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Return (valid, new_hash); new_hash is set when the stored hash used outdated parameters."""
+        valid, new_hash = await self._run(_verify_and_update, password, hashed)
+        self.stats["verified"] += 1
+        if new_hash:
+            self.stats["rehashed"] += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, client: str, retry_after: float):
+        super().__init__(f"Too many password attempts from {client}")
+        self.retry_after = retry_after
+
+
+class HashAdmission:
+    """Per-client admission control for endpoints that hash passwords.
+
+    Each client (usually an IP address) gets a token bucket of
+    `attempts_per_minute` refilling attempts with room for `burst`, and at most
+    `max_in_flight` attempts running at once. At most `max_clients` clients
+    are tracked: a new one replaces the least recently seen idle client, and
+    is rejected when every tracked client has attempts running.
+    """
+
+    def __init__(self, attempts_per_minute: int = 20, burst: int = 5, max_in_flight: int = 2,
+                 max_clients: int = 10000):
+        self.fill_rate = attempts_per_minute / 60.0
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_clients = max_clients
+        # client -> [tokens, updated_at, in_flight]
+        self._clients = collections.OrderedDict()
+
+    def acquire(self, client: str):
+        now = time.monotonic()
+        state = self._clients.get(client)
+        if state is None:
+            if len(self._clients) >= self.max_clients and not self._evict_idle():
+                # Every tracked client has attempts running; forgetting one would reset its limits
+                raise AdmissionRejected(client, 1.0)
+            state = self._clients[client] = [float(self.burst), now, 0]
+        else:
+            self._clients.move_to_end(client)
+            state[0] = min(self.burst, state[0] + (now - state[1]) * self.fill_rate)
+            state[1] = now
+        if state[2] >= self.max_in_flight:
+            raise AdmissionRejected(client, 1.0)
+        if state[0] < 1:
+            raise AdmissionRejected(client, (1 - state[0]) / self.fill_rate)
+        state[0] -= 1
+        state[2] += 1
+
+    def _evict_idle(self) -> bool:
+        """Forget the least recently seen client with no attempts running; False if there is none."""
+        for client, state in self._clients.items():
+            if not state[2]:
+                del self._clients[client]
+                return True
+        return False
+
+    def release(self, client: str):
+        state = self._clients.get(client)
+        if state is not None and state[2] > 0:
+            state[2] -= 1
@@ -5,6 +5,7 @@ from pydub import AudioSegment
 from pydub.effects import normalize
 import webrtcvad
 import collections
+import logging
 import threading
 import time
 
@@ -20,6 +21,8 @@ PADDING_CHUNKS = int(PADDING_DURATION_MS / CHUNK_DURATION_MS)
 # VAD parameters
 VAD_MODE = 0# Aggressiveness mode (0-3)
 
+logger = logging.getLogger(__name__)
+
 def enhance_audio(audio_segment):
     # Normalize audio
     audio_segment = normalize(audio_segment)
@@ -52,18 +55,22 @@ class AudioStreamer:
         ring_buffer = collections.deque(maxlen=PADDING_CHUNKS)
         triggered = False
 
+        # Checked once: this loop runs every 20 ms and should not pay for disabled debug logging
+        debug = logger.isEnabledFor(logging.DEBUG)
+
         while self.is_recording:
             chunk = self.stream.read(CHUNK_SIZE)
             is_speech = self.vad.is_speech(chunk, RATE)
 
-            print("Speech detected" if is_speech else "No speech")  # Debug print
+            if debug:
+                logger.debug("Speech detected" if is_speech else "No speech")
 
             if not triggered:
                 ring_buffer.append((chunk, is_speech))
                 num_voiced = len([f for f, speech in ring_buffer if speech])
                 if num_voiced > 0.9 * ring_buffer.maxlen:
                     triggered = True
-                    print("Speech started")  # Debug print
+                    logger.debug("Speech started")
                     self.frames.extend([f for f, _ in ring_buffer])
                     ring_buffer.clear()
             else:
@@ -72,7 +79,7 @@ class AudioStreamer:
                 num_unvoiced = len([f for f, speech in ring_buffer if not speech])
                 if num_unvoiced > 0.9 * ring_buffer.maxlen:
                     triggered = False
-                    print("Speech ended")  # Debug print
+                    logger.debug("Speech ended")
                     yield b''.join(self.frames)
                     self.frames = []
                     ring_buffer.clear()
@@ -92,14 +99,13 @@ def transcribe_audio(audio_data):
         audio = sr.AudioData(audio_data, RATE, 2)
         # Try to recognize with Google (supports multiple languages)
         text = recognizer.recognize_google(audio, language="hi-IN")  # Change to "en-IN" for Indian English
-        print("Transcription successful")  # Debug print
-        print(f"Transcription: {text}")
+        logger.debug("Transcription: %s", text)
     except sr.UnknownValueError:
         text = "Could not understand audio"
-        print("Transcription failed: Could not understand audio")  # Debug print
+        logger.warning("Transcription failed: Could not understand audio")
     except sr.RequestError as e:
         text = f"Could not request results: {e}"
-        print(f"Transcription failed: {e}")  # Debug print
+        logger.error(f"Transcription failed: {e}")
 
     return text
 
@@ -114,7 +120,7 @@ def continuous_stt():
 
     try:
         for audio_data in audio_streamer.start_recording():
-            print("Processing audio chunk")  # Debug print
+            logger.debug("Processing audio chunk")
             audio_segment = AudioSegment(
                 data=audio_data,
                 sample_width=2,
@@ -126,11 +132,12 @@ def continuous_stt():
     except KeyboardInterrupt:
         print("Stopping STT service.")
     except Exception as e:
-        print(f"An error occurred: {str(e)}")
+        logger.error(f"An error occurred: {str(e)}")
     finally:
         audio_streamer.stop_recording()
         recording_thread.join()
         audio_streamer.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     continuous_stt()
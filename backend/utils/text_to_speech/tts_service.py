@@ -2,7 +2,12 @@
 
 import pyttsx3
 import asyncio
+import os
+import tempfile
+import threading
+import time
 from typing import Optional
+from backend.utils.tracing import tracer
 
 class TTSService:
     def __init__(self, language: str = 'en', gender: str = 'female'):
@@ -11,15 +16,29 @@ class TTSService:
         self.engine = pyttsx3.init()
         voices = self.engine.getProperty('voices')
         self.engine.setProperty('voice', voices[0].id)  # Default voice
+        # One engine for every executor thread; pyttsx3 engines are not safe to drive concurrently
+        self._engine_lock = threading.Lock()
 
     async def synthesize(self, text: str, output_format: str = 'wav') -> Optional[bytes]:
         loop = asyncio.get_event_loop()
-        audio_data = await loop.run_in_executor(None, self._synthesize_sync, text, output_format)
+        with tracer.span("tts.synthesize", chars=len(text)) as span:
+            audio_data = await loop.run_in_executor(None, self._synthesize_sync, text, output_format, span,
+                                                    time.perf_counter())
+            span.set(audio_bytes=len(audio_data))
         return audio_data
 
-    def _synthesize_sync(self, text: str, output_format: str) -> bytes:
-        output_file = f'output.{output_format}'
-        self.engine.save_to_file(text, output_file)
-        self.engine.runAndWait()
-        with open(output_file, 'rb') as f:
-            return f.read()
\ No newline at end of file
+    def _synthesize_sync(self, text: str, output_format: str, span=None, submitted_at: float = None) -> bytes:
+        if span is not None and submitted_at is not None:
+            # Time spent waiting for a free executor thread
+            span.set(queue_wait=time.perf_counter() - submitted_at)
+        # A file per call, so concurrent requests never read each other's audio
+        with tempfile.NamedTemporaryFile(suffix=f'.{output_format}', delete=False) as f:
+            output_file = f.name
+        try:
+            with self._engine_lock:
+                self.engine.save_to_file(text, output_file)
+                self.engine.runAndWait()
+            with open(output_file, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(output_file)
\ No newline at end of file
@@ -0,0 +1,300 @@
+# backend/utils/tracing.py
+
+import asyncio
+import collections
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket bounds in seconds, from tokenization up to a long generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class _NoopSpan:
+    """Returned by Tracer.span() while tracing is off; costs one call and no allocation."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "trace_id", "started_at", "duration", "error",
+                 "_started", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.duration = 0.0
+        self.error = None
+
+    def _link(self):
+        parent = _current_span.get()
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+
+    def __enter__(self):
+        self._link()
+        self.started_at = time.time()
+        self._token = _current_span.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes such as tokens_in, tokens_out or queue_wait; numeric ones are also summed as metrics."""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start": self.started_at, "duration": self.duration, "error": self.error, **self.attrs}
+
+
+class Metrics:
+    """Per-span duration histograms, summed numeric span attributes and callback gauges."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # name -> [per-bucket counts, sum, count]
+        self._histograms: Dict[str, list] = {}
+        self._totals: Dict[tuple, float] = collections.defaultdict(float)
+        self._gauges: Dict[str, tuple] = {}
+        # Spans finish on worker threads as well as on the event loop
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def add(self, name: str, attribute: str, value: float):
+        with self._lock:
+            self._totals[(name, attribute)] += value
+
+    def gauge(self, name: str, read: Callable[[], float], description: str = ""):
+        self._gauges[name] = (read, description)
+
+    def render_prometheus(self) -> str:
+        lines = ["# HELP span_duration_seconds Time spent in each traced stage",
+                 "# TYPE span_duration_seconds histogram"]
+        with self._lock:
+            histograms = {name: (list(counts), total, count) for name, (counts, total, count)
+                          in self._histograms.items()}
+            totals = dict(self._totals)
+        for name, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'span_duration_seconds_sum{{span="{name}"}} {total}')
+            lines.append(f'span_duration_seconds_count{{span="{name}"}} {count}')
+        if totals:
+            lines += ["# HELP span_attribute_total Sum of numeric span attributes (tokens, queue waits)",
+                      "# TYPE span_attribute_total counter"]
+            for (name, attribute), value in sorted(totals.items()):
+                lines.append(f'span_attribute_total{{span="{name}",attribute="{attribute}"}} {value}')
+        for name, (read, description) in sorted(self._gauges.items()):
+            try:
+                value = read()
+            except Exception as e:
+                logger.error(f"Could not read gauge {name}: {str(e)}")
+                continue
+            if description:
+                lines.append(f"# HELP {name} {description}")
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", buffering=64 * 1024)
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Spans and metrics for the request path.
+
+    While `enabled` is false, span() returns a shared no-op and traced()
+    wrappers only check the flag, so instrumentation can stay in hot code.
+    Finished spans feed the duration histograms, are kept in a ring of the
+    last `ring_size`, and go to each exporter. Nesting follows the current
+    context, including into asyncio.to_thread calls.
+    """
+
+    def __init__(self, enabled: bool = False, ring_size: int = 1000, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.metrics = Metrics(buckets)
+        self.exporters: List = []
+        self._recent = collections.deque(maxlen=ring_size)
+
+    def configure(self, enabled: Optional[bool] = None, ring_size: Optional[int] = None,
+                  export_path: Optional[str] = None):
+        if ring_size is not None:
+            self._recent = collections.deque(self._recent, maxlen=ring_size)
+        if export_path:
+            self.exporters.append(JsonLinesExporter(export_path))
+        if enabled is not None:
+            self.enabled = enabled
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, attrs)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator running a function, sync or async, inside a span named after it."""
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    with Span(self, span_name, {}):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with Span(self, span_name, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name: str, seconds: float, **attrs):
+        """Record an interval measured elsewhere, such as a queue wait, as a finished span."""
+        if not self.enabled:
+            return
+        span = Span(self, name, attrs)
+        span._link()
+        span.started_at = time.time() - seconds
+        span.duration = seconds
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        self.metrics.observe(span.name, span.duration)
+        for attribute, value in span.attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.metrics.add(span.name, attribute, value)
+        data = span.to_dict()
+        self._recent.append(data)
+        for exporter in self.exporters:
+            try:
+                exporter.export(data)
+            except Exception as e:
+                logger.error(f"Span export failed: {str(e)}")
+
+    def recent(self, limit: int = 100) -> List[Dict]:
+        spans = list(self._recent)
+        return spans[-limit:] if limit else spans
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+        self.exporters = []
+
+
+tracer = Tracer()
+
+
+class SamplingProfiler:
+    """On-demand wall-clock sampling of every thread's stack.
+
+    Returns collapsed stacks ("root;...;leaf count" per line), the input
+    format of flamegraph.pl and speedscope. Only one profile runs at a time.
+    """
+
+    def __init__(self, max_seconds: float = 30.0):
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005) -> str:
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            counts = self._sample(min(seconds, self.max_seconds), max(interval, 0.001))
+        finally:
+            self._lock.release()
+        return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
+
+    def _sample(self, seconds: float, interval: float) -> collections.Counter:
+        own = threading.get_ident()
+        names = {}
+        counts = collections.Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return counts
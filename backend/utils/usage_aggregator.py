@@ -0,0 +1,219 @@
+# backend/utils/usage_aggregator.py
+
+import asyncio
+import contextvars
+import datetime
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from backend.models.database_models import ServiceMetadata, UsageStat
+
+logger = logging.getLogger(__name__)
+
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+# Rows per INSERT statement, well under SQLite's bound-parameter limit
+UPSERT_CHUNK = 500
+
+UsageKey = Tuple[int, str]
+
+# The user a request is being served for; outbound service calls made while it is set count as their usage
+current_user_id: contextvars.ContextVar = contextvars.ContextVar("current_user_id", default=None)
+
+
+async def ensure_service(session_factory, service_id: str, name: str):
+    """Create the ServiceMetadata row for an internal service if missing, so its usage rows satisfy the foreign key."""
+    async with session_factory() as db:
+        result = await db.execute(select(ServiceMetadata.id).where(ServiceMetadata.service_id == service_id))
+        if result.first() is not None:
+            return
+        db.add(ServiceMetadata(service_id=service_id, name=name, activation_status=True))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another worker created it first
+            await db.rollback()
+
+
+class UsageAggregator:
+    """Write-behind aggregation of UsageStat counters.
+
+    record() only touches an in-memory buffer of (user_id, service_id) ->
+    [count, last_used]. A background task writes the buffer as bulk upserts
+    every `flush_interval` seconds, or sooner once `max_unflushed` increments
+    are waiting, so a crash loses at most that many increments or that much
+    time. The buffer holds at most `max_keys` distinct counters; while the
+    database cannot keep up, increments for new counters beyond that are
+    dropped and counted in stats["dropped"].
+    """
+
+    def __init__(self, session_factory, flush_interval: float = 5.0, max_unflushed: int = 10000,
+                 max_keys: int = 50000):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_unflushed = max_unflushed
+        self.max_keys = max_keys
+        self._buffer: Dict[UsageKey, list] = {}
+        self._unflushed = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {"recorded": 0, "dropped": 0, "flushes": 0, "rows_written": 0, "failed_flushes": 0}
+
+    def record(self, user_id: int, service_id: str, count: int = 1):
+        key = (user_id, service_id)
+        entry = self._buffer.get(key)
+        if entry is None:
+            if len(self._buffer) >= self.max_keys:
+                self.stats["dropped"] += count
+                self._request_flush()
+                return
+            entry = self._buffer[key] = [0, None]
+        entry[0] += count
+        entry[1] = datetime.datetime.utcnow()
+        self.stats["recorded"] += count
+        self._unflushed += count
+        if self._unflushed >= self.max_unflushed:
+            self._request_flush()
+
+    def _request_flush(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write everything still buffered."""
+        if self._task is not None:
+            # Let a flush in progress finish rather than cancelling it part way through a transaction
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"Usage aggregator stopped with {self._unflushed} increments unwritten")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Usage flush failed: {str(e)}")
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._buffer:
+                return
+            pending = self._buffer
+            self._buffer, self._unflushed = {}, 0
+            try:
+                await self._write(pending)
+            except BaseException:
+                self.stats["failed_flushes"] += 1
+                self._restore(pending)
+                raise
+            self.stats["flushes"] += 1
+
+    def _restore(self, pending: Dict[UsageKey, list]):
+        # `pending` holds only the rows _write did not settle; put them back in front of anything recorded
+        # since, within the key bound
+        for key, (count, last_used) in pending.items():
+            entry = self._buffer.get(key)
+            if entry is None:
+                if len(self._buffer) >= self.max_keys:
+                    self.stats["dropped"] += count
+                    continue
+                entry = self._buffer[key] = [0, last_used]
+            entry[0] += count
+            if entry[1] is None or last_used > entry[1]:
+                entry[1] = last_used
+            self._unflushed += count
+
+    def _rows(self, pending: Dict[UsageKey, list]):
+        return [
+            {"user_id": user_id, "service_id": service_id, "usage_count": count, "last_used": last_used,
+             "created_at": last_used, "updated_at": last_used}
+            for (user_id, service_id), (count, last_used) in pending.items()
+        ]
+
+    def _upsert(self, dialect: str, rows):
+        statement = UPSERT_INSERTS[dialect](UsageStat.__table__).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=["user_id", "service_id"],
+            set_={
+                "usage_count": UsageStat.__table__.c.usage_count + statement.excluded.usage_count,
+                "last_used": statement.excluded.last_used,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+
+    async def _write(self, pending: Dict[UsageKey, list]):
+        """Upsert `pending`, taking each row out of it once written or dropped; what is left on failure was not."""
+        rows = self._rows(pending)
+        async with self.session_factory() as db:
+            dialect = db.bind.dialect.name
+            try:
+                for start in range(0, len(rows), UPSERT_CHUNK):
+                    await db.execute(self._upsert(dialect, rows[start:start + UPSERT_CHUNK]))
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+            else:
+                pending.clear()
+                self.stats["rows_written"] += len(rows)
+                return
+            # A counter for a missing user or service fails the whole batch; write rows one by one
+            # so only the bad ones are lost
+            for row in rows:
+                try:
+                    await db.execute(self._upsert(dialect, [row]))
+                    await db.commit()
+                except IntegrityError as e:
+                    await db.rollback()
+                    self.stats["dropped"] += row["usage_count"]
+                    logger.error(f"Dropped usage for user {row['user_id']} on {row['service_id']}: {str(e)}")
+                else:
+                    self.stats["rows_written"] += 1
+                pending.pop((row["user_id"], row["service_id"]))
+
+    async def get_usage(self, db, user_id: int, service_id: Optional[str] = None) -> Dict[str, Dict]:
+        """Stored counters for a user merged with increments not yet written."""
+        query = select(UsageStat.service_id, UsageStat.usage_count, UsageStat.last_used).where(
+            UsageStat.user_id == user_id)
+        if service_id is not None:
+            query = query.where(UsageStat.service_id == service_id)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Reading under the flush lock keeps a batch from being counted both in the DB and the buffer
+        async with self._lock:
+            result = await db.execute(query)
+            usage = {row.service_id: {"usage_count": row.usage_count or 0, "last_used": row.last_used}
+                     for row in result}
+            if service_id is not None:
+                buffered = [((user_id, service_id), self._buffer[(user_id, service_id)])] \
+                    if (user_id, service_id) in self._buffer else []
+            else:
+                buffered = [(key, value) for key, value in self._buffer.items() if key[0] == user_id]
+            for (_, buffered_service), (count, last_used) in buffered:
+                entry = usage.setdefault(buffered_service, {"usage_count": 0, "last_used": None})
+                entry["usage_count"] += count
+                if entry["last_used"] is None or last_used > entry["last_used"]:
+                    entry["last_used"] = last_used
+        return usage
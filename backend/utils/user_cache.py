@@ -0,0 +1,191 @@
+# backend/utils/user_cache.py
+
+import datetime
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cachetools import LRUCache, TTLCache
+from sqlalchemy import DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from backend.models.database_models import User
+from backend.services.service_clients.response_cache import SingleFlight
+
+
+class InMemorySharedCache:
+    """Process-local stand-in for a shared cache such as Redis.
+
+    Implements the same small async get/set/delete interface as
+    RedisSharedCache, so tests and single-process deployments can run without
+    a cache server.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+
+class RedisSharedCache:
+    """Shared cache on a Redis server; requires the `redis` package."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self.client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+
+def make_shared_cache(url: Optional[str]):
+    if not url:
+        return None
+    if url == "memory://":
+        return InMemorySharedCache()
+    return RedisSharedCache(url)
+
+
+# The password hash never leaves the database; merged cache hits leave it unloaded
+_USER_COLUMNS = [column for column in User.__table__.columns if column.key != "password_hash"]
+
+
+def user_to_dict(user: User) -> Dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in _USER_COLUMNS}
+
+
+def _encode(data: Dict[str, Any]) -> str:
+    return json.dumps({key: value.isoformat() if isinstance(value, datetime.datetime) else value
+                       for key, value in data.items()})
+
+
+def _decode(encoded: str) -> Dict[str, Any]:
+    data = json.loads(encoded)
+    for column in _USER_COLUMNS:
+        if isinstance(column.type, DateTime) and data.get(column.key):
+            data[column.key] = datetime.datetime.fromisoformat(data[column.key])
+    return data
+
+
+class UserCache:
+    """Authenticated-user cache keyed by token subject (the username).
+
+    Entries are plain column values, not ORM instances, so no instance is
+    shared between sessions: a hit is rebuilt as a detached User and merged
+    into the caller's session without a SELECT. The password hash is not
+    cached: returned users have password_hash set to None rather than left
+    unloaded (reading an unloaded column would try lazy IO in the async
+    session), so code checking a password must load the user itself.
+    Concurrent misses for one user share a single load, run in a session of
+    its own from `session_factory` when one is given, so a caller that gives
+    up does not close the session under the others. The local layer is a bounded TTL cache; the
+    optional shared layer lets workers reuse each other's lookups. Writes
+    through update_user_profile and delete_user invalidate both layers, but
+    other workers' local layers only notice after `ttl`.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000, shared=None, prefix: str = "auth:user:",
+                 session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self.ttl = ttl
+        self.shared = shared
+        self.prefix = prefix
+        self.session_factory = session_factory
+        self._local = TTLCache(maxsize=max_size, ttl=ttl)
+        self._loads = SingleFlight()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get(self, db: AsyncSession, username: str,
+                  load: Callable[[AsyncSession, str], Awaitable[Optional[User]]]) -> Optional[User]:
+        """Return the user attached to `db`, calling `load(db, username)` on a miss."""
+        data = self._local.get(username)
+        if data is not None:
+            self.stats["hits"] += 1
+        elif self.shared is not None:
+            encoded = await self.shared.get(self.prefix + username)
+            if encoded is not None:
+                data = _decode(encoded)
+                self._local[username] = data
+                self.stats["shared_hits"] += 1
+        if data is None:
+            self.stats["misses"] += 1
+            data = await self._loads.do(username, lambda: self._load(db, username, load))
+            if data is None:
+                return None
+        user = User(**data)
+        make_transient_to_detached(user)
+        user = await db.merge(user, load=False)
+        set_committed_value(user, "password_hash", None)
+        return user
+
+    async def _load(self, db: AsyncSession, username: str, load) -> Optional[Dict[str, Any]]:
+        invalidations = self.stats["invalidations"]
+        if self.session_factory is not None:
+            async with self.session_factory() as session:
+                user = await load(session, username)
+        else:
+            user = await load(db, username)
+        if user is None:
+            return None
+        data = user_to_dict(user)
+        # A write that landed while loading may have made this row stale; serve it but do not cache it
+        if self.stats["invalidations"] == invalidations:
+            self._local[username] = data
+            if self.shared is not None:
+                await self.shared.set(self.prefix + username, _encode(data), self.ttl)
+        return data
+
+    async def invalidate(self, username: str):
+        self._local.pop(username, None)
+        if self.shared is not None:
+            await self.shared.delete(self.prefix + username)
+        self.stats["invalidations"] += 1
+
+
+class TokenCache:
+    """Memoizes verified token payloads until the token's own expiry.
+
+    Only successful decodes are stored, so an invalid token is re-checked
+    (and rejected) every time.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self._payloads = LRUCache(maxsize=max_size)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def decode(self, token: str, decoder: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        entry = self._payloads.get(token)
+        if entry is not None:
+            payload, expires_at = entry
+            if expires_at > time.time():
+                self.stats["hits"] += 1
+                return payload
+            self._payloads.pop(token, None)
+        self.stats["misses"] += 1
+        payload = decoder(token)
+        expires_at = payload.get("exp")
+        if expires_at is not None:
+            self._payloads[token] = (payload, float(expires_at))
+        return payload
@@ -0,0 +1,156 @@
+# scripts/benchmarks/bench_auth_db.py
+#
+# Concurrent register/login load against the auth endpoints, comparing the
+# previous blocking ORM calls on the event loop (default sync SQLite engine)
+# with the async engine and sessions from database.database.
+#
+# bcrypt is turned down to its minimum cost (BCRYPT_ROUNDS=4) by default so
+# the numbers reflect the database path rather than password hashing.
+#
+# Usage: python scripts/benchmarks/bench_auth_db.py --users 200 --logins 4 --concurrency 50
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+DB_DIR = tempfile.TemporaryDirectory()
+# The engines and the password hasher read their settings at import time
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DB_DIR.name, 'async.db')}"
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.models.database_models import User
+from backend.utils import auth_manager
+from database.database import Base, async_engine, get_async_session, init_models
+
+
+def blocking_app():
+    """The auth endpoints as they were: sync sessions used from async handlers."""
+    engine = create_engine(f"sqlite:///{os.path.join(DB_DIR.name, 'sync.db')}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=int(os.environ['BCRYPT_ROUNDS']))
+    app = FastAPI()
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.post("/register")
+    async def register(username: str, email: str, password: str, db: Session = Depends(get_db)):
+        user = User(username=username, email=email, password_hash=pwd_context.hash(password))
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return {"id": user.id, "username": user.username, "email": user.email}
+
+    @app.post("/login")
+    async def login(username: str, password: str, db: Session = Depends(get_db)):
+        user = db.query(User).filter(User.username == username).first()
+        if not user or not pwd_context.verify(password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Incorrect username or password")
+        return {"access_token": auth_manager.create_access_token(data={"sub": user.username})}
+
+    return app
+
+
+def async_app():
+    app = FastAPI()
+
+    @app.post("/register")
+    async def register(username: str, email: str, password: str, db: AsyncSession = Depends(get_async_session)):
+        user = await auth_manager.register_user(db, username, email, password)
+        return {"id": user.id, "username": user.username, "email": user.email}
+
+    @app.post("/login")
+    async def login(username: str, password: str, db: AsyncSession = Depends(get_async_session)):
+        user = await auth_manager.authenticate_user(db, username, password)
+        return {"access_token": auth_manager.create_access_token(data={"sub": user.username})}
+
+    return app
+
+
+async def monitor_loop_lag(lags, interval=0.005):
+    """Record how late the event loop wakes a sleeping task; blocking calls show up as large lags."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_load(app, users, logins, concurrency):
+    latencies = []
+    lags = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call(path, params):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(path, params=params)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        async def user_session(i):
+            credentials = {"username": f"user{i:05d}", "password": "correct horse battery"}
+            await call("/register", {**credentials, "email": f"user{i:05d}@example.com"})
+            for _ in range(logins):
+                await call("/login", credentials)
+
+        monitor = asyncio.create_task(monitor_loop_lag(lags))
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(i) for i in range(users)))
+        elapsed = time.perf_counter() - started
+        monitor.cancel()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_lag_ms": max(lags, default=0) * 1000,
+    }
+
+
+async def main(args):
+    await init_models()
+    try:
+        for name, app in (("blocking sync", blocking_app()), ("async engine", async_app())):
+            result = await run_load(app, args.users, args.logins, args.concurrency)
+            print(f"{name:>14}: {result['requests']} requests ({result['failures']} failed), "
+                  f"{result['rps']:7.1f} req/s, p50 {result['p50_ms']:6.1f} ms, p99 {result['p99_ms']:6.1f} ms, "
+                  f"max loop stall {result['max_lag_ms']:5.1f} ms")
+    finally:
+        auth_manager.password_hasher.shutdown()
+        await async_engine.dispose()
+        DB_DIR.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent register/login load test")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=4, help="Logins per registered user")
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,137 @@
+# scripts/benchmarks/bench_brain_pipeline.py
+#
+# Stage work per input for the brain path, with stub stages that block for a
+# fixed time (standing in for the model, the scorers, spaCy and TTS) and
+# count their calls. Compares the previous flow, which generated on the event
+# loop and ran the full analyzer twice (inside LLamaBrain and again in
+# main.py), with BrainPipeline. Also shows TTS and routing being skipped by
+# flags and a caller reusing an earlier generation. A ticker measures how
+# long the event loop is stalled while inputs run concurrently.
+#
+# Usage: python scripts/benchmarks/bench_brain_pipeline.py --inputs 20 --concurrency 4
+
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.core.main_brain.brain_pipeline import Analysis, BrainPipeline, Routing
+
+calls = collections.Counter()
+COSTS = {"generate": 0.040, "score": 0.020, "filter": 0.005, "route": 0.010, "synthesize": 0.015}
+
+
+def work(stage):
+    calls[stage] += 1
+    time.sleep(COSTS[stage])
+
+
+class StubTTS:
+    async def synthesize(self, text):
+        await asyncio.to_thread(work, "synthesize")
+        return b"RIFF"
+
+
+class StubBrain:
+    def generate(self, text):
+        work("generate")
+        return f"An answer about {text}"
+
+    async def process_input(self, text):
+        return await asyncio.to_thread(self.generate, text)
+
+    def remember(self, text, response):
+        pass
+
+
+class StubAnalyzer:
+    tts_service = StubTTS()
+
+    def score(self, user_input, output):
+        work("score")
+        relevant = not user_input.startswith("route")
+        return Analysis(0.9, 0.9, 0.9, 0.9, 0.9 if relevant else 0.1, relevant)
+
+    def filter_output(self, output):
+        work("filter")
+        return output
+
+    def classify_route(self, user_input):
+        work("route")
+        return Routing("general_knowledge", {"general_knowledge": 1.0})
+
+    async def analyze_output(self, user_input, output):
+        # The previous all-in-one call: score, filter and synthesize
+        analysis = self.score(user_input, output)
+        filtered = self.filter_output(output) if analysis.is_relevant else None
+        audio = await self.tts_service.synthesize(filtered) if filtered else None
+        return analysis.is_relevant, analysis.confidence, filtered, audio
+
+
+async def previous_flow(brain, analyzer, text):
+    # LLamaBrain.process_input generated on the loop and analyzed; main.py then analyzed the result again
+    generated = brain.generate(text)
+    relevant, _, _, _ = await analyzer.analyze_output(text, generated)
+    if not relevant:
+        analyzer.classify_route(text)
+    relevant, _, filtered, audio = await analyzer.analyze_output(text, generated)
+    if not relevant:
+        analyzer.classify_route(text)
+    return filtered
+
+
+async def measure(name, handle, inputs, concurrency):
+    calls.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            due = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - due)
+
+    async def one(text):
+        async with semaphore:
+            await handle(text)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(text) for text in inputs))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    per_input = {stage: round(count / len(inputs), 2) for stage, count in sorted(calls.items())}
+    print(f"{name:>22}: {len(inputs)} inputs in {elapsed:.2f}s, loop stall max {max(stalls) * 1000:5.0f} ms, "
+          f"stage calls per input {per_input}")
+
+
+async def main(args):
+    brain, analyzer = StubBrain(), StubAnalyzer()
+    pipeline = BrainPipeline(brain, analyzer)
+    # Every fifth input is judged not relevant and routed
+    inputs = [f"route {i}" if i % 5 == 4 else f"question {i}" for i in range(args.inputs)]
+
+    await measure("previous flow", lambda text: previous_flow(brain, analyzer, text), inputs, args.concurrency)
+    await measure("pipeline", pipeline.run, inputs, args.concurrency)
+    await measure("pipeline, no TTS", lambda text: pipeline.run(text, synthesize=False), inputs, args.concurrency)
+    await measure("pipeline, no TTS/route",
+                  lambda text: pipeline.run(text, synthesize=False, route=False), inputs, args.concurrency)
+
+    first = await pipeline.run(inputs[0], synthesize=False)
+    calls.clear()
+    again = await pipeline.run(inputs[0], generated=first.generated, analysis=first.analysis)
+    print(f"{'reuse earlier stages':>22}: stage calls {dict(calls)}, timings "
+          f"{ {stage: round(seconds * 1000, 1) for stage, seconds in again.timings.items()} } ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage calls and loop stalls for the brain pipeline")
+    parser.add_argument("--inputs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
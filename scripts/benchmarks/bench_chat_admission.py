@@ -0,0 +1,129 @@
+# scripts/benchmarks/bench_chat_admission.py
+#
+# Open-loop /chat load above model capacity against a stub model that serves
+# `--capacity` requests at a time in `--service-ms` each. Compares unbounded
+# queueing on the model (every request waits its turn) with ChatAdmission:
+# a global in-flight cap, a bounded priority queue with a wait deadline and a
+# per-user limit. One greedy user sends a burst alongside normal users, and a
+# share of the traffic is marked background.
+#
+# Usage: python scripts/benchmarks/bench_chat_admission.py --rate 40 --seconds 5 --capacity 2 --service-ms 100
+
+import argparse
+import asyncio
+import collections
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.utils.chat_admission import ChatAdmission, Shed
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+
+def build_app(capacity, service_time, admission=None):
+    from fastapi import FastAPI, Header, HTTPException
+    from pydantic import BaseModel
+
+    model = asyncio.Semaphore(capacity)
+    app = FastAPI()
+
+    class ChatRequest(BaseModel):
+        message: str
+        priority: str = "interactive"
+
+    async def run_model():
+        async with model:
+            await asyncio.sleep(service_time)
+
+    @app.post("/chat")
+    async def chat(chat_request: ChatRequest, x_user: str = Header(...)):
+        if admission is None:
+            await run_model()
+            return {"response": chat_request.message}
+        try:
+            async with admission.slot(x_user, chat_request.priority):
+                await run_model()
+        except Shed as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e),
+                                headers={"Retry-After": e.retry_after_header})
+        return {"response": chat_request.message}
+
+    return app
+
+
+async def offer_load(app, rate, seconds, background_share, greedy_burst, seed):
+    import httpx
+
+    rng = random.Random(seed)
+    results = collections.defaultdict(list)
+    retry_after = []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(user, priority):
+            started = time.perf_counter()
+            response = await client.post("/chat", json={"message": "hi", "priority": priority},
+                                         headers={"X-User": user})
+            results[(priority, response.status_code)].append(time.perf_counter() - started)
+            if "Retry-After" in response.headers:
+                retry_after.append(int(response.headers["Retry-After"]))
+
+        tasks = [asyncio.create_task(one("greedy", "interactive")) for _ in range(greedy_burst)]
+        started = time.perf_counter()
+        for i in range(int(rate * seconds)):
+            # Evenly spaced arrivals, one request per user
+            await asyncio.sleep(max(0.0, started + i / rate - time.perf_counter()))
+            priority = "background" if rng.random() < background_share else "interactive"
+            tasks.append(asyncio.create_task(one(f"user{i}", priority)))
+        await asyncio.gather(*tasks)
+    return results, retry_after
+
+
+def report(name, results, retry_after, admission=None):
+    print(f"{name}:")
+    for (priority, status), latencies in sorted(results.items()):
+        print(f"  {priority:>11} {status}: {len(latencies):4d}  p50 {percentile(latencies, 0.5):7.0f} ms  "
+              f"p99 {percentile(latencies, 0.99):7.0f} ms  max {max(latencies) * 1000:7.0f} ms")
+    if retry_after:
+        print(f"  Retry-After values {dict(sorted(collections.Counter(retry_after).items()))}")
+    if admission is not None:
+        metrics = admission.metrics()
+        print(f"  wait p50 {metrics['wait_p50'] * 1000:.0f} ms p99 {metrics['wait_p99'] * 1000:.0f} ms, "
+              f"service avg {(metrics['service_time_avg'] or 0) * 1000:.0f} ms, "
+              f"final depth {metrics['queue_depth']}, in flight {metrics['in_flight']}")
+        print(f"  {admission.stats}")
+
+
+async def main(args):
+    service_time = args.service_ms / 1000
+    unbounded = build_app(args.capacity, service_time)
+    report("unbounded queueing", *await offer_load(unbounded, args.rate, args.seconds, args.background,
+                                                   args.greedy, args.seed))
+
+    admission = ChatAdmission(max_in_flight=args.capacity, max_queue=args.max_queue, max_per_user=args.per_user,
+                              queue_timeout=args.queue_timeout)
+    admitted = build_app(args.capacity, service_time, admission)
+    report("chat admission", *await offer_load(admitted, args.rate, args.seconds, args.background,
+                                               args.greedy, args.seed), admission)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/chat latency and shedding above model capacity")
+    parser.add_argument("--rate", type=float, default=40, help="Offered requests per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--capacity", type=int, default=2, help="Concurrent model runs")
+    parser.add_argument("--service-ms", type=float, default=100)
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--per-user", type=int, default=2)
+    parser.add_argument("--queue-timeout", type=float, default=1.0)
+    parser.add_argument("--background", type=float, default=0.3, help="Share of background requests")
+    parser.add_argument("--greedy", type=int, default=20, help="Simultaneous requests from one user")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+# scripts/benchmarks/bench_credential_cache.py
+#
+# Outbound calls through a BaseServiceClient against a local stub server,
+# comparing a naive integration path (query ServiceMetadata and
+# ServiceCredential, then parse credential_data, before every call) with the
+# CredentialCache. Counts database queries per call, then rotates one
+# credential and deactivates one service to show the background refresh
+# picking both up without any outbound call touching the database.
+#
+# Usage: python scripts/benchmarks/bench_credential_cache.py --services 50 --calls 2000
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+DB_DIR = tempfile.TemporaryDirectory()
+# Settings are read at import time
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DB_DIR.name, 'services.db')}"
+
+from aiohttp import web
+from sqlalchemy import event, select, update
+
+from backend.models.database_models import ServiceCredential, ServiceMetadata
+from backend.services.service_clients.base_client import BaseServiceClient
+from backend.services.service_clients.credential_cache import (
+    CredentialCache, ServiceUnavailable, parse_credential_data
+)
+from backend.services.service_clients.session_pool import session_pool
+from database.database import AsyncSessionLocal, async_engine, init_models
+
+queries = {"count": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    queries["count"] += 1
+
+
+class StubClient(BaseServiceClient):
+    async def request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._make_request(method, f"{self.base_url}{endpoint}", data)
+
+
+async def start_stub_server():
+    seen = []
+
+    async def handle(request):
+        seen.append(request.headers["Authorization"])
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/ping", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", seen
+
+
+async def seed(count):
+    await init_models()
+    async with AsyncSessionLocal() as db:
+        db.add_all(ServiceMetadata(service_id=f"svc{i:03d}", name=f"Service {i}", activation_status=i % 5 != 4)
+                   for i in range(count))
+        await db.flush()
+        db.add_all(ServiceCredential(service_id=f"svc{i:03d}", credential_data=json.dumps({"api_key": f"key-{i}"}))
+                   for i in range(count))
+        await db.commit()
+
+
+async def naive_api_key(service_id):
+    # Look up the service and its credential on every call
+    async with AsyncSessionLocal() as db:
+        service = (await db.execute(select(ServiceMetadata).where(
+            ServiceMetadata.service_id == service_id))).scalar_one()
+        if not service.activation_status:
+            raise ServiceUnavailable(service_id)
+        credential = (await db.execute(select(ServiceCredential).where(
+            ServiceCredential.service_id == service_id).order_by(ServiceCredential.id.desc()))).scalars().first()
+        return parse_credential_data(credential.credential_data)["api_key"]
+
+
+async def run(name, base_url, service_ids, calls, concurrency, key_for=None, cache=None):
+    clients = {service_id: StubClient(base_url, None, service_id=service_id, credential_cache=cache)
+               for service_id in service_ids}
+    semaphore = asyncio.Semaphore(concurrency)
+    queries["count"] = 0
+
+    async def one(i):
+        client = clients[service_ids[i % len(service_ids)]]
+        async with semaphore:
+            if key_for is not None:
+                client.api_key = await key_for(client.service_id)
+            await client.request("GET", "/ping")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>16}: {calls} calls in {elapsed:.2f}s ({calls / elapsed:6.0f} calls/s), "
+          f"{queries['count']} queries ({queries['count'] / calls:.2f} per call)")
+
+
+async def main(args):
+    await seed(args.services)
+    runner, base_url, seen = await start_stub_server()
+    cache = CredentialCache(AsyncSessionLocal, refresh_interval=args.refresh_interval)
+    try:
+        queries["count"] = 0
+        await cache.start()
+        print(f"{'startup load':>16}: {len(cache._entries)} active services, {queries['count']} queries, "
+              f"{cache.stats['decrypted']} decrypts")
+        active = sorted(cache._entries)
+
+        await run("naive lookups", base_url, active, args.calls, args.concurrency, key_for=naive_api_key)
+        await run("credential cache", base_url, active, args.calls, args.concurrency, cache=cache)
+        print(f"{'':>16}  cache stats {cache.stats}")
+
+        rotated, deactivated = active[0], active[1]
+        async with AsyncSessionLocal() as db:
+            db.add(ServiceCredential(service_id=rotated, credential_data=json.dumps({"api_key": "rotated"})))
+            await db.execute(update(ServiceMetadata).where(ServiceMetadata.service_id == deactivated)
+                             .values(activation_status=False))
+            await db.commit()
+        await asyncio.sleep(args.refresh_interval * 1.5)
+
+        queries["count"] = 0
+        seen.clear()
+        await StubClient(base_url, None, service_id=rotated, credential_cache=cache).request("GET", "/ping")
+        try:
+            await StubClient(base_url, None, service_id=deactivated, credential_cache=cache).request("GET", "/ping")
+            blocked = False
+        except ServiceUnavailable:
+            blocked = True
+        print(f"{'after refresh':>16}: rotated key sent {seen == ['Bearer rotated']}, "
+              f"deactivated service refused {blocked}, {queries['count']} queries on the call path, "
+              f"{cache.stats['decrypted']} decrypts in total")
+    finally:
+        await cache.stop()
+        await session_pool.close_all()
+        await runner.cleanup()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call credential lookups against the in-memory cache")
+    parser.add_argument("--services", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--refresh-interval", type=float, default=0.5)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    finally:
+        DB_DIR.cleanup()
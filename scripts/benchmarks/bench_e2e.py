@@ -0,0 +1,341 @@
+# scripts/benchmarks/bench_e2e.py
+#
+# End-to-end throughput of the three request paths, with the stub backends
+# from stub_backends.py standing in for the models, the microphone and the
+# remote APIs:
+#
+#   text   ChatAdmission + BrainPipeline, as POST /chat runs them
+#   voice  InputProcessor over a fake audio source, the stub recognizer and
+#          then BrainPipeline, as the voice console does
+#   web    search_and_summarize + merge_summaries against stub search, page
+#          and LLM servers
+#
+# Each path runs at every `--concurrency` level. Request latency percentiles
+# and throughput come from the driver; the per-stage breakdown comes from the
+# tracer's spans, with the peak RSS sampled while each stage was running.
+# `--output` writes the report as JSON; `--compare` prints the change from an
+# earlier report, so two commits can be diffed:
+#
+#   python scripts/benchmarks/bench_e2e.py --output before.json
+#   git checkout <other> && python scripts/benchmarks/bench_e2e.py --compare before.json
+#
+# Usage: python scripts/benchmarks/bench_e2e.py --scenarios text,voice,web --concurrency 1,4 --requests 24
+
+import argparse
+import asyncio
+import bisect
+import collections
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_backends import (FakeAudioSource, StubAnalyzer, StubBrain, TinyLM, enhance_pcm, http_transcriber,
+                           start_stub_servers, tiny_lm_weights)
+from backend.core.input_handler.input_processor import InputProcessor
+from backend.core.main_brain.brain_pipeline import BrainPipeline
+from backend.utils.tracing import tracer
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+REQUEST_SPANS = {"text": "chat", "voice": "input.voice", "web": "web.query"}
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+class RssSampler(threading.Thread):
+    """Samples resident memory every `interval` seconds, for the peak during any time range."""
+
+    def __init__(self, interval=0.005):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.times, self.values = [], []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            # Appended in this order, so a reader sees values at least as long as times
+            self.values.append(rss_bytes())
+            self.times.append(time.time())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def peak(self, start, end):
+        times = self.times
+        low = bisect.bisect_left(times, start)
+        high = bisect.bisect_right(times, end)
+        # A range shorter than the interval takes the nearest sample after it started
+        window = self.values[low:max(high, low + 1)]
+        return max(window) if window else rss_bytes()
+
+
+def percentiles_ms(seconds):
+    if not seconds:
+        return {"p50": None, "p90": None, "p99": None, "max": None, "mean": None}
+    values = np.array(seconds) * 1000
+    return {"p50": round(float(np.percentile(values, 50)), 3), "p90": round(float(np.percentile(values, 90)), 3),
+            "p99": round(float(np.percentile(values, 99)), 3), "max": round(float(values.max()), 3),
+            "mean": round(float(values.mean()), 3)}
+
+
+def megabytes(value):
+    return round(value / 2 ** 20, 1)
+
+
+def stage_report(spans, sampler):
+    stages = {}
+    for span in spans:
+        stages.setdefault(span["name"], []).append(span)
+    report = {}
+    for name, group in sorted(stages.items()):
+        durations = [span["duration"] for span in group]
+        peak = max(sampler.peak(span["start"], span["start"] + span["duration"]) for span in group)
+        report[name] = {"count": len(group), "latency_ms": percentiles_ms(durations),
+                        "total_ms": round(sum(durations) * 1000, 3), "peak_rss_mb": megabytes(peak),
+                        "errors": sum(1 for span in group if span["error"])}
+        for attribute in ("tokens_in", "tokens_out"):
+            values = [span[attribute] for span in group if isinstance(span.get(attribute), (int, float))]
+            if values:
+                report[name][attribute] = sum(values)
+    return report
+
+
+async def closed_loop(requests, concurrency, handle):
+    """`concurrency` clients each send their next request as soon as the previous one returns."""
+    pending = iter(range(requests))
+    errors = []
+
+    async def client():
+        for index in pending:
+            try:
+                await handle(index)
+            except Exception as e:
+                errors.append(type(e).__name__)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return errors
+
+
+def text_input(index):
+    # Every fifth input is judged not relevant and routed
+    return f"route question {index}" if index % 5 == 4 else f"tell me about the river bank number {index}"
+
+
+def text_scenario(pipeline, admission):
+    async def handle(index):
+        with tracer.span("chat", priority="interactive") as span:
+            async with admission.slot(f"user{index}", "interactive") as queue_wait:
+                span.set(queue_wait=queue_wait)
+                await pipeline.run(text_input(index))
+    return handle
+
+
+async def voice_scenario(pipeline, transcriber, requests, concurrency, args):
+    """One InputProcessor per client, each with its own fake microphone."""
+    async def callback(transcription):
+        if not transcription:
+            # Fails the utterance's span; as in production, the processor then stops listening
+            raise ValueError("no transcription")
+        await pipeline.run(transcription)
+
+    processors = []
+    for client in range(concurrency):
+        utterances = requests // concurrency + (1 if client < requests % concurrency else 0)
+        source = FakeAudioSource(utterances, args.utterance_seconds, realtime=args.realtime, seed=client)
+        processors.append(InputProcessor(audio_source=source, enhancer=enhance_pcm, transcriber=transcriber))
+    await asyncio.gather(*(processor.process_voice_input(callback) for processor in processors))
+    # process_voice_input logs errors instead of raising; they show up as failed spans
+    return []
+
+
+def web_scenario(web_driver, run_id, pages, deadline):
+    async def handle(index):
+        query = f"quick brown fox {run_id} {index}"
+        with tracer.span("web.query"):
+            summaries = [summary async for summary in
+                         web_driver.search_and_summarize(query, num_results=pages, deadline=deadline)]
+            answer = await web_driver.merge_summaries(summaries, query)
+            if not answer:
+                raise RuntimeError("empty answer")
+    return handle
+
+
+async def run_scenario(name, concurrency, requests, drive, sampler):
+    await asyncio.sleep(0.05)
+    rss_start = rss_bytes()
+    started_at = time.time()
+    started = time.perf_counter()
+    errors = await drive()
+    elapsed = time.perf_counter() - started
+    spans = [span for span in tracer.recent(0) if span["start"] >= started_at]
+    latencies = [span["duration"] for span in spans if span["name"] == REQUEST_SPANS[name] and not span["error"]]
+    stages = stage_report(spans, sampler)
+    stages.pop(REQUEST_SPANS[name], None)
+    completed = len(latencies)
+    result = {
+        "concurrency": concurrency, "requests": requests, "completed": completed,
+        # A failed request may not have reached the point where it raises (a voice client stops at its first error)
+        "errors": requests - completed, "error_types": dict(collections.Counter(errors)),
+        "seconds": round(elapsed, 3), "throughput_rps": round(completed / elapsed, 3),
+        "latency_ms": percentiles_ms(latencies),
+        "rss_mb": {"start": megabytes(rss_start), "peak": megabytes(sampler.peak(started_at, time.time())),
+                   "end": megabytes(rss_bytes())},
+        "stages": stages,
+    }
+    latency = result["latency_ms"]
+    print(f"{name}/c{concurrency}: {completed}/{requests} in {elapsed:.2f}s, {result['throughput_rps']:.1f} req/s, "
+          f"p50 {latency['p50']} ms p99 {latency['p99']} ms, peak RSS {result['rss_mb']['peak']} MB")
+    return result
+
+
+def git_revision():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(old, new):
+    def change(before, after):
+        if before in (None, 0) or after is None:
+            return "      n/a"
+        return f"{(after - before) / before * 100:+8.1f}%"
+
+    print(f"compared with {old['meta'].get('commit')} ({old['meta'].get('timestamp')}):")
+    for key, scenario in new["scenarios"].items():
+        previous = old["scenarios"].get(key)
+        if previous is None:
+            continue
+        print(f"  {key}: throughput {change(previous['throughput_rps'], scenario['throughput_rps'])}  "
+              f"p50 {change(previous['latency_ms']['p50'], scenario['latency_ms']['p50'])}  "
+              f"p99 {change(previous['latency_ms']['p99'], scenario['latency_ms']['p99'])}  "
+              f"peak RSS {change(previous['rss_mb']['peak'], scenario['rss_mb']['peak'])}")
+        for stage, stats in scenario["stages"].items():
+            before = previous["stages"].get(stage)
+            if before is not None:
+                print(f"    {stage:>24} p50 {change(before['latency_ms']['p50'], stats['latency_ms']['p50'])}  "
+                      f"p99 {change(before['latency_ms']['p99'], stats['latency_ms']['p99'])}")
+
+
+async def main(args):
+    logging.basicConfig(level=logging.WARNING)
+    tracer.configure(enabled=True, ring_size=args.ring_size)
+    sampler = RssSampler()
+    sampler.start()
+
+    runner, base_url = await start_stub_servers(args.pages, args.page_delay, args.llm_delay, args.stt_delay,
+                                                args.seed)
+    cache_dir = tempfile.TemporaryDirectory()
+    # Endpoints, keys and the web cache are read from the environment when the modules below are imported
+    os.environ['GOOGLE_SEARCH_URL'] = f"{base_url}/customsearch/v1"
+    os.environ['GOOGLE_API_KEY'] = "stub-key"
+    os.environ['GOOGLE_CSE_ID'] = "stub-cse"
+    os.environ['GROQ_BASE_URL'] = base_url
+    os.environ['GROQ_API_KEYS'] = "stub-key-0,stub-key-1"
+    # The stub LLM has no quota; the default per-key budget would turn the web path into a rate limit test
+    os.environ.setdefault('GROQ_REQUESTS_PER_MINUTE', '100000')
+    os.environ.setdefault('GROQ_TOKENS_PER_MINUTE', '100000000')
+    os.environ['WEB_CACHE_PATH'] = os.path.join(cache_dir.name, 'web_cache.db')
+    from backend.config.settings import get_settings
+    from backend.services.service_clients.session_pool import session_pool
+    from backend.utils.chat_admission import ChatAdmission
+
+    settings = get_settings()
+    model = TinyLM(tiny_lm_weights(args.vocab, args.dim, args.layers, args.seed))
+    pipeline = BrainPipeline(StubBrain(model, args.tokens), StubAnalyzer())
+    transcriber = http_transcriber(session_pool.get_session, f"{base_url}/stt")
+    web_driver = None
+    if "web" in args.scenarios:
+        from backend.services.service_integrations import web_driver
+        # web_driver configures INFO logging for the whole process on import
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = {
+        "meta": {"commit": None, "dirty": None, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                 "python": platform.python_version(), "numpy": np.__version__, "cpus": os.cpu_count(),
+                 "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")}},
+        "scenarios": {},
+    }
+    report["meta"]["commit"], report["meta"]["dirty"] = git_revision()
+    try:
+        for concurrency in args.concurrency:
+            for name in args.scenarios:
+                if name == "text":
+                    admission = ChatAdmission(max_in_flight=settings.CHAT_MAX_IN_FLIGHT,
+                                              max_queue=settings.CHAT_MAX_QUEUE,
+                                              max_per_user=settings.CHAT_MAX_PER_USER,
+                                              queue_timeout=settings.CHAT_QUEUE_TIMEOUT)
+                    handle = text_scenario(pipeline, admission)
+                    drive = lambda: closed_loop(args.requests, concurrency, handle)
+                elif name == "voice":
+                    drive = lambda: voice_scenario(pipeline, transcriber, args.requests, concurrency, args)
+                else:
+                    handle = web_scenario(web_driver, f"c{concurrency}", args.pages, args.deadline)
+                    drive = lambda: closed_loop(args.requests, concurrency, handle)
+                report["scenarios"][f"{name}/c{concurrency}"] = await run_scenario(
+                    name, concurrency, args.requests, drive, sampler)
+    finally:
+        await session_pool.close_all()
+        await runner.cleanup()
+        if web_driver is not None:
+            web_driver.web_cache.close()
+        cache_dir.cleanup()
+        sampler.stop()
+
+    report["meta"]["max_rss_mb"] = megabytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        print(f"report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+
+
+def csv(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency, throughput and RSS of the text, voice and web paths")
+    parser.add_argument("--scenarios", type=csv(str), default=["text", "voice", "web"])
+    parser.add_argument("--concurrency", type=csv(int), default=[1, 4], help="Comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=24, help="Requests per scenario and concurrency level")
+    parser.add_argument("--tokens", type=int, default=48, help="Tokens generated per input")
+    parser.add_argument("--vocab", type=int, default=4096)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--utterance-seconds", type=float, default=2.0)
+    parser.add_argument("--realtime", action="store_true", help="Pace the fake microphone at real time")
+    parser.add_argument("--pages", type=int, default=3, help="Search results per web query")
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--page-delay", type=float, default=0.05)
+    parser.add_argument("--llm-delay", type=float, default=0.1)
+    parser.add_argument("--stt-delay", type=float, default=0.1)
+    parser.add_argument("--ring-size", type=int, default=200000, help="Spans kept for the per-stage report")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--compare", help="Print changes against an earlier JSON report")
+    args = parser.parse_args()
+    asyncio.run(main(args))
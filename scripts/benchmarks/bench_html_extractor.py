@@ -0,0 +1,87 @@
+# scripts/benchmarks/bench_html_extractor.py
+#
+# Compares the streaming lxml extractor with the previous BeautifulSoup
+# extractor on a corpus of HTML pages: throughput in MB/s and output size.
+#
+# Usage: python scripts/benchmarks/bench_html_extractor.py [--corpus DIR] [--budget 3000]
+#        Without --corpus a synthetic corpus of small to multi-megabyte pages is used.
+
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.services.service_integrations.html_extractor import extract_text
+
+WORDS = "market report india weather cricket election policy science health travel music film".split()
+
+
+def legacy_extract(page_source):
+    # The extractor web_driver used before the streaming one
+    soup = BeautifulSoup(page_source, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    content = soup.get_text(separator=' ', strip=True)
+    return re.sub(r'\s+', ' ', content)
+
+
+def synthetic_page(paragraphs):
+    rng = random.Random(paragraphs)
+    nav = "".join(f'<li><a href="/s{i}">Section {i}</a></li>' for i in range(40))
+    body = "".join(
+        f"<p>{' '.join(rng.choice(WORDS) for _ in range(80))}</p>" for _ in range(paragraphs)
+    )
+    comments = "".join(f'<div class="comment">Reader comment {i}</div>' for i in range(paragraphs // 4))
+    return (
+        f"<html><head><title>Page</title><script>{'var a=1;' * 2000}</script>"
+        f"<style>{'p{{margin:0}}' * 500}</style></head><body>"
+        f'<header><nav class="main-nav"><ul>{nav}</ul></nav></header>'
+        f'<div class="cookie-banner">We use cookies</div>'
+        f"<main><article><h1>Headline</h1>{body}</article></main>"
+        f'<section class="comments">{comments}</section><footer>{nav}</footer></body></html>'
+    )
+
+
+def load_corpus(directory):
+    if directory:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(directory, '*.htm*'))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+        return pages
+    return [synthetic_page(n) for n in (10, 50, 200, 1000, 5000, 20000)]
+
+
+def run(name, extractor, pages, repeat):
+    total_bytes = sum(len(page.encode('utf-8')) for page in pages) * repeat
+    output_chars = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            output_chars += len(extractor(page))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>12}: {total_bytes / elapsed / 1e6:8.1f} MB/s, "
+          f"avg output {output_chars / (len(pages) * repeat) / 1024:8.1f} KiB/page")
+
+
+def main(args):
+    pages = load_corpus(args.corpus)
+    size = sum(len(page.encode('utf-8')) for page in pages) / 1e6
+    print(f"Corpus: {len(pages)} pages, {size:.1f} MB")
+    run("legacy", legacy_extract, pages, args.repeat)
+    run("streaming", lambda page: extract_text(page, token_budget=args.budget), pages, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML-to-text extraction")
+    parser.add_argument("--corpus", help="Directory of .html files")
+    parser.add_argument("--budget", type=int, default=3000, help="Token budget for the streaming extractor")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
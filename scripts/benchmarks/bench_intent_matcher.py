@@ -0,0 +1,81 @@
+# scripts/benchmarks/bench_intent_matcher.py
+#
+# Checks the compiled intent matcher against the Hindi/English regression
+# corpus and times it against the previous substring scans.
+#
+# Usage: python scripts/benchmarks/bench_intent_matcher.py [--iterations 2000]
+#        Exits with status 1 if any corpus query is misclassified.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.core.service_selector.intent_analyzer import IntentMatcher
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'data', 'intents',
+                           'web_query_regression.json')
+
+
+def load_phrase_lists():
+    with open(os.path.join(os.path.dirname(CORPUS_FILE), 'web_query_intents.json'), encoding='utf-8') as f:
+        intents = json.load(f)['intents']
+    return {intent['name']: intent['phrases'] for intent in intents}
+
+
+def legacy_detect_intent(query, phrases):
+    # The previous detect_intent: ordered any(substring) scans
+    query = query.lower()
+    for name in ("time", "date", "day", "time_difference"):
+        if any(keyword in query for keyword in phrases[name]):
+            return name
+    return "search"
+
+
+def legacy_process_query(query, phrases):
+    # process_query scanned once in detect_intent and, for searches, again in handle_general_query
+    intent = legacy_detect_intent(query, phrases)
+    if intent == "search":
+        intent = legacy_detect_intent(query, phrases)
+    return intent
+
+
+def main(args):
+    with open(CORPUS_FILE, encoding='utf-8') as f:
+        corpus = json.load(f)
+    matcher = IntentMatcher.from_file()
+    phrases = load_phrase_lists()
+
+    failures = [(case['query'], case['intent'], matcher.match(case['query']))
+                for case in corpus if matcher.match(case['query']) != case['intent']]
+    legacy_failures = sum(1 for case in corpus if legacy_detect_intent(case['query'], phrases) != case['intent'])
+    print(f"Regression corpus: {len(corpus)} queries, {len(failures)} misclassified "
+          f"(previous matcher: {legacy_failures})")
+    for query, expected, actual in failures:
+        print(f"  {query!r}: expected {expected}, got {actual}")
+
+    groups = {
+        "local": [case['query'] for case in corpus if case['intent'] != "search"],
+        "search": [case['query'] for case in corpus if case['intent'] == "search"],
+    }
+    for name, detect in [("legacy", lambda q: legacy_process_query(q, phrases)), ("compiled", matcher.match)]:
+        timings = []
+        for group, queries in groups.items():
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                for query in queries:
+                    detect(query)
+            elapsed = time.perf_counter() - started
+            timings.append(f"{group} {elapsed / (args.iterations * len(queries)) * 1e6:6.2f} us/query")
+        print(f"{name:>10}: " + ", ".join(timings))
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intent matcher regression check and microbenchmark")
+    parser.add_argument("--iterations", type=int, default=2000)
+    sys.exit(main(parser.parse_args()))
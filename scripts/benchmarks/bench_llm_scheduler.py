@@ -0,0 +1,136 @@
+# scripts/benchmarks/bench_llm_scheduler.py
+#
+# Drives summarization calls against a stub chat-completion server that
+# enforces per-key request and token limits, comparing random key choice with
+# blind backoff against the per-key LLMScheduler.
+#
+# Usage: python scripts/benchmarks/bench_llm_scheduler.py --calls 60 --keys 3 --rpw 5 --window 1
+
+import argparse
+import asyncio
+import collections
+import os
+import random
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+CONTENT = "Cricket scores and match reports from the latest series. " * 40
+
+
+class LimitedLLMServer:
+    """Chat completions stand-in with a sliding-window request/token limit per API key."""
+
+    def __init__(self, requests_per_window, tokens_per_window, window, latency):
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        self.latency = latency
+        self.calls = collections.defaultdict(collections.deque)
+        self.accepted = collections.Counter()
+        self.rejected = collections.Counter()
+
+    async def completions(self, request):
+        key = request.headers.get("Authorization", "").replace("Bearer ", "")
+        body = await request.json()
+        tokens = sum(len(m["content"]) for m in body["messages"]) // 4 + body.get("max_tokens", 0)
+        now = time.monotonic()
+        calls = self.calls[key]
+        while calls and now - calls[0][0] >= self.window:
+            calls.popleft()
+        if len(calls) >= self.requests_per_window or sum(t for _, t in calls) + tokens > self.tokens_per_window:
+            self.rejected[key] += 1
+            retry_after = max(0.0, calls[0][0] + self.window - now) if calls else self.window
+            return web.json_response({"error": {"message": "rate limited", "type": "rate_limit"}}, status=429,
+                                     headers={"retry-after": f"{retry_after:.3f}"})
+        calls.append((now, tokens))
+        self.accepted[key] += 1
+        await asyncio.sleep(self.latency)
+        return web.json_response({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "summary"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": tokens, "completion_tokens": 1, "total_tokens": tokens + 1},
+        })
+
+    def reset(self):
+        self.calls.clear()
+        self.accepted.clear()
+        self.rejected.clear()
+
+
+async def start_server(llm):
+    app = web.Application()
+    app.router.add_post('/openai/v1/chat/completions', llm.completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def random_key_with_backoff(clients, calls):
+    # The previous strategy: pick any key, back off exponentially on 429
+    async def one():
+        for attempt in range(8):
+            try:
+                await random.choice(clients).chat.completions.create(
+                    model="stub", messages=[{"role": "user", "content": CONTENT}], max_tokens=300)
+                return True
+            except Exception:
+                await asyncio.sleep(0.25 * 2 ** attempt)
+        return False
+
+    return sum(await asyncio.gather(*(one() for _ in range(calls))))
+
+
+async def scheduled(web_driver, calls):
+    results = await asyncio.gather(*(web_driver.analyze_and_summarize(CONTENT, "cricket") for _ in range(calls)))
+    return sum(1 for summary in results if summary)
+
+
+async def main(args):
+    llm = LimitedLLMServer(args.rpw, args.tpw, args.window, args.latency)
+    runner, base_url = await start_server(llm)
+    os.environ['GROQ_BASE_URL'] = base_url
+    import groq
+    from backend.services.service_integrations import web_driver
+    from backend.services.service_integrations.llm_scheduler import KeyBudget, LLMScheduler
+
+    keys = [f"stub-key-{i}" for i in range(args.keys)]
+    try:
+        clients = [groq.AsyncClient(api_key=key, base_url=base_url, max_retries=0) for key in keys]
+        started = time.perf_counter()
+        completed = await random_key_with_backoff(clients, args.calls)
+        report("random+backoff", completed, args.calls, time.perf_counter() - started, llm)
+
+        llm.reset()
+        web_driver.llm_scheduler = LLMScheduler([
+            KeyBudget(key, web_driver._groq_client_factory(key), args.rpw, args.tpw, window=args.window)
+            for key in keys
+        ])
+        started = time.perf_counter()
+        completed = await scheduled(web_driver, args.calls)
+        report("scheduler", completed, args.calls, time.perf_counter() - started, llm)
+    finally:
+        await runner.cleanup()
+
+
+def report(name, completed, calls, elapsed, llm):
+    per_key = ", ".join(f"{llm.accepted[key]}" for key in sorted(llm.accepted))
+    print(f"{name:>15}: {completed}/{calls} done in {elapsed:5.2f}s, "
+          f"{sum(llm.rejected.values())} rejected with 429, accepted per key [{per_key}]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-key LLM scheduling against enforced limits")
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--keys", type=int, default=3)
+    parser.add_argument("--rpw", type=int, default=5, help="Requests per key per window")
+    parser.add_argument("--tpw", type=int, default=6000, help="Tokens per key per window")
+    parser.add_argument("--window", type=float, default=1.0, help="Limit window in seconds")
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
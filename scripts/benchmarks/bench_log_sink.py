@@ -0,0 +1,120 @@
+# scripts/benchmarks/bench_log_sink.py
+#
+# Measures what logging adds to request latency. Each simulated request logs
+# a few INFO and DEBUG records through the root logger with, in turn:
+#   - a handler that inserts every record into the Log table as it is emitted
+#   - the queued DatabaseLogHandler (level filter, DEBUG sampling, batched inserts)
+# and then checks the queue bound by overloading a tiny queue. A last section
+# compares the old per-chunk VAD print with the disabled-debug check now used
+# in stt_service.
+#
+# Usage: python scripts/benchmarks/bench_log_sink.py --requests 2000 --records 5
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+DB_DIR = tempfile.TemporaryDirectory()
+# Settings are read at import time
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DB_DIR.name, 'logs.db')}"
+
+from sqlalchemy import func, select
+
+from backend.models.database_models import Log
+from backend.utils.log_sink import DatabaseLogHandler
+from database.database import Base, engine
+
+logger = logging.getLogger("bench.request")
+
+
+class InsertPerRecordHandler(logging.Handler):
+    """The straightforward alternative: one INSERT transaction per record, on the caller's thread."""
+
+    def emit(self, record):
+        with engine.begin() as conn:
+            conn.execute(Log.__table__.insert(), [{
+                "log_id": uuid.uuid4().hex, "log_level": record.levelname, "log_data": record.getMessage()}])
+
+
+def handle_request(i, records):
+    for n in range(records):
+        logger.info(f"request {i} step {n} finished")
+        logger.debug(f"request {i} step {n} details")
+
+
+def run(name, handler, requests, records):
+    root = logging.getLogger()
+    root.addHandler(handler)
+    latencies = []
+    try:
+        for i in range(requests):
+            started = time.perf_counter()
+            handle_request(i, records)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        root.removeHandler(handler)
+    latencies.sort()
+    print(f"{name:>18}: p50 {statistics.median(latencies) * 1e6:8.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:8.1f} us per request")
+
+
+def stored_logs():
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Log.__table__)).scalar()
+
+
+def main(args):
+    Base.metadata.create_all(bind=engine)
+    logging.getLogger().setLevel(logging.DEBUG)
+    try:
+        run("insert per record", InsertPerRecordHandler(logging.INFO), args.requests, args.records)
+        before = stored_logs()
+
+        sink = DatabaseLogHandler(engine, level=logging.DEBUG, sample_rates={logging.DEBUG: 0.01})
+        sink.setFormatter(logging.Formatter())
+        run("queued sink", sink, args.requests, args.records)
+        sink.close()
+        print(f"{'':>18}  {sink.stats}, {stored_logs() - before} rows stored")
+
+        # Overload: the writer cannot keep up with a tiny queue, so the oldest records go
+        tiny = DatabaseLogHandler(engine, level=logging.INFO, capacity=100, batch_size=100, flush_interval=60)
+        tiny.setFormatter(logging.Formatter())
+        run("overloaded sink", tiny, args.requests, args.records)
+        tiny.close()
+        print(f"{'':>18}  {tiny.stats} (capacity 100)")
+    finally:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    # The VAD loop logged a line for every 20 ms audio chunk
+    chunks = 50 * 60
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for n in range(chunks):
+            print("Speech detected" if n % 3 else "No speech")
+        printed = time.perf_counter() - started
+    vad_logger = logging.getLogger("bench.vad")
+    started = time.perf_counter()
+    debug = vad_logger.isEnabledFor(logging.DEBUG)
+    for n in range(chunks):
+        if debug:
+            vad_logger.debug("Speech detected" if n % 3 else "No speech")
+    guarded = time.perf_counter() - started
+    print(f"VAD loop, one minute of chunks: print {printed * 1e3:.2f} ms, disabled debug {guarded * 1e3:.3f} ms "
+          f"(stdout captured in memory; a terminal is slower)")
+    DB_DIR.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Logging overhead per request")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--records", type=int, default=5, help="INFO and DEBUG records per request")
+    main(parser.parse_args())
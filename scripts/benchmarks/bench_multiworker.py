@@ -0,0 +1,278 @@
+# scripts/benchmarks/bench_multiworker.py
+#
+# Memory per API worker and throughput as workers are added, for the ways of
+# serving the model from several processes. A /chat endpoint runs BrainPipeline
+# over TinyLM (stub_backends.py) with its weights in a safetensors file, served
+# by PreforkServer:
+#
+#   copy     each worker loads its own copy after starting (uvicorn --workers)
+#   preload  the weights are read into memory once, before the fork
+#   mmap     the file is mapped read-only before the fork (LLAMA_WEIGHTS_PATH)
+#   remote   one inference worker maps the weights and serves the API workers
+#            over a Unix socket (INFERENCE_MODE=remote)
+#
+# Memory comes from /proc/<pid>/smaps_rollup after the load: PSS charges shared
+# pages to each sharer, so the PSS total of all processes is the real
+# footprint, and its growth per added worker is the per-worker increment.
+#
+# Usage: python scripts/benchmarks/bench_multiworker.py --workers 1,2,4 --seconds 5
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_backends import StubAnalyzer, StubBrain, TinyLM, tiny_lm_weights
+from backend.core.main_brain.brain_pipeline import BrainPipeline
+from backend.core.main_brain.shared_weights import load_safetensors_mmap, save_safetensors
+
+MODES = ("copy", "preload", "mmap", "remote")
+
+
+def build_app(mode, weights_path, socket_path, tokens):
+    from fastapi import FastAPI
+    from pydantic import BaseModel
+
+    app = FastAPI()
+    pipelines = []
+
+    def local_pipeline(weights):
+        return BrainPipeline(StubBrain(TinyLM(weights), tokens), StubAnalyzer())
+
+    if mode == "remote":
+        from backend.core.main_brain.inference_server import InferenceClient, RemoteAnalyzer, RemoteBrain
+
+        client = InferenceClient(socket_path)
+        pipelines.append(BrainPipeline(RemoteBrain(client), RemoteAnalyzer(client)))
+    elif mode == "preload":
+        pipelines.append(local_pipeline({name: np.array(array) for name, array in
+                                         load_safetensors_mmap(weights_path).items()}))
+    elif mode == "mmap":
+        pipelines.append(local_pipeline(load_safetensors_mmap(weights_path)))
+
+    @app.on_event("startup")
+    async def load_model():
+        if mode == "copy":
+            pipelines.append(local_pipeline({name: np.array(array) for name, array in
+                                             load_safetensors_mmap(weights_path).items()}))
+
+    class ChatRequest(BaseModel):
+        message: str
+
+    @app.post("/chat")
+    async def chat(chat_request: ChatRequest):
+        result = await pipelines[0].run(chat_request.message, synthesize=False)
+        return {"response": result.response, "pid": os.getpid()}
+
+    return app
+
+
+def serve(args):
+    from backend.api.serve import PreforkServer
+
+    app = build_app(args.serve, args.weights, args.socket, args.tokens)
+    PreforkServer(app, "127.0.0.1", args.port, args.serve_workers, threads_per_worker=1).run()
+
+
+def serve_inference(args):
+    from backend.core.main_brain.inference_server import InferenceServer
+
+    brain = StubBrain(TinyLM(load_safetensors_mmap(args.weights)), args.tokens)
+    server = InferenceServer(brain, StubAnalyzer(), args.socket, max_concurrency=args.inference_concurrency)
+    asyncio.run(server.serve_forever())
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)}
+
+
+def children(parent):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    # The command name may contain spaces; the parent pid is the second field after it
+                    if int(stat.read().rsplit(")", 1)[1].split()[1]) == parent:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def offer_load(base_url, clients, seconds, warmup):
+    import httpx
+
+    latencies = []
+    # A new connection per request, so the kernel spreads requests over the workers' shared socket
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def one(index):
+            response = await client.post("/chat", json={"message": f"tell me about the river bank {index}"})
+            response.raise_for_status()
+            return response.json()["pid"]
+
+        # Every worker must have run the model (and so touched its weights) before memory is read
+        served_by = set(await asyncio.gather(*(one(i) for i in range(warmup))))
+        deadline = time.perf_counter() + seconds
+
+        async def closed_loop(client_index):
+            index = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                served_by.add(await one(client_index * 100000 + index))
+                latencies.append(time.perf_counter() - started)
+                index += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(closed_loop(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, float(np.percentile(latencies, 50)) * 1000, served_by
+
+
+def wait_ready(port, process, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def stop(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def run_layout(mode, workers, args, directory):
+    port = free_port()
+    socket_path = os.path.join(directory, "inference.sock")
+    common = [sys.executable, __file__, "--weights", args.weights_path, "--socket", socket_path,
+              "--tokens", str(args.tokens), "--inference-concurrency", str(args.inference_concurrency)]
+    # One BLAS thread per process, so worker count is the only parallelism being varied
+    env = dict(os.environ, OMP_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1", MKL_NUM_THREADS="1")
+    processes = []
+    try:
+        if mode == "remote":
+            processes.append(subprocess.Popen(common + ["--serve-inference"], env=env,
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            deadline = time.monotonic() + 60
+            while not os.path.exists(socket_path) and time.monotonic() < deadline:
+                time.sleep(0.1)
+        server = subprocess.Popen(common + ["--serve", mode, "--serve-workers", str(workers), "--port", str(port)],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.append(server)
+        wait_ready(port, server)
+        throughput, p50, served_by = asyncio.run(offer_load(f"http://127.0.0.1:{port}", args.clients,
+                                                            args.seconds, args.warmup * workers))
+        worker_pids = children(server.pid)
+        worker_memory = [memory_kb(pid) for pid in worker_pids]
+        group = [memory_kb(process.pid) for process in processes] + worker_memory
+    finally:
+        for process in reversed(processes):
+            stop(process)
+    return {
+        "mode": mode, "workers": workers, "throughput_rps": round(throughput, 2), "p50_ms": round(p50, 1),
+        "workers_serving": len(served_by & set(worker_pids)),
+        "worker_rss_mb": round(np.mean([m["rss"] for m in worker_memory]) / 1024, 1),
+        "worker_pss_mb": round(np.mean([m["pss"] for m in worker_memory]) / 1024, 1),
+        "worker_private_mb": round(np.mean([m["private"] for m in worker_memory]) / 1024, 1),
+        "total_pss_mb": round(sum(m["pss"] for m in group) / 1024, 1),
+    }
+
+
+def main(args):
+    weights = tiny_lm_weights(args.vocab, args.dim, args.layers)
+    size = sum(array.nbytes for array in weights.values()) / 2 ** 20
+    print(f"TinyLM weights: {size:.0f} MB, {args.tokens} tokens per request, {os.cpu_count()} CPUs")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        args.weights_path = os.path.join(directory, "weights.safetensors")
+        save_safetensors(args.weights_path, weights)
+        del weights
+        for mode in args.modes:
+            baseline = None
+            for workers in args.workers:
+                result = run_layout(mode, workers, args, directory)
+                if baseline is None:
+                    baseline = result
+                elif workers > baseline["workers"]:
+                    result["pss_per_added_worker_mb"] = round(
+                        (result["total_pss_mb"] - baseline["total_pss_mb"]) / (workers - baseline["workers"]), 1)
+                    result["scaling"] = round(result["throughput_rps"] / baseline["throughput_rps"], 2)
+                results.append(result)
+                print(f"{mode:>8} x{workers}: {result['throughput_rps']:6.1f} req/s (x{result.get('scaling', 1.0)}) "
+                      f"p50 {result['p50_ms']:6.1f} ms, {result['workers_serving']} workers served | per worker "
+                      f"RSS {result['worker_rss_mb']:6.1f} PSS {result['worker_pss_mb']:6.1f} "
+                      f"private {result['worker_private_mb']:6.1f} MB | total PSS {result['total_pss_mb']:6.1f} MB"
+                      + (f", +{result['pss_per_added_worker_mb']} MB per added worker"
+                         if "pss_per_added_worker_mb" in result else ""))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"weights_mb": round(size, 1), "cpus": os.cpu_count(), "results": results}, output, indent=2)
+
+
+def csv(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker memory and throughput scaling of the serving layouts")
+    parser.add_argument("--modes", type=csv(str), default=list(MODES))
+    parser.add_argument("--workers", type=csv(int), default=[1, 2, 4], help="Comma-separated API worker counts")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients, the same for every worker count")
+    parser.add_argument("--warmup", type=int, default=8, help="Requests per worker before measuring")
+    parser.add_argument("--tokens", type=int, default=8)
+    parser.add_argument("--vocab", type=int, default=32000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--inference-concurrency", type=int, default=2)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    # Internal: run one server of a layout in this process
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--serve-inference", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--serve-workers", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--weights", help=argparse.SUPPRESS)
+    parser.add_argument("--socket", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+    elif args.serve_inference:
+        serve_inference(args)
+    else:
+        main(args)
@@ -0,0 +1,184 @@
+# scripts/benchmarks/bench_password_hashing.py
+#
+# Login load with real bcrypt cost, comparing hashing inline on the event loop
+# (the previous behaviour) with the process-pool PasswordHasher and per-client
+# admission from auth_manager. While logins run, a health endpoint is probed
+# every 10 ms; its latency is measured from the tick it was due, so time spent
+# waiting behind a blocked loop counts.
+#
+# Seeded users carry hashes made with an older cost, so the first pass
+# through the pool rehashes them; the comparison runs afterwards at equal
+# cost. A final phase has one client hammer /login while others log in.
+#
+# Usage: python scripts/benchmarks/bench_password_hashing.py --users 40 --concurrency 20 --rounds 10
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+PASSWORD = "correct horse battery"
+
+
+def configure(args):
+    db_dir = tempfile.TemporaryDirectory()
+    # Settings are read at import time
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir.name, 'auth.db')}"
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    os.environ['PASSWORD_HASH_MAX_CONCURRENCY'] = str(args.workers)
+    return db_dir
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * fraction) - 1)] * 1000 if ordered else 0.0
+
+
+def seed_users(count, rounds):
+    from backend.models.database_models import User
+    from backend.utils.password_hasher import make_context
+    from database.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    old_hash = make_context(rounds).hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all(User(username=f"user{i:05d}", email=f"user{i:05d}@example.com", password_hash=old_hash)
+                   for i in range(count))
+        db.commit()
+
+
+def build_apps(rounds):
+    from fastapi import Depends, FastAPI, HTTPException
+    from passlib.context import CryptContext
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from backend.utils import auth_manager
+    from database.database import get_async_session
+
+    inline_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+    def app_with(login_handler, dependencies):
+        app = FastAPI()
+        app.post("/login", dependencies=dependencies)(login_handler)
+
+        @app.get("/health")
+        async def health():
+            return {"ok": True}
+
+        return app
+
+    async def inline_login(username: str, password: str, db: AsyncSession = Depends(get_async_session)):
+        user = await auth_manager.get_user_by_username(db, username)
+        if not user or not inline_context.verify(password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Incorrect username or password")
+        return {"access_token": auth_manager.create_access_token(data={"sub": user.username})}
+
+    async def pooled_login(username: str, password: str, db: AsyncSession = Depends(get_async_session)):
+        user = await auth_manager.authenticate_user(db, username, password)
+        return {"access_token": auth_manager.create_access_token(data={"sub": user.username})}
+
+    return {
+        "inline bcrypt": app_with(inline_login, []),
+        "process pool": app_with(pooled_login, [Depends(auth_manager.password_admission)]),
+    }
+
+
+async def run_logins(app, users, concurrency, attacker_attempts=0):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    login_latencies, health_latencies = [], []
+    statuses = {}
+    attacker_statuses = {}
+    done = asyncio.Event()
+
+    def client_for(address):
+        transport = httpx.ASGITransport(app=app, client=(address, 40000))
+        return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+    async def login(i):
+        # Every user logs in from its own address
+        async with semaphore, client_for(f"10.0.{i // 250}.{i % 250 + 1}") as client:
+            started = time.perf_counter()
+            response = await client.post("/login", params={"username": f"user{i:05d}", "password": PASSWORD})
+            login_latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def attack():
+        async with client_for("203.0.113.7") as client:
+            async def attempt():
+                response = await client.post("/login", params={"username": "user00000", "password": "guess"})
+                attacker_statuses[response.status_code] = attacker_statuses.get(response.status_code, 0) + 1
+            await asyncio.gather(*(attempt() for _ in range(attacker_attempts)))
+
+    async def probe_health():
+        async with client_for("127.0.0.1") as client:
+            while not done.is_set():
+                due = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - due)
+
+    prober = asyncio.create_task(probe_health())
+    started = time.perf_counter()
+    await asyncio.gather(attack(), *(login(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+    return {
+        "elapsed": elapsed,
+        "statuses": statuses,
+        "attacker": attacker_statuses,
+        "login_p50": percentile(login_latencies, 0.5),
+        "login_p99": percentile(login_latencies, 0.99),
+        "health_p99": percentile(health_latencies, 0.99),
+        "health_max": max(health_latencies, default=0) * 1000,
+    }
+
+
+def report(name, result):
+    print(f"{name:>14}: {sum(result['statuses'].values())} logins in {result['elapsed']:.2f}s {result['statuses']}, "
+          f"login p50 {result['login_p50']:6.1f} ms p99 {result['login_p99']:6.1f} ms, "
+          f"health p99 {result['health_p99']:6.1f} ms max {result['health_max']:6.1f} ms")
+    if result['attacker']:
+        print(f"{'':>14}  attacker responses {result['attacker']}")
+
+
+async def main(args):
+    from backend.utils import auth_manager
+    from database.database import async_engine
+
+    seed_users(args.users, args.old_rounds)
+    apps = build_apps(args.rounds)
+    await auth_manager.password_hasher.start()
+    try:
+        report("rehash pass", await run_logins(apps["process pool"], args.users, args.concurrency))
+        print(f"{'':>14}  hasher stats {auth_manager.password_hasher.stats}")
+        report("inline bcrypt", await run_logins(apps["inline bcrypt"], args.users, args.concurrency))
+        report("process pool", await run_logins(apps["process pool"], args.users, args.concurrency))
+        report("pool + attack", await run_logins(apps["process pool"], args.users, args.concurrency,
+                                                 attacker_attempts=args.attack))
+    finally:
+        auth_manager.password_hasher.shutdown()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login latency with offloaded password hashing")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10, help="Current bcrypt cost")
+    parser.add_argument("--old-rounds", type=int, default=8, help="Cost of the seeded hashes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--attack", type=int, default=100, help="Concurrent attempts from one client")
+    args = parser.parse_args()
+    db_dir = configure(args)
+    try:
+        asyncio.run(main(args))
+    finally:
+        db_dir.cleanup()
@@ -0,0 +1,123 @@
+# scripts/benchmarks/bench_resilience.py
+#
+# Exercises hedging, the circuit breaker and request deadlines of
+# BaseServiceClient against a local fault-injecting stub server.
+#
+# Usage: python scripts/benchmarks/bench_resilience.py --requests 300 --slow-fraction 0.05
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.services.service_clients.base_client import BaseServiceClient
+from backend.services.service_clients.resilience import CircuitOpenError, DeadlineExceeded, HedgePolicy
+from backend.services.service_clients.session_pool import session_pool
+
+
+class StubClient(BaseServiceClient):
+    async def request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._make_request(method, f"{self.base_url}{endpoint}", data, timeout=timeout)
+
+
+async def start_fault_server(slow_fraction: float, slow_delay: float):
+    hits = {"slow": 0, "dead": 0}
+
+    async def slow(request):
+        # Mostly fast, with an occasional straggler that dominates the tail
+        hits["slow"] += 1
+        delay = slow_delay if random.random() < slow_fraction else random.uniform(0.002, 0.01)
+        await asyncio.sleep(delay)
+        return web.json_response({"ok": True})
+
+    async def dead(request):
+        hits["dead"] += 1
+        return web.Response(status=503, text="unavailable")
+
+    async def hang(request):
+        await asyncio.sleep(30)
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get('/slow', slow)
+    app.router.add_get('/dead', dead)
+    app.router.add_get('/hang', hang)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", hits
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def measure_tail(client, num_requests, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            # Distinct query strings keep single-flight from merging the calls
+            await client.request("GET", f"/slow?i={i}")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(num_requests)))
+    return latencies
+
+
+async def main(args):
+    runner, base_url, hits = await start_fault_server(args.slow_fraction, args.slow_delay)
+    try:
+        for name, policy in [("no hedging", None), ("hedged", HedgePolicy(initial_delay=0.05))]:
+            client = StubClient(base_url, "stub-key", rate_limit=100000, hedge_policy=policy)
+            latencies = await measure_tail(client, args.requests, args.concurrency)
+            print(f"{name:>12}: p50 {percentile(latencies, 0.5) * 1000:7.1f} ms, "
+                  f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms, "
+                  f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms, upstream hits {hits['slow']}")
+            hits["slow"] = 0
+
+        client = StubClient(base_url, "stub-key", rate_limit=100000, max_retries=1, breaker_threshold=5)
+        fast_failures = 0
+        for _ in range(args.requests):
+            try:
+                await client.request("GET", "/dead")
+            except CircuitOpenError:
+                fast_failures += 1
+            except Exception:
+                pass
+        print(f"{'breaker':>12}: {args.requests} calls to a dead upstream, {hits['dead']} reached it, "
+              f"{fast_failures} failed fast")
+
+        client = StubClient(base_url, "stub-key", rate_limit=100000)
+        started = time.perf_counter()
+        try:
+            await client.request("GET", "/hang", timeout=0.5)
+        except DeadlineExceeded:
+            pass
+        print(f"{'deadline':>12}: hanging upstream abandoned after {time.perf_counter() - started:.2f} s "
+              f"(budget 0.50 s)")
+    finally:
+        await session_pool.close_all()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hedging, circuit breaking and deadlines")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+# scripts/benchmarks/bench_session_pool.py
+#
+# Compares one aiohttp session per client (the old BaseServiceClient behaviour)
+# with the shared SessionPool against a local stub server.
+#
+# Usage: python scripts/benchmarks/bench_session_pool.py --clients 20 --requests 50
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.services.service_clients.base_client import BaseServiceClient
+from backend.services.service_clients.session_pool import SessionPool
+
+
+class StubClient(BaseServiceClient):
+    async def request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._make_request(method, f"{self.base_url}{endpoint}", data)
+
+
+class ConnectionCounter:
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_connection_create_end.append(self._on_create)
+        self.trace_config.on_connection_reuseconn.append(self._on_reuse)
+
+    async def _on_create(self, session, ctx, params):
+        self.created += 1
+
+    async def _on_reuse(self, session, ctx, params):
+        self.reused += 1
+
+    @property
+    def reuse_rate(self) -> float:
+        total = self.created + self.reused
+        return self.reused / total if total else 0.0
+
+
+async def start_stub_server():
+    async def handle(request):
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def drive(clients, requests_per_client):
+    async def run_client(client):
+        for _ in range(requests_per_client):
+            await client.request("GET", "/ping")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(client) for client in clients))
+    return time.perf_counter() - start
+
+
+async def bench_per_client_sessions(base_url, num_clients, requests_per_client):
+    counter = ConnectionCounter()
+    # One pool per client reproduces the old "own ClientSession per instance" layout
+    pools = [SessionPool(trace_configs=[counter.trace_config]) for _ in range(num_clients)]
+    clients = [StubClient(base_url, "stub-key", session_pool=pool) for pool in pools]
+    elapsed = await drive(clients, requests_per_client)
+    for pool in pools:
+        await pool.close_all()
+    return elapsed, counter
+
+
+async def bench_shared_pool(base_url, num_clients, requests_per_client):
+    counter = ConnectionCounter()
+    pool = SessionPool(trace_configs=[counter.trace_config])
+    clients = [StubClient(base_url, "stub-key", session_pool=pool) for _ in range(num_clients)]
+    elapsed = await drive(clients, requests_per_client)
+    await pool.close_all()
+    return elapsed, counter
+
+
+async def main(args):
+    runner, base_url = await start_stub_server()
+    total = args.clients * args.requests
+    try:
+        for name, bench in [("per-client sessions", bench_per_client_sessions), ("shared pool", bench_shared_pool)]:
+            elapsed, counter = await bench(base_url, args.clients, args.requests)
+            print(f"{name:>20}: {total / elapsed:9.1f} req/s, "
+                  f"{counter.created} connections opened, reuse rate {counter.reuse_rate:.1%}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark shared HTTP session pool")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
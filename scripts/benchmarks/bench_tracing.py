@@ -0,0 +1,174 @@
+# scripts/benchmarks/bench_tracing.py
+#
+# Cost of the span layer per instrumented call with tracing off and on,
+# against the same work without instrumentation. Then runs BrainPipeline
+# inputs through stub stages with tracing on, prints the per-stage breakdown
+# from the Prometheus histogram sums and one trace tree, and samples a busy
+# thread with the profiler to check the hot function dominates the stacks.
+#
+# Usage: python scripts/benchmarks/bench_tracing.py --calls 200000 --inputs 20
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.core.main_brain.brain_pipeline import Analysis, BrainPipeline, Routing
+from backend.utils.tracing import SamplingProfiler, Tracer, tracer
+
+STAGE_COSTS = {"generate": 0.030, "score": 0.012, "filter": 0.004, "route": 0.008}
+
+
+def per_call_ns(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def overhead(calls):
+    bench_tracer = Tracer()
+    work = list(range(8))
+
+    def bare():
+        sum(work)
+
+    def instrumented():
+        with bench_tracer.span("stage", tokens_in=8):
+            sum(work)
+
+    @bench_tracer.traced("stage")
+    def decorated():
+        sum(work)
+
+    results = {"bare": per_call_ns(bare, calls)}
+    for enabled in (False, True):
+        bench_tracer.enabled = enabled
+        state = "on" if enabled else "off"
+        results[f"span, tracing {state}"] = per_call_ns(instrumented, calls)
+        results[f"decorator, tracing {state}"] = per_call_ns(decorated, calls)
+    for name, ns in results.items():
+        print(f"{name:>22}: {ns:7.0f} ns/call ({ns - results['bare']:+6.0f} ns)")
+
+
+class StubBrain:
+    def generate(self, text):
+        with tracer.span("llama.generate", tokens_in=len(text.split())) as span:
+            time.sleep(STAGE_COSTS["generate"])
+            span.set(tokens_out=64)
+        return f"An answer about {text}"
+
+    async def process_input(self, text):
+        return await asyncio.to_thread(self.generate, text)
+
+    def remember(self, text, response):
+        pass
+
+
+class StubTTS:
+    async def synthesize(self, text):
+        with tracer.span("tts.synthesize", chars=len(text)):
+            await asyncio.sleep(0.010)
+        return b"RIFF"
+
+
+class StubAnalyzer:
+    tts_service = StubTTS()
+
+    def score(self, user_input, output):
+        for stage in ("tfidf", "sentiment", "lda", "deberta"):
+            with tracer.span(f"analyzer.{stage}"):
+                time.sleep(STAGE_COSTS["score"] / 4)
+        relevant = not user_input.startswith("route")
+        return Analysis(0.9, 0.9, 0.9, 0.9, 0.9 if relevant else 0.1, relevant)
+
+    def filter_output(self, output):
+        with tracer.span("analyzer.spacy_filter"):
+            time.sleep(STAGE_COSTS["filter"])
+        return output
+
+    def classify_route(self, user_input):
+        with tracer.span("analyzer.route"):
+            time.sleep(STAGE_COSTS["route"])
+        return Routing("general_knowledge", {"general_knowledge": 1.0})
+
+
+async def traced_pipeline(inputs, export_path):
+    tracer.configure(enabled=True, export_path=export_path)
+    pipeline = BrainPipeline(StubBrain(), StubAnalyzer())
+    for i in range(inputs):
+        with tracer.span("chat"):
+            await pipeline.run(f"route {i}" if i % 5 == 4 else f"question {i}")
+    tracer.close()
+
+    exposition = tracer.metrics.render_prometheus()
+    sums = {name: float(value) for name, value in
+            re.findall(r'span_duration_seconds_sum\{span="([^"]+)"\} (\S+)', exposition)}
+    counts = {name: int(value) for name, value in
+              re.findall(r'span_duration_seconds_count\{span="([^"]+)"\} (\S+)', exposition)}
+    print(f"per-stage totals over {inputs} inputs:")
+    for name in sorted(sums, key=sums.get, reverse=True):
+        print(f"  {name:>22}: {counts[name]:3d} spans, {sums[name] * 1000:7.1f} ms total, "
+              f"{sums[name] / counts[name] * 1000:6.1f} ms avg")
+    tokens = re.findall(r'span_attribute_total\{span="llama.generate",attribute="(tokens_\w+)"\} (\S+)', exposition)
+    print(f"  llama.generate tokens {dict(tokens)}")
+
+    spans = tracer.recent(0)
+    root = next(span for span in reversed(spans) if span["name"] == "chat")
+    children = {}
+    for span in spans:
+        children.setdefault(span["parent_id"], []).append(span)
+
+    def show(span, depth):
+        print(f"  {'  ' * depth}{span['name']} {span['duration'] * 1000:.1f} ms")
+        for child in sorted(children.get(span["span_id"], []), key=lambda child: child["start"]):
+            show(child, depth + 1)
+
+    print("last trace:")
+    show(root, 0)
+    with open(export_path) as exported:
+        print(f"  {sum(1 for _ in exported)} spans exported as JSON lines")
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def profile_busy_thread(seconds):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        collapsed = SamplingProfiler().profile(seconds, 0.005)
+    finally:
+        stop.set()
+        worker.join()
+    lines = [line.rsplit(" ", 1) for line in collapsed.strip().splitlines()]
+    total = sum(int(count) for _, count in lines)
+    # Idle threads (the executor's workers) are sampled too
+    busy = sum(int(count) for stack, count in lines if stack.startswith("busy;"))
+    hot = sum(int(count) for stack, count in lines if stack.startswith("busy;") and "busy_loop" in stack)
+    print(f"profiler: {total} samples across all threads in {seconds:.1f}s; "
+          f"busy thread {busy} samples, {hot / busy:.0%} inside busy_loop")
+
+
+async def main(args):
+    overhead(args.calls)
+    with tempfile.TemporaryDirectory() as directory:
+        await traced_pipeline(args.inputs, os.path.join(directory, "spans.jsonl"))
+    profile_busy_thread(args.profile_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Span overhead and per-stage breakdown")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--inputs", type=int, default=20)
+    parser.add_argument("--profile-seconds", type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
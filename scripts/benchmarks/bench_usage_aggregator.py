@@ -0,0 +1,133 @@
+# scripts/benchmarks/bench_usage_aggregator.py
+#
+# Records per-user, per-service usage for a burst of simulated requests,
+# comparing one upsert transaction per request with the write-behind
+# UsageAggregator. Checks that the stored totals match, that get_usage merges
+# buffered increments, and how many increments an unclean stop loses.
+#
+# Usage: python scripts/benchmarks/bench_usage_aggregator.py --requests 5000 --users 100 --services 5
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+DB_DIR = tempfile.TemporaryDirectory()
+# Settings are read at import time
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DB_DIR.name, 'usage.db')}"
+
+from sqlalchemy import delete, event, func, select
+
+from backend.models.database_models import ServiceMetadata, UsageStat, User
+from backend.utils.usage_aggregator import UsageAggregator
+from database.database import AsyncSessionLocal, async_engine, init_models
+
+commits = {"count": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "commit")
+def count_commit(conn):
+    commits["count"] += 1
+
+
+async def stored_total():
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.coalesce(func.sum(UsageStat.usage_count), 0)))).scalar()
+
+
+async def reset():
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(UsageStat))
+        await db.commit()
+    commits["count"] = 0
+
+
+async def run(name, handle, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(user_id, service_id):
+        async with semaphore:
+            await handle(user_id, service_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(user_id, service_id) for user_id, service_id in calls))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    await init_models()
+    services = [f"service-{i}" for i in range(args.services)]
+    async with AsyncSessionLocal() as db:
+        db.add_all(User(username=f"user{i:05d}", email=f"user{i:05d}@example.com", password_hash="x")
+                   for i in range(args.users))
+        db.add_all(ServiceMetadata(service_id=service_id, name=service_id) for service_id in services)
+        await db.commit()
+    rng = random.Random(1)
+    calls = [(rng.randint(1, args.users), rng.choice(services)) for _ in range(args.requests)]
+    aggregator = UsageAggregator(AsyncSessionLocal, flush_interval=args.flush_interval,
+                                 max_unflushed=args.max_unflushed)
+
+    async def upsert_per_request(user_id, service_id):
+        # The row-by-row alternative, reusing the aggregator's upsert statement
+        async with AsyncSessionLocal() as db:
+            await db.execute(aggregator._upsert(db.bind.dialect.name, aggregator._rows({
+                (user_id, service_id): [1, datetime.datetime.utcnow()]})))
+            await db.commit()
+
+    async def record(user_id, service_id):
+        aggregator.record(user_id, service_id)
+
+    try:
+        elapsed = await run("per request", upsert_per_request, calls, args.concurrency)
+        print(f"  upsert per request: {args.requests / elapsed:9.0f} req/s, {commits['count']} transactions, "
+              f"stored total {await stored_total()}")
+
+        await reset()
+        await aggregator.start()
+        elapsed = await run("write-behind", record, calls, args.concurrency)
+        await aggregator.stop()
+        print(f"        write-behind: {args.requests / elapsed:9.0f} req/s, {commits['count']} transactions, "
+              f"stored total {await stored_total()}; {aggregator.stats}")
+
+        # Reads merge what is stored with what is still buffered
+        user_id, service_id = calls[0]
+        for _ in range(3):
+            aggregator.record(user_id, service_id)
+        async with AsyncSessionLocal() as db:
+            merged = await aggregator.get_usage(db, user_id, service_id)
+            stored = (await db.execute(select(UsageStat.usage_count).where(
+                UsageStat.user_id == user_id, UsageStat.service_id == service_id))).scalar()
+        print(f"get_usage(user {user_id}, {service_id}): stored {stored}, merged {merged[service_id]['usage_count']}")
+        await aggregator.flush()
+
+        # An unclean stop loses only what was recorded since the last flush
+        await reset()
+        crashing = UsageAggregator(AsyncSessionLocal, flush_interval=60, max_unflushed=args.max_unflushed)
+        await crashing.start()
+        await run("crash", lambda u, s: asyncio.sleep(0, crashing.record(u, s)), calls, args.concurrency)
+        await asyncio.sleep(0.2)
+        while crashing._lock.locked():
+            await asyncio.sleep(0.01)
+        crashing._task.cancel()
+        lost = args.requests - await stored_total()
+        print(f"unclean stop: {lost} of {args.requests} increments lost (bound: max_unflushed={args.max_unflushed})")
+    finally:
+        await async_engine.dispose()
+        DB_DIR.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write-behind usage counters versus per-request upserts")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--services", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--max-unflushed", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
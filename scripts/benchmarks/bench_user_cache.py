@@ -0,0 +1,100 @@
+# scripts/benchmarks/bench_user_cache.py
+#
+# Authenticated-request load on get_current_user: one fresh session per
+# request, as a FastAPI dependency would open. Compares the previous
+# decode-and-SELECT on every request with the user and token caches, then
+# simulates a second worker reading the optional shared layer (using the
+# local stand-in) and checks that a profile update is visible immediately.
+#
+# Usage: python scripts/benchmarks/bench_user_cache.py --users 50 --requests 20
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+DB_DIR = tempfile.TemporaryDirectory()
+# Settings are read at import time
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DB_DIR.name, 'users.db')}"
+
+from sqlalchemy import event
+
+from backend.models.database_models import User
+from backend.utils import auth_manager
+from backend.utils.user_cache import InMemorySharedCache, UserCache
+from database.database import AsyncSessionLocal, async_engine, init_models
+
+queries = {"count": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    queries["count"] += 1
+
+
+async def uncached_current_user(db, token):
+    # What get_current_user did before the caches
+    payload = auth_manager.decode_access_token(token)
+    return await auth_manager.get_user_by_username(db, payload["sub"])
+
+
+async def run(name, lookup, tokens, requests_per_user):
+    queries["count"] = 0
+    calls = [token for token in tokens for _ in range(requests_per_user)]
+    started = time.perf_counter()
+
+    async def one(token):
+        async with AsyncSessionLocal() as db:
+            user = await lookup(db, token)
+            assert user is not None and user.email
+
+    await asyncio.gather(*(one(token) for token in calls))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>24}: {len(calls)} requests in {elapsed:.2f}s ({len(calls) / elapsed:7.0f} req/s), "
+          f"{queries['count']} queries ({queries['count'] / len(calls):.2f} per request)")
+
+
+async def main(args):
+    await init_models()
+    async with AsyncSessionLocal() as db:
+        db.add_all(User(username=f"user{i:05d}", email=f"user{i:05d}@example.com", password_hash="x")
+                   for i in range(args.users))
+        await db.commit()
+    tokens = [auth_manager.create_access_token(data={"sub": f"user{i:05d}"}) for i in range(args.users)]
+
+    try:
+        await run("uncached", uncached_current_user, tokens, args.requests)
+        await run("cold caches", auth_manager.get_current_user, tokens, args.requests)
+        await run("warm caches", auth_manager.get_current_user, tokens, args.requests)
+        print(f"{'':>24}  user cache {auth_manager.user_cache.stats}, "
+              f"{auth_manager.user_cache._loads.coalesced} coalesced; token cache {auth_manager.token_cache.stats}")
+
+        # A second worker with a cold local layer reads what the first one put in the shared layer
+        shared = InMemorySharedCache()
+        for i in range(2):
+            auth_manager.user_cache = UserCache(shared=shared, session_factory=AsyncSessionLocal)
+            await run(f"worker {i}, shared layer", auth_manager.get_current_user, tokens, args.requests)
+            print(f"{'':>24}  {auth_manager.user_cache.stats}")
+
+        # Invalidation: the next lookup after an update sees the new email
+        async with AsyncSessionLocal() as db:
+            user = await auth_manager.get_current_user(db, tokens[0])
+            await auth_manager.update_user_profile(db, user, email="changed@example.com")
+        async with AsyncSessionLocal() as db:
+            user = await auth_manager.get_current_user(db, tokens[0])
+        print(f"after update_user_profile: {user.email}")
+    finally:
+        auth_manager.password_hasher.shutdown()
+        await async_engine.dispose()
+        DB_DIR.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="get_current_user with and without the user cache")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="Authenticated requests per user")
+    asyncio.run(main(parser.parse_args()))
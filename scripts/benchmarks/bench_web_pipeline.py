@@ -0,0 +1,130 @@
+# scripts/benchmarks/bench_web_pipeline.py
+#
+# Runs the web-search pipeline end to end against local stand-ins for the
+# Google CSE API, the result pages and the Groq chat completion API.
+#
+# Usage: python scripts/benchmarks/bench_web_pipeline.py --pages 5 --deadline 3
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+WORDS = ("fox dog river bank forest hunter meadow winter summer village market bridge storm harvest "
+         "mountain valley lantern orchard castle ferry").split()
+
+
+def page_text(index, words=900):
+    rng = random.Random(index)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def chat_completion(content, prompt_tokens=0):
+    return {
+        "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 8, "total_tokens": prompt_tokens + 8},
+    }
+
+
+upstream_calls = {"search": 0, "page": 0, "llm": 0}
+
+
+async def start_stub_servers(num_pages, page_delay, llm_delay, straggler_delay, mirrors):
+    async def search(request):
+        upstream_calls["search"] += 1
+        base = f"http://{request.host}"
+        return web.json_response({"items": [{"link": f"{base}/page/{i}"} for i in range(num_pages)]})
+
+    async def page(request):
+        upstream_calls["page"] += 1
+        index = int(request.match_info['index'])
+        # The last page is a straggler that should not hold up the answer
+        delay = straggler_delay if index == num_pages - 1 else random.uniform(0, page_delay)
+        await asyncio.sleep(delay)
+        # The first `mirrors` pages after page 0 are syndicated copies of it with their own site chrome
+        source = 0 if 0 < index <= mirrors else index
+        return web.Response(text=f"<html><body><main><p>Mirror site {index}. {page_text(source)}</p></main>"
+                                 f"</body></html>", content_type='text/html')
+
+    async def completions(request):
+        upstream_calls["llm"] += 1
+        body = await request.json()
+        await asyncio.sleep(llm_delay)
+        prompt = body["messages"][-1]["content"]
+        return web.json_response(chat_completion(f"Summary of {len(prompt)} prompt chars",
+                                                 prompt_tokens=len(prompt) // 4))
+
+    app = web.Application()
+    app.router.add_get('/customsearch/v1', search)
+    app.router.add_get('/page/{index}', page)
+    app.router.add_post('/openai/v1/chat/completions', completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def main(args):
+    runner, base_url = await start_stub_servers(args.pages, args.page_delay, args.llm_delay, args.straggler_delay,
+                                                args.mirrors)
+    # The pipeline reads its endpoints at import time
+    os.environ['GOOGLE_SEARCH_URL'] = f"{base_url}/customsearch/v1"
+    os.environ['GOOGLE_API_KEY'] = "stub-key"
+    os.environ['GOOGLE_CSE_ID'] = "stub-cse"
+    os.environ['GROQ_BASE_URL'] = base_url
+    os.environ['GROQ_API_KEYS'] = ",".join(f"stub-key-{index}" for index in range(5))
+    cache_dir = tempfile.TemporaryDirectory()
+    os.environ['WEB_CACHE_PATH'] = os.path.join(cache_dir.name, 'web_cache.db')
+    from backend.services.service_integrations import web_driver
+    from backend.services.service_clients.session_pool import session_pool
+
+    try:
+        for run in range(1, args.runs + 1):
+            for name in upstream_calls:
+                upstream_calls[name] = 0
+            stats = web_driver.new_query_stats()
+            started = time.perf_counter()
+            arrivals = []
+            summaries = []
+            # Same stages as answer_search_query, minus language detection and translation
+            async for summary in web_driver.search_and_summarize("quick brown fox", num_results=args.pages,
+                                                                 deadline=args.deadline, stats=stats):
+                arrivals.append(time.perf_counter() - started)
+                summaries.append(summary)
+                print(f"  +{arrivals[-1]:.2f}s {summary}")
+            answer = await web_driver.merge_summaries(summaries, "quick brown fox", stats)
+            total = time.perf_counter() - started
+            first = f"{arrivals[0]:.2f}s" if arrivals else "n/a"
+            print(f"run {run}: {len(arrivals)}/{args.pages} page summaries, first after {first}, "
+                  f"answer ({len(answer)} chars) after {total:.2f}s (deadline {args.deadline}s)")
+            print(f"  upstream calls {upstream_calls}; {stats['llm_calls']} LLM calls, "
+                  f"{stats['prompt_tokens']} prompt tokens, {stats['duplicates_dropped']} duplicates dropped")
+        for layer, stats in web_driver.web_cache.stats().items():
+            print(f"cache {layer}: {stats}")
+    finally:
+        await session_pool.close_all()
+        await runner.cleanup()
+        web_driver.web_cache.close()
+        cache_dir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the async search pipeline")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--page-delay", type=float, default=0.3)
+    parser.add_argument("--llm-delay", type=float, default=0.2)
+    parser.add_argument("--straggler-delay", type=float, default=10.0)
+    parser.add_argument("--deadline", type=float, default=3.0)
+    parser.add_argument("--mirrors", type=int, default=2, help="Pages that duplicate the first result")
+    parser.add_argument("--runs", type=int, default=2, help="Repeat the query to exercise the web cache")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,291 @@
+# scripts/benchmarks/stub_backends.py
+#
+# Stand-ins for the heavy backends, shared by the benchmarks: a tiny numpy
+# language model behind the LLamaBrain interface, an analyzer with the
+# EnhancedLlamaOutputAnalyzer stage methods, a TTS service, a fake microphone
+# for InputProcessor, and local HTTP servers for the search API, result pages,
+# the Groq chat completion API and speech recognition. The stubs do real (if
+# small) CPU work and emit the same spans as the components they replace, so
+# the per-stage breakdown of a benchmark lines up with production traces.
+
+import asyncio
+import hashlib
+import io
+import os
+import random
+import re
+import sys
+import time
+import wave
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from backend.core.main_brain.brain_pipeline import Analysis, Routing
+from backend.utils.tracing import tracer
+
+WORDS = ("fox dog river bank forest hunter meadow winter summer village market bridge storm harvest "
+         "mountain valley lantern orchard castle ferry").split()
+ROUTING_LABELS = ["general_knowledge", "technical_support", "customer_service", "product_inquiry"]
+SAMPLE_RATE = 16000
+
+
+def page_text(seed, words=900):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def tiny_lm_weights(vocab=4096, dim=256, layers=2, seed=0):
+    """Random float32 weights for TinyLM, as a name -> array dict (the layout of a safetensors file)."""
+    rng = np.random.default_rng(seed)
+    weights = {"embed": (rng.standard_normal((vocab, dim)) / np.sqrt(dim)).astype(np.float32)}
+    for layer in range(layers):
+        weights[f"layer{layer}"] = (rng.standard_normal((dim, dim)) / np.sqrt(dim)).astype(np.float32)
+    return weights
+
+
+class TinyLM:
+    """Greedy decoding with a random embedding table and a stack of dense layers.
+
+    Each new token costs `layers` dim x dim products plus a vocab x dim
+    projection, so generation is CPU-bound numpy work that releases the GIL,
+    like a real model's forward passes, at a size set by the weights.
+    """
+
+    def __init__(self, weights):
+        self.embed = weights["embed"]
+        self.layers = [weights[name] for name in sorted(name for name in weights if name.startswith("layer"))]
+        self.vocab = [f"{WORDS[i % len(WORDS)]}{i // len(WORDS)}" for i in range(self.embed.shape[0])]
+
+    def encode(self, text):
+        return [int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little") % len(self.vocab)
+                for word in text.lower().split()] or [0]
+
+    def decode(self, ids):
+        return " ".join(self.vocab[i] for i in ids)
+
+    def generate(self, ids, max_new_tokens):
+        state = self.embed[ids].mean(axis=0)
+        generated = []
+        for _ in range(max_new_tokens):
+            for layer in self.layers:
+                state = np.tanh(state @ layer)
+            token = int(np.argmax(self.embed @ state))
+            generated.append(token)
+            state = state + self.embed[token]
+        return generated
+
+
+class StubBrain:
+    """LLamaBrain's interface over TinyLM."""
+
+    def __init__(self, model, max_new_tokens=48):
+        self.model = model
+        self.max_new_tokens = max_new_tokens
+        self.context = []
+
+    async def process_input(self, text):
+        return await asyncio.to_thread(self.generate, text)
+
+    def generate(self, text):
+        with tracer.span("llama.tokenize"):
+            ids = self.model.encode(text)
+        with tracer.span("llama.generate", tokens_in=len(ids)) as span:
+            generated = self.model.generate(ids, self.max_new_tokens)
+            span.set(tokens_out=len(generated))
+        with tracer.span("llama.decode"):
+            return self.model.decode(generated)
+
+    def remember(self, text, response):
+        self.context.append((text, response))
+
+
+class StubTTS:
+    """Writes a sine tone as a WAV file, one second per 15 characters."""
+
+    async def synthesize(self, text):
+        started = time.perf_counter()
+        return await asyncio.to_thread(self._synthesize_sync, text, started)
+
+    def _synthesize_sync(self, text, submitted_at):
+        with tracer.span("tts.synthesize", chars=len(text), queue_wait=time.perf_counter() - submitted_at):
+            samples = np.arange(int(SAMPLE_RATE * len(text) / 15)) / SAMPLE_RATE
+            pcm = (np.sin(2 * np.pi * 220 * samples) * 8000).astype(np.int16)
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(SAMPLE_RATE)
+                wav.writeframes(pcm.tobytes())
+            return buffer.getvalue()
+
+
+class StubAnalyzer:
+    """The analyzer's stage methods with bag-of-words scorers in place of the models.
+
+    Inputs starting with "route" are judged not relevant, so a workload
+    controls how often the routing stage runs.
+    """
+
+    def __init__(self):
+        self.tts_service = StubTTS()
+
+    @staticmethod
+    def _bag(text):
+        counts = {}
+        for word in text.lower().split():
+            counts[word] = counts.get(word, 0) + 1
+        return counts
+
+    def _cosine(self, first, second):
+        first, second = self._bag(first), self._bag(second)
+        words = sorted(set(first) | set(second))
+        a = np.array([first.get(word, 0) for word in words], dtype=np.float32)
+        b = np.array([second.get(word, 0) for word in words], dtype=np.float32)
+        norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+        return float(a @ b) / norm if norm else 0.0
+
+    def score(self, user_input, output):
+        with tracer.span("analyzer.tfidf"):
+            relevance = self._cosine(user_input, output)
+        with tracer.span("analyzer.sentiment"):
+            sentiment = 0.5 + 0.5 * np.tanh(len(output.split()) / 100)
+        with tracer.span("analyzer.lda"):
+            coherence = len(set(user_input.split()) & set(output.split())) / max(len(set(user_input.split())), 1)
+        with tracer.span("analyzer.deberta"):
+            factual = 0.9
+        relevant = not user_input.startswith("route")
+        confidence = 0.9 if relevant else 0.1
+        return Analysis(relevance, float(sentiment), coherence, factual, confidence, relevant)
+
+    def filter_output(self, output):
+        with tracer.span("analyzer.spacy_filter", chars_in=len(output)) as span:
+            filtered = " ".join(sentence for sentence in re.split(r"(?<=[.!?])\s+", output)
+                                if not re.search(r"\b\d{3}-\d{2}-\d{4}\b", sentence))
+            span.set(chars_out=len(filtered))
+        return filtered
+
+    def classify_route(self, user_input):
+        with tracer.span("analyzer.route"):
+            scores = {label: self._cosine(user_input, label.replace("_", " ")) for label in ROUTING_LABELS}
+        return Routing(max(scores, key=scores.get), scores)
+
+
+def speech_pcm(seconds, seed=0):
+    """Noisy voiced-sounding 16-bit mono PCM at 16 kHz."""
+    rng = np.random.default_rng(seed)
+    samples = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    signal = np.sin(2 * np.pi * 140 * samples) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * samples))
+    signal += 0.1 * rng.standard_normal(len(samples))
+    return (signal * 6000).astype(np.int16).tobytes()
+
+
+class FakeAudioSource:
+    """AudioStreamer's interface over canned utterances.
+
+    With `realtime`, each utterance is handed over only after its duration
+    has passed, as a microphone would; otherwise they come back to back.
+    """
+
+    def __init__(self, utterances, utterance_seconds=1.0, realtime=False, seed=0):
+        self.utterances = utterances
+        self.utterance_seconds = utterance_seconds
+        self.realtime = realtime
+        self.seed = seed
+        self.is_recording = False
+
+    def start_recording(self):
+        self.is_recording = True
+        for index in range(self.utterances):
+            if not self.is_recording:
+                return
+            if self.realtime:
+                time.sleep(self.utterance_seconds)
+            yield speech_pcm(self.utterance_seconds, seed=self.seed * 100003 + index)
+
+    def stop_recording(self):
+        self.is_recording = False
+
+    def close(self):
+        pass
+
+
+def enhance_pcm(audio_data):
+    """numpy stand-in for the pydub enhancer: remove DC offset and normalize the peak."""
+    samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
+    samples -= samples.mean()
+    peak = float(np.abs(samples).max()) or 1.0
+    return (samples * (32767 * 0.9 / peak)).astype(np.int16).tobytes()
+
+
+def http_transcriber(session_factory, url):
+    """An InputProcessor transcriber that posts PCM to the stub recognizer at `url`."""
+    async def transcribe(audio_data):
+        with tracer.span("stt.transcribe", audio_bytes=len(audio_data)):
+            async with session_factory().post(url, data=audio_data) as response:
+                response.raise_for_status()
+                return (await response.json())["text"]
+    return transcribe
+
+
+def chat_completion(content, prompt_tokens=0, completion_tokens=8):
+    return {
+        "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+async def start_stub_servers(num_pages=3, page_delay=0.05, llm_delay=0.1, stt_delay=0.1, seed=0):
+    """Serve the search API, pages, chat completions and speech recognition on one local port.
+
+    Returns (runner, base_url). Search results point at pages under the
+    query's own path, so distinct queries miss the page and summary caches.
+    Delays are upper bounds of uniform random waits.
+    """
+    rng = random.Random(seed)
+    calls = {"search": 0, "page": 0, "llm": 0, "stt": 0}
+
+    async def search(request):
+        calls["search"] += 1
+        base = f"http://{request.host}"
+        query = hashlib.blake2b(request.query.get("q", "").encode(), digest_size=6).hexdigest()
+        return web.json_response({"items": [{"link": f"{base}/page/{query}/{i}"} for i in range(num_pages)]})
+
+    async def page(request):
+        calls["page"] += 1
+        await asyncio.sleep(rng.uniform(0, page_delay))
+        source = f"{request.match_info['query']}/{request.match_info['index']}"
+        return web.Response(text=f"<html><body><main><p>{page_text(source)}</p></main></body></html>",
+                            content_type="text/html")
+
+    async def completions(request):
+        calls["llm"] += 1
+        body = await request.json()
+        await asyncio.sleep(rng.uniform(0, llm_delay))
+        prompt = body["messages"][-1]["content"]
+        return web.json_response(chat_completion(f"Summary of {len(prompt)} prompt chars",
+                                                 prompt_tokens=len(prompt) // 4))
+
+    async def recognize(request):
+        calls["stt"] += 1
+        audio = await request.read()
+        await asyncio.sleep(rng.uniform(0, stt_delay))
+        rng_words = random.Random(len(audio))
+        return web.json_response({"text": " ".join(rng_words.choice(WORDS) for _ in range(8))})
+
+    app = web.Application(client_max_size=16 * 2 ** 20)
+    app["calls"] = calls
+    app.router.add_get("/customsearch/v1", search)
+    app.router.add_get("/page/{query}/{index}", page)
+    app.router.add_post("/openai/v1/chat/completions", completions)
+    app.router.add_post("/stt", recognize)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
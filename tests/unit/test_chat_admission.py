@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from backend.utils.chat_admission import ChatAdmission, Overloaded, UserLimitExceeded
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_higher_priority_displaces_newest_lower_priority_waiter():
+    async def run():
+        admission = ChatAdmission(max_in_flight=1, max_queue=1, max_per_user=2)
+        await admission.acquire("a")
+        background = asyncio.ensure_future(admission.acquire("b", "background"))
+        await settle()
+        interactive = asyncio.ensure_future(admission.acquire("c", "interactive"))
+        await settle()
+        with pytest.raises(Overloaded, match="Displaced"):
+            await background
+        assert admission.stats["displaced"] == 1
+        assert admission.queue_depth == 1
+        admission.release("a")
+        await interactive
+        assert admission.in_flight == 1
+        admission.release("c")
+        assert admission.metrics()["queue_depth"] == 0
+
+    asyncio.run(run())
+
+
+def test_full_queue_sheds_equal_priority():
+    async def run():
+        admission = ChatAdmission(max_in_flight=1, max_queue=1)
+        await admission.acquire("a")
+        waiting = asyncio.ensure_future(admission.acquire("b"))
+        await settle()
+        with pytest.raises(Overloaded, match="full"):
+            await admission.acquire("c")
+        assert admission.stats["rejected_full"] == 1
+        admission.release("a")
+        await waiting
+        admission.release("b")
+
+    asyncio.run(run())
+
+
+def test_wait_times_out_and_frees_the_users_count():
+    async def run():
+        admission = ChatAdmission(max_in_flight=1, max_queue=4, max_per_user=1, queue_timeout=0.05)
+        # One quick request, so the wait estimate is under the timeout and the request is queued
+        async with admission.slot("warm"):
+            pass
+        await admission.acquire("a")
+        with pytest.raises(Overloaded, match="Timed out"):
+            await admission.acquire("b")
+        assert admission.stats["timed_out"] == 1
+        assert admission.queue_depth == 0
+        admission.release("a")
+        # b's queued entry was taken off its per-user count
+        await admission.acquire("b")
+        admission.release("b")
+
+    asyncio.run(run())
+
+
+def test_per_user_limit_counts_running_and_queued():
+    async def run():
+        admission = ChatAdmission(max_in_flight=1, max_queue=4, max_per_user=2)
+        await admission.acquire("a")
+        queued = asyncio.ensure_future(admission.acquire("a"))
+        await settle()
+        with pytest.raises(UserLimitExceeded) as rejected:
+            await admission.acquire("a")
+        assert rejected.value.status_code == 429
+        assert admission.stats["rejected_user"] == 1
+        # Other users are not affected
+        other = asyncio.ensure_future(admission.acquire("b"))
+        await settle()
+        admission.release("a")
+        await queued
+        admission.release("a")
+        await other
+        admission.release("b")
+        assert admission.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from backend.core.main_brain.brain_pipeline import BrainPipeline
+
+llama_output_analyzer = pytest.importorskip("backend.core.main_brain.llama_output_analyzer")
+
+
+class FakeBrain:
+    async def process_input(self, text):
+        return "Restart the router."
+
+    def remember(self, text, response):
+        pass
+
+
+def make_analyzer(threshold=0.5):
+    # Skip __init__, which loads the models; the scorers return numpy values as TF-IDF and numpy maths do
+    analyzer = llama_output_analyzer.EnhancedLlamaOutputAnalyzer.__new__(
+        llama_output_analyzer.EnhancedLlamaOutputAnalyzer)
+    analyzer.confidence_threshold = threshold
+    analyzer._calculate_relevance = lambda user_input, output: np.float64(0.9)
+    analyzer._analyze_sentiment = lambda output: np.float64(0.8)
+    analyzer._check_topic_coherence = lambda user_input, output: np.float64(0.7)
+    analyzer._check_factual_accuracy = lambda output: np.float32(0.6)
+    analyzer._filter_output = lambda output: output
+    return analyzer
+
+
+def test_score_returns_plain_python_types():
+    analysis = make_analyzer().score("my wifi is down", "Restart the router.")
+
+    assert all(type(value) is float for value in analysis[:-1])
+    assert type(analysis.is_relevant) is bool
+
+
+def test_chat_response_encodes():
+    pipeline = BrainPipeline(FakeBrain(), make_analyzer())
+    result = asyncio.run(pipeline.run("my wifi is down", synthesize=False))
+
+    # The body /chat returns
+    body = jsonable_encoder({
+        "response": result.response,
+        "relevant": result.analysis.is_relevant,
+        "confidence": result.analysis.confidence,
+        "routed_to": result.routing.category if result.routing else None,
+        "audio": None,
+    })
+
+    assert body["relevant"] is True
+    assert body["confidence"] == pytest.approx(0.75)
+    assert body["response"] == "Restart the router."
@@ -0,0 +1,37 @@
+from backend.services.service_integrations.html_extractor import extract_text, is_boilerplate_attr
+
+ARTICLE = " ".join(f"word{i}" for i in range(300))
+
+
+def page(body_attrs="", wrapper_attrs="", sidebar=""):
+    return (f"<html><head><title>t</title></head><body {body_attrs}>"
+            f"<div class=\"nav\"><a href=\"/\">Home</a> <a href=\"/about\">About</a></div>"
+            f"<div {wrapper_attrs}><p>{ARTICLE}</p></div>{sidebar}</body></html>")
+
+
+def test_body_class_does_not_drop_page():
+    for classes in ("no-sidebar", "has-sidebar", "menu-open"):
+        words = extract_text(page(body_attrs=f'class="{classes}"')).split()
+        assert "word0" in words and "word299" in words, classes
+        assert "Home" not in words
+
+
+def test_wrapper_holding_most_text_is_kept():
+    words = extract_text(page(wrapper_attrs='class="content menu-wrapper"')).split()
+    assert "word0" in words and "word299" in words
+
+
+def test_boilerplate_sidebar_is_dropped():
+    sidebar = '<div class="sidebar widget"><p>Popular posts elsewhere</p></div>'
+    words = extract_text(page(sidebar=sidebar)).split()
+    assert "word0" in words
+    assert "Popular" not in words
+
+
+def test_whole_token_matching():
+    assert is_boilerplate_attr("site-footer")
+    assert is_boilerplate_attr("container nav")
+    assert not is_boilerplate_attr("no-sidebar")
+    assert not is_boilerplate_attr("has-sidebar")
+    assert not is_boilerplate_attr("menu-open")
+    assert not is_boilerplate_attr("navigator")
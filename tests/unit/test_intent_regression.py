@@ -0,0 +1,21 @@
+import json
+import os
+
+import pytest
+
+from backend.core.service_selector.intent_analyzer import DEFAULT_INTENTS_FILE, IntentMatcher
+
+REGRESSION_FILE = os.path.join(os.path.dirname(DEFAULT_INTENTS_FILE), 'web_query_regression.json')
+
+with open(REGRESSION_FILE, encoding='utf-8') as f:
+    CASES = json.load(f)
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher.from_file()
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["query"] for case in CASES])
+def test_query_intent(matcher, case):
+    assert matcher.match(case["query"]) == case["intent"]
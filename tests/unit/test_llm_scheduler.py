@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.services.service_integrations.llm_scheduler import KeyBudget, LLMScheduler
+
+
+def make_scheduler(max_in_flight=1):
+    return LLMScheduler([KeyBudget("key", object, 1000, 10 ** 6, max_in_flight=max_in_flight)])
+
+
+def test_release_on_another_loop_wakes_waiter():
+    scheduler = make_scheduler()
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        async def run():
+            key = await scheduler.acquire(10)
+            acquired.set()
+            await asyncio.to_thread(release.wait)
+            await scheduler.release(key, 10)
+        asyncio.run(run())
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    assert acquired.wait(5)
+
+    async def waiter():
+        # The only key is busy and has window budget left, so this waits with no timeout of its own
+        pending = asyncio.ensure_future(scheduler.acquire(10))
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        release.set()
+        key = await asyncio.wait_for(pending, 5)
+        await scheduler.release(key, 10)
+
+    asyncio.run(waiter())
+    thread.join(5)
+    assert scheduler.stats()["key"]["in_flight"] == 0
+
+
+def test_acquire_without_keys_fails():
+    with pytest.raises(RuntimeError):
+        asyncio.run(LLMScheduler([]).acquire(10))
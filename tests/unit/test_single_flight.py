@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from backend.services.service_clients.response_cache import SingleFlight
+
+
+class Upstream:
+    def __init__(self, delay=0.05, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return {"value": self.calls}
+
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+        assert upstream.calls == 1
+        assert flight.coalesced == 4
+        assert all(result == {"value": 1} for result in results)
+
+    asyncio.run(run())
+
+
+def test_shared_result_is_copied_per_caller():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        first, second = await asyncio.gather(flight.do("k", upstream), flight.do("k", upstream))
+        assert first is not second
+        first["value"] = "changed"
+        assert second == {"value": 1}
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_caller():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream(error=ValueError("boom"))
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(3)), return_exceptions=True)
+        assert upstream.calls == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream()
+        leader = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == {"value": 1}
+        assert leader.cancelled()
+        assert upstream.calls == 1 and upstream.cancelled == 0
+
+    asyncio.run(run())
+
+
+def test_callers_wait_under_their_own_timeout():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream(delay=0.1)
+        impatient = asyncio.ensure_future(flight.do("k", upstream, timeout=0.01))
+        await asyncio.sleep(0)
+        patient = asyncio.ensure_future(flight.do("k", upstream, timeout=1.0))
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        assert await patient == {"value": 1}
+        assert upstream.cancelled == 0
+
+    asyncio.run(run())
+
+
+def test_call_is_cancelled_when_no_caller_is_left():
+    async def run():
+        flight, upstream = SingleFlight(), Upstream(delay=1.0)
+        callers = [asyncio.ensure_future(flight.do("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert upstream.cancelled == 1
+        # The next caller starts a fresh call rather than joining the cancelled one
+        upstream.delay = 0.0
+        assert await flight.do("k", upstream) == {"value": 2}
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from backend.utils.usage_aggregator import UsageAggregator
+
+
+class FlakySession:
+    """Fails the bulk upsert with IntegrityError, then the row-by-row write on the `fail_at`-th row."""
+
+    def __init__(self, fail_at):
+        self.fail_at = fail_at
+        self.executed = 0
+        self.bind = SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.executed += 1
+        if self.executed == 1:
+            raise IntegrityError("INSERT", {}, Exception("bulk"))
+        if self.executed == self.fail_at + 1:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def test_partial_flush_restores_only_unwritten_rows():
+    async def run():
+        aggregator = UsageAggregator(lambda: FlakySession(fail_at=3))
+        for user_id in range(1, 5):
+            aggregator.record(user_id, "svc", count=user_id)
+        with pytest.raises(OperationalError):
+            await aggregator.flush()
+        # Users 1 and 2 were written before the failure; 3 and 4 go back into the buffer
+        assert sorted(aggregator._buffer) == [(3, "svc"), (4, "svc")]
+        assert aggregator._buffer[(3, "svc")][0] == 3
+        assert aggregator._unflushed == 7
+        assert aggregator.stats["rows_written"] == 2
+
+    asyncio.run(run())